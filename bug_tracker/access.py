@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from bug_tracking_system.db_routers import replica_cache_timeout
+
+from .models import Project
+
+
+def _cache_key(user_id):
+    return f"accessible_project_ids:{user_id}"
+
+
+def _timeout():
+    return replica_cache_timeout(settings.ACCESSIBLE_PROJECTS_CACHE_TIMEOUT)
+
+
+def _accessible_project_ids_query(user):
+    created = Project.objects.filter(created_by=user).values_list(
+        "pk", flat=True
+    )
+    shared = Project.shared_with.through.objects.filter(
+        user=user
+    ).values_list("project_id", flat=True)
+    return created.union(shared)
+
+
+def get_accessible_project_ids(user):
+    """Return the ids of the projects ``user`` created or that are shared.
+
+    The set is cached per user, so authorization filters can use a plain
+    ``project_id IN (...)`` instead of joining through ``shared_with``. The
+    entry is dropped by the signals in ``bug_tracker.signals`` whenever the
+    user's memberships change. Without ``SHARED_CACHE`` that would not
+    reach the other workers, so the set is queried every time.
+    """
+    if not settings.SHARED_CACHE:
+        return frozenset(_accessible_project_ids_query(user))
+    key = _cache_key(user.pk)
+    project_ids = cache.get(key)
+    if project_ids is None:
+        project_ids = frozenset(_accessible_project_ids_query(user))
+        cache.set(key, project_ids, _timeout())
+    return project_ids
+
+
+async def aget_accessible_project_ids(user):
+    """Async version of ``get_accessible_project_ids()``."""
+    if not settings.SHARED_CACHE:
+        return frozenset(
+            [pk async for pk in _accessible_project_ids_query(user)]
+        )
+    key = _cache_key(user.pk)
+    project_ids = await cache.aget(key)
+    if project_ids is None:
+        project_ids = frozenset(
+            [pk async for pk in _accessible_project_ids_query(user)]
+        )
+        await cache.aset(key, project_ids, _timeout())
+    return project_ids
+
+
+def invalidate_accessible_project_ids(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
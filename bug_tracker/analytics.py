@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from bug_tracking_system.db_routers import replica_cache_timeout
+
+from .models import TestCase, TestResult, TestRun
+
+
+FLAKINESS_SQL = """
+    WITH recent AS (
+        SELECT
+            test_case_id,
+            test_run_id,
+            status,
+            ROW_NUMBER() OVER (
+                PARTITION BY test_case_id ORDER BY test_run_id
+            ) AS seq,
+            LAG(status) OVER (
+                PARTITION BY test_case_id ORDER BY test_run_id
+            ) AS previous
+        FROM bug_tracker_testresult
+        WHERE test_run_id IN ({runs}) AND status IN (%s, %s)
+    ),
+    islands AS (
+        -- Consecutive results with the same status share an island number
+        SELECT
+            test_case_id,
+            status,
+            seq,
+            seq - ROW_NUMBER() OVER (
+                PARTITION BY test_case_id, status ORDER BY test_run_id
+            ) AS island
+        FROM recent
+    ),
+    streaks AS (
+        SELECT test_case_id, COUNT(*) AS length, MAX(seq) AS last_seq
+        FROM islands
+        WHERE status = %s
+        GROUP BY test_case_id, island
+    ),
+    totals AS (
+        SELECT
+            test_case_id,
+            COUNT(*) AS executed,
+            SUM(CASE WHEN status = %s THEN 1 ELSE 0 END) AS passed,
+            SUM(
+                CASE WHEN previous IS NOT NULL AND previous <> status
+                THEN 1 ELSE 0 END
+            ) AS flips
+        FROM recent
+        GROUP BY test_case_id
+    )
+    SELECT
+        totals.test_case_id,
+        totals.executed,
+        totals.passed,
+        totals.flips,
+        COALESCE(MAX(streaks.length), 0),
+        COALESCE(
+            MAX(CASE WHEN streaks.last_seq = totals.executed
+                THEN streaks.length END),
+            0
+        )
+    FROM totals
+    LEFT JOIN streaks ON streaks.test_case_id = totals.test_case_id
+    GROUP BY totals.test_case_id, totals.executed, totals.passed, totals.flips
+    ORDER BY totals.flips DESC, totals.passed, totals.test_case_id
+"""
+
+
+def _flakiness_rows(test_run_ids):
+    if not test_run_ids:
+        return []
+    runs = ", ".join(["%s"] * len(test_run_ids))
+    params = [
+        *test_run_ids,
+        TestResult.PASSED,
+        TestResult.FAILED,
+        TestResult.FAILED,
+        TestResult.PASSED,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(FLAKINESS_SQL.format(runs=runs), params)
+        return cursor.fetchall()
+
+
+def case_flakiness(project, runs=20, limit=100):
+    """Per-case pass rate, failure streaks and flakiness in ``project``.
+
+    Looks at the passed/failed results of the project's last ``runs``
+    test runs, in run order. ``flips`` counts changes between passed and
+    failed, and ``flakiness`` is that count over the number of chances to
+    flip. The ``limit`` flakiest cases come first. Everything is computed
+    by one window-function query.
+
+    The rows are cached for ``FLAKINESS_CACHE_TIMEOUT`` seconds under the
+    newest run they cover, so a new run is picked up right away while
+    result changes show up within that time. They are not keyed on the
+    project's dashboard version, which every result save changes.
+    """
+    test_run_ids = list(
+        TestRun.objects.filter(project=project)
+        .order_by("-pk")
+        .values_list("pk", flat=True)[:runs]
+    )
+    key = f"flakiness:{project.pk}:{runs}:{test_run_ids[:1]}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = _flakiness_rows(test_run_ids)
+        cache.set(
+            key, rows,
+            replica_cache_timeout(settings.FLAKINESS_CACHE_TIMEOUT),
+        )
+    rows = rows[:limit]
+
+    test_cases = TestCase.objects.in_bulk([row[0] for row in rows])
+    stats = []
+    for (test_case_id, executed, passed, flips, longest_streak,
+         current_streak) in rows:
+        stats.append(
+            {
+                "test_case": test_cases.get(test_case_id),
+                "executed": executed,
+                "passed": passed,
+                "pass_rate": round(passed / executed * 100, 2),
+                "flips": flips,
+                "flakiness": (
+                    round(flips / (executed - 1), 2) if executed > 1 else 0
+                ),
+                "longest_failure_streak": longest_streak,
+                "current_failure_streak": current_streak,
+            }
+        )
+    return [row for row in stats if row["test_case"] is not None]
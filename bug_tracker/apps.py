@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BugTrackerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bug_tracker"
+
+    def ready(self):
+        from . import signals  # noqa: F401
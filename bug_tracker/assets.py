@@ -0,0 +1,205 @@
+"""Static asset bundles.
+
+``manage.py build_assets`` concatenates and minifies the sources of each
+bundle in ``settings.ASSET_BUNDLES`` (compiling SCSS first) into
+``static/bundles/``, then runs ``collectstatic``. Only the bundles, the
+files their CSS references and ``settings.ASSET_EXTRA_FILES`` are
+collected; ``AssetStorage`` gives them fingerprinted names and gzip/brotli
+variants, which WhiteNoise serves with far-future immutable headers.
+
+Until a build exists, ``{% bundle %}`` links the individual sources, so
+development and tests need no build step.
+"""
+import fnmatch
+import gzip
+import json
+import os
+import posixpath
+import re
+from urllib.parse import urldefrag
+
+import brotli
+import rcssmin
+import rjsmin
+import sass
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.finders import FileSystemFinder
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+BUNDLE_DIR = "bundles"
+COLLECT_LIST = posixpath.join(BUNDLE_DIR, "collect.json")
+
+URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+SOURCE_MAP_RE = re.compile(r"^\s*(?://|/\*)\s*[#@] sourceMappingURL=.*$",
+                           re.MULTILINE)
+
+
+class AssetBuildError(Exception):
+    pass
+
+
+def output_dir():
+    """The static directory bundles are written to and collected from."""
+    return os.fspath(settings.STATICFILES_DIRS[0])
+
+
+def source_url(source):
+    """Static path to link for ``source`` when bundles are not built.
+
+    SCSS sources are linked through the compiled CSS next to them.
+    """
+    if source.endswith(".scss"):
+        return source[:-len(".scss")] + ".css"
+    return source
+
+
+def read_source(source):
+    path = finders.find(source)
+    if path is None:
+        raise AssetBuildError(f"Bundle source {source!r} was not found.")
+    if source.endswith(".scss"):
+        text = sass.compile(filename=path, output_style="expanded")
+    else:
+        with open(path, encoding="utf-8") as file:
+            text = file.read()
+    # Maps describe the unbundled sources, and the manifest storage would
+    # try to fingerprint the files they point at
+    return SOURCE_MAP_RE.sub("", text)
+
+
+def linked_size(source):
+    """Bytes a page loaded for ``source`` before it was bundled."""
+    return os.path.getsize(finders.find(source_url(source)) or
+                           finders.find(source))
+
+
+def rebase_urls(css, source, bundle_name, referenced):
+    """Point the relative ``url()``s of ``source`` at the bundle's location.
+
+    Every file referenced is added to ``referenced``. Query strings are
+    dropped, since fingerprinting takes over cache busting.
+    """
+    def rebase(match):
+        url = match.group(2).strip()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        path, fragment = urldefrag(url)
+        path = path.split("?", 1)[0]
+        target = posixpath.normpath(
+            posixpath.join(posixpath.dirname(source), path)
+        )
+        if finders.find(target) is None:
+            raise AssetBuildError(
+                f"{source} references {url!r}, which was not found."
+            )
+        referenced.add(target)
+        rebased = posixpath.relpath(target, posixpath.dirname(bundle_name))
+        return f'url("{rebased}{"#" + fragment if fragment else ""}")'
+
+    return URL_RE.sub(rebase, css)
+
+
+def build_bundle(name, sources, referenced):
+    """Write bundle ``name`` and return its size report."""
+    parts = []
+    source_bytes = 0
+    for source in sources:
+        text = read_source(source)
+        source_bytes += linked_size(source)
+        # License headers (/*! ... */) are kept
+        if name.endswith(".css"):
+            parts.append(rcssmin.cssmin(
+                rebase_urls(text, source, name, referenced),
+                keep_bang_comments=True,
+            ))
+        else:
+            parts.append(rjsmin.jsmin(text, keep_bang_comments=True))
+    # A statement without its semicolon must not run into the next file
+    content = ("\n" if name.endswith(".css") else ";\n").join(parts)
+    data = content.encode()
+
+    path = os.path.join(output_dir(), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+    return {
+        "name": name,
+        "sources": len(sources),
+        "source_bytes": source_bytes,
+        "bundle_bytes": len(data),
+        "gzip_bytes": len(gzip.compress(data, compresslevel=9)),
+        "brotli_bytes": len(brotli.compress(data)),
+    }
+
+
+def build_bundles():
+    """Build every bundle and record which files ``collectstatic`` needs.
+
+    Returns the per-bundle size reports.
+    """
+    referenced = set()
+    reports = [
+        build_bundle(name, sources, referenced)
+        for name, sources in settings.ASSET_BUNDLES.items()
+    ]
+    with open(os.path.join(output_dir(), COLLECT_LIST), "w") as file:
+        json.dump(
+            {
+                "files": sorted(referenced | set(settings.ASSET_BUNDLES)),
+                "patterns": settings.ASSET_EXTRA_FILES,
+            },
+            file,
+            indent=2,
+        )
+    return reports
+
+
+def read_collect_list():
+    try:
+        with open(os.path.join(output_dir(), COLLECT_LIST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def is_collected(path, collect_list):
+    return path in collect_list["files"] or any(
+        fnmatch.fnmatchcase(path, pattern)
+        for pattern in collect_list["patterns"]
+    )
+
+
+class BundleFinder(FileSystemFinder):
+    """FileSystemFinder that leaves unused files out of ``collectstatic``.
+
+    Lookups still see every file; only listing, which ``collectstatic``
+    uses, is narrowed to what the last ``build_assets`` recorded.
+    """
+
+    def list(self, ignore_patterns):
+        collect_list = read_collect_list()
+        for path, storage in super().list(ignore_patterns):
+            if collect_list is None or is_collected(path, collect_list):
+                yield path, storage
+
+
+class AssetStorage(CompressedManifestStaticFilesStorage):
+    """Fingerprinted, precompressed static files.
+
+    Names missing from the manifest -- all of them before the first build
+    -- are served unhashed instead of raising.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def bundle_is_built(name, storage):
+    return not settings.DEBUG and name in getattr(
+        storage, "hashed_files", {}
+    )
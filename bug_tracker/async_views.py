@@ -0,0 +1,236 @@
+"""Async versions of the read-heavy views, served under ASGI.
+
+``bug_tracker.urls`` routes to these instead of their sync counterparts
+when ``settings.ASYNC_VIEWS`` is set, which ``asgi.py`` does by default.
+Queries go through the async ORM and every queryset is materialized before
+the template is rendered, since rendering runs on the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import AccessMixin
+from django.http import Http404
+from django.shortcuts import render
+from django.utils import timezone
+from django.views import View
+
+from .access import aget_accessible_project_ids
+from .cache_versions import aget_version, arender_cached_fragment
+from .conditional import (
+    AsyncConditionalGetMixin,
+    aresults_validators,
+    make_etag,
+)
+from .forms import TestResultBulkUpdateForm
+from .models import Project, TestResult, TestResultHistory, TestRun
+from .pagination import KeysetPaginationMixin
+from .run_events import arun_events_response
+from .run_statistics import aget_run_statistics
+from .views import TestResultFilterMixin
+
+
+async def resolve_user(request):
+    """Load the lazy ``request.user`` off the event loop and return it."""
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    async def dispatch(self, request, *args, **kwargs):
+        user = await resolve_user(request)
+        if not user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncProjectDetailView(View):
+    template_name = "bug_tracker/project_detail.html"
+
+    async def get(self, request, pk):
+        await resolve_user(request)
+
+        async def get_context():
+            project = await Project.objects.filter(pk=pk).afirst()
+            if project is None:
+                raise Http404("No Project matches the given query.")
+            testruns = [
+                testrun
+                async for testrun in project.testrun_set.select_related(
+                    "project"
+                )
+            ]
+            return {
+                "project": project,
+                "testcases": [
+                    testcase async for testcase in project.testcase_set.all()
+                ],
+                "testrun_data": await aget_run_statistics(testruns),
+            }
+
+        dashboard = await arender_cached_fragment(
+            "project", pk, "bug_tracker/project_dashboard.html",
+            get_context, request,
+        )
+        return render(request, self.template_name, {"dashboard": dashboard})
+
+
+class AsyncTestRunDetailView(AsyncLoginRequiredMixin,
+                             AsyncConditionalGetMixin, View):
+    template_name = "bug_tracker/testrun_detail.html"
+
+    async def get_etag(self, request, pk):
+        return make_etag(
+            request.user.pk,
+            await aget_version("testrun", pk),
+            request.GET.get("status"),
+            request.GET.get("priority"),
+            # "Changes today" changes at midnight too
+            timezone.localdate(),
+        )
+
+    async def get(self, request, pk):
+        status = request.GET.get("status")
+        priority = request.GET.get("priority")
+
+        async def get_context():
+            test_run = (
+                await TestRun.objects.select_related("project")
+                .filter(pk=pk)
+                .afirst()
+            )
+            if not test_run:
+                raise TestRun.DoesNotExist
+            test_results = test_run.test_results.select_related("test_case")
+            stats = (await aget_run_statistics([test_run]))[0]
+
+            if status:
+                test_results = test_results.filter(status=status)
+
+            if priority:
+                test_results = test_results.filter(
+                    test_case__priority=priority
+                )
+
+            today = timezone.localtime().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            changes_today = (
+                TestResultHistory.objects.for_run(test_run, since=today)
+                .select_related("test_case")[:20]
+            )
+            return {
+                "test_run": test_run,
+                "test_results": [result async for result in test_results],
+                "changes_today": [change async for change in changes_today],
+                "passed_count": stats["passed_count"],
+                "failed_count": stats["failed_count"],
+                "blocked_count": stats["blocked_count"],
+                "untested_count": stats["untested_count"],
+            }
+
+        try:
+            dashboard = await arender_cached_fragment(
+                "testrun", pk, "bug_tracker/testrun_dashboard.html",
+                get_context, request,
+                variant=(status, priority, timezone.localdate()),
+            )
+        except TestRun.DoesNotExist:
+            context = {
+                "message": "Test run not found.",
+            }
+            return render(request, self.template_name, context)
+        return render(
+            request,
+            self.template_name,
+            {
+                "dashboard": dashboard,
+                "bulk_update_form": TestResultBulkUpdateForm(),
+                "test_run_pk": pk,
+                "live_updates": settings.LIVE_RUN_EVENTS,
+            },
+        )
+
+
+class AsyncTestRunEventsView(AsyncLoginRequiredMixin, View):
+    async def get(self, request, pk):
+        project_id = (
+            await TestRun.objects.filter(pk=pk)
+            .values_list("project_id", flat=True)
+            .afirst()
+        )
+        if (
+            not settings.LIVE_RUN_EVENTS
+            or project_id not in await aget_accessible_project_ids(
+                request.user
+            )
+        ):
+            raise Http404("No TestRun matches the given query.")
+        return await arun_events_response(pk)
+
+
+class AsyncTestResultListView(AsyncLoginRequiredMixin,
+                              AsyncConditionalGetMixin, TestResultFilterMixin,
+                              KeysetPaginationMixin, View):
+    model = TestResult
+    template_name = "bug_tracker/testresult_list.html"
+    context_object_name = "testresults"
+    keyset = ("-timestamp", "-id")
+
+    async def get_project_ids(self):
+        if not hasattr(self, "_project_ids"):
+            self._project_ids = await aget_accessible_project_ids(
+                self.request.user
+            )
+        return self._project_ids
+
+    async def aget_queryset(self):
+        return self.filter_results(
+            TestResult.objects.all(), await self.get_project_ids()
+        )
+
+    async def get_validators(self):
+        if not hasattr(self, "_validators"):
+            self._validators = await aresults_validators(
+                await self.aget_queryset()
+            )
+        return self._validators
+
+    async def get_etag(self, request):
+        count, last_modified = await self.get_validators()
+        return make_etag(
+            request.user.pk,
+            request.GET.urlencode(),
+            sorted(await self.get_project_ids()),
+            await aget_version("catalog", 0),
+            count,
+            last_modified,
+        )
+
+    async def get_last_modified(self, request):
+        return (await self.get_validators())[1]
+
+    async def get(self, request):
+        project_ids = await self.get_project_ids()
+        queryset = (await self.aget_queryset()).select_related(
+            "test_case", "test_run__project"
+        )
+        _, page, object_list, is_paginated = await self.apaginate_queryset(
+            queryset, self.paginate_by
+        )
+        context = {
+            "paginator": None,
+            "page_obj": page,
+            "is_paginated": is_paginated,
+            "object_list": object_list,
+            self.context_object_name: object_list,
+            "projects": [
+                project async for project in Project.objects.filter(
+                    pk__in=project_ids
+                )
+            ],
+            "testruns": [
+                testrun async for testrun in TestRun.objects.filter(
+                    project_id__in=project_ids
+                )
+            ],
+        }
+        return render(request, self.template_name, context)
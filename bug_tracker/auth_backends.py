@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that loads the user of a session from the cache.
+
+    With ``CACHED_AUTH`` on, ``get_user()`` -- called once per request by
+    ``AuthenticationMiddleware`` -- costs no query while the entry is warm.
+    The signals in ``bug_tracker.signals`` drop the entry whenever the user
+    is saved or deleted, which covers password changes; ``update()`` calls
+    bypass them, so entries also expire after ``USER_CACHE_TIMEOUT``.
+    """
+
+    def get_user(self, user_id):
+        if not settings.CACHED_AUTH:
+            return super().get_user(user_id)
+        key = _cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached user now and again once the transaction commits."""
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
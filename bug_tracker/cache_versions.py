@@ -0,0 +1,114 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from bug_tracking_system.db_routers import replica_cache_timeout
+
+
+def _version_key(scope, pk):
+    return f"version:{scope}:{pk}"
+
+
+def get_version(scope, pk):
+    """Return the current cache version of one project or test run.
+
+    A missing version (never set, or evicted) starts from the current time
+    in nanoseconds, so it can never reuse a number that cached fragments
+    were stored under before.
+    """
+    key = _version_key(scope, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(scope, pk):
+    """Async version of ``get_version()``."""
+    key = _version_key(scope, pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(scope, pks):
+    for pk in pks:
+        key = _version_key(scope, pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def bump_versions(scope, pks):
+    """Invalidate every cached fragment of ``scope`` for ``pks``.
+
+    The versions are bumped right away and again once the surrounding
+    transaction commits, so a fragment rendered from uncommitted or
+    not-yet-visible rows in the meantime is dropped as well.
+    """
+    pks = set(pks) - {None}
+    if not pks:
+        return
+    _bump(scope, pks)
+    transaction.on_commit(lambda: _bump(scope, pks))
+
+
+def _fragment_key(template_name, pk, version, variant):
+    variant_hash = hashlib.md5(repr(tuple(variant)).encode()).hexdigest()
+    return f"fragment:{template_name}:{pk}:{version}:{variant_hash}"
+
+
+def _fragment_timeout():
+    # A fragment rendered from a lagging replica would otherwise be kept
+    # under the new version until the next change
+    return replica_cache_timeout(settings.DASHBOARD_CACHE_TIMEOUT)
+
+
+def render_cached_fragment(scope, pk, template_name, get_context,
+                           request=None, variant=()):
+    """Render ``template_name`` once per version of ``scope``/``pk``.
+
+    ``get_context`` is only called on a cache miss, so a hit costs no
+    database queries. ``variant`` holds anything else the output depends
+    on, such as filter parameters. Without ``SHARED_CACHE`` another
+    worker's version bumps would not be seen, so nothing is cached.
+    """
+    if not settings.SHARED_CACHE:
+        return mark_safe(
+            render_to_string(template_name, get_context(), request)
+        )
+    key = _fragment_key(template_name, pk, get_version(scope, pk), variant)
+    content = cache.get(key)
+    if content is None:
+        content = render_to_string(template_name, get_context(), request)
+        cache.set(key, str(content), _fragment_timeout())
+    return mark_safe(content)
+
+
+async def arender_cached_fragment(scope, pk, template_name, get_context,
+                                  request=None, variant=()):
+    """Async version of ``render_cached_fragment()``.
+
+    ``get_context`` is a coroutine function here. The template is rendered
+    on the event loop, so the context must not hold lazy querysets.
+    """
+    if not settings.SHARED_CACHE:
+        context = await get_context()
+        return mark_safe(render_to_string(template_name, context, request))
+    version = await aget_version(scope, pk)
+    key = _fragment_key(template_name, pk, version, variant)
+    content = await cache.aget(key)
+    if content is None:
+        context = await get_context()
+        content = render_to_string(template_name, context, request)
+        await cache.aset(key, str(content), _fragment_timeout())
+    return mark_safe(content)
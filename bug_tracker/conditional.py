@@ -0,0 +1,136 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from bug_tracking_system.db_routers import reading_from_replica
+
+
+def _use_validators(request):
+    # A page showing flash messages differs from the one its validators
+    # describe, and a 304 would leave the messages unshown. len() loads
+    # them without marking them as seen.
+    return (
+        settings.SHARED_CACHE
+        and not reading_from_replica()
+        and not len(messages.get_messages(request))
+    )
+
+
+def _drop_validators(response):
+    if response.status_code == 200:
+        del response.headers["ETag"]
+        del response.headers["Last-Modified"]
+
+
+def make_etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def results_validators(queryset):
+    """Return ``(count, last_modified)`` of a TestResult queryset.
+
+    Saving a result through the views or ``update()`` refreshes its
+    ``timestamp``; deleting one changes the count. Both come from one
+    aggregate query.
+    """
+    validators = queryset.order_by().aggregate(
+        count=Count("pk"), last_modified=Max("timestamp")
+    )
+    return validators["count"], validators["last_modified"]
+
+
+async def aresults_validators(queryset):
+    """Async version of ``results_validators()``."""
+    validators = await queryset.order_by().aaggregate(
+        count=Count("pk"), last_modified=Max("timestamp")
+    )
+    return validators["count"], validators["last_modified"]
+
+
+class ConditionalGetMixin:
+    """Answer ``304 Not Modified`` while a page's validators still match.
+
+    Views override ``get_etag()`` and/or ``get_last_modified()``; both are
+    evaluated before the view runs, so an unchanged page costs only the
+    queries needed to compute them. Responses are marked private and must
+    be revalidated, since they depend on the user.
+
+    A page rendered from a read replica gets no validators: the replica
+    may lag behind the versions they are computed from, and a stale page
+    tagged with the current version would be revalidated as unchanged.
+    Neither does any page without ``SHARED_CACHE``, since the versions of
+    one worker do not see the changes made through the others, nor one
+    with pending flash messages.
+    """
+
+    def get_etag(self, request, *args, **kwargs):
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if not _use_validators(request):
+            response = super().dispatch(request, *args, **kwargs)
+            _drop_validators(response)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        view = condition(
+            etag_func=self.get_etag,
+            last_modified_func=self.get_last_modified,
+        )(super().dispatch)
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AsyncConditionalGetMixin:
+    """Async version of ``ConditionalGetMixin``.
+
+    ``get_etag()`` and ``get_last_modified()`` are coroutines here, since
+    ``condition()`` cannot wrap an async view.
+    """
+
+    async def get_etag(self, request, *args, **kwargs):
+        return None
+
+    async def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await super().dispatch(request, *args, **kwargs)
+        # Loading the messages may read the session
+        if not await sync_to_async(_use_validators)(request):
+            response = await super().dispatch(request, *args, **kwargs)
+            _drop_validators(response)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        etag = await self.get_etag(request, *args, **kwargs)
+        etag = quote_etag(etag) if etag is not None else None
+        last_modified = await self.get_last_modified(
+            request, *args, **kwargs
+        )
+        last_modified = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+        if last_modified and not response.has_header("Last-Modified"):
+            response.headers["Last-Modified"] = http_date(last_modified)
+        if etag:
+            response.headers.setdefault("ETag", etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
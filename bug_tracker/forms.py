@@ -1,7 +1,9 @@
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
 
-from bug_tracker.models import User, TestCase, TestRun, TestResult
+from bug_tracker.access import get_accessible_project_ids
+from bug_tracker.imports import IMPORT_FORMATS, detect_format
+from bug_tracker.models import User, Project, TestCase, TestRun, TestResult
 
 
 class RegisterForm(UserCreationForm):
@@ -22,7 +24,9 @@ class RegisterForm(UserCreationForm):
 class TestCaseForm(forms.ModelForm):
     def __init__(self, user, *args, **kwargs):
         super(TestCaseForm, self).__init__(*args, **kwargs)
-        self.fields["project"].queryset = user.user.all() | user.users.all()
+        self.fields["project"].queryset = Project.objects.filter(
+            pk__in=get_accessible_project_ids(user)
+        )
 
     class Meta:
         model = TestCase
@@ -36,6 +40,34 @@ class TestCaseForm(forms.ModelForm):
         ]
 
 
+class TestCaseImportForm(forms.Form):
+    project = forms.ModelChoiceField(queryset=None)
+    file = forms.FileField(
+        help_text="CSV with a header row, or JSON Lines, with the columns "
+                  "title, description, steps, expected_result and priority."
+    )
+    format = forms.ChoiceField(
+        choices=[("", "From file extension")]
+        + [(name, name.upper()) for name in IMPORT_FORMATS],
+        required=False,
+    )
+
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["project"].queryset = Project.objects.filter(
+            pk__in=get_accessible_project_ids(user)
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        file = cleaned_data.get("file")
+        if file and not cleaned_data.get("format"):
+            cleaned_data["format"] = detect_format(file.name)
+            if cleaned_data["format"] is None:
+                self.add_error("format", "Choose the file format.")
+        return cleaned_data
+
+
 class DateInput(forms.DateInput):
     input_type = "date"
 
@@ -43,7 +75,9 @@ class DateInput(forms.DateInput):
 class TestRunForm(forms.ModelForm):
     def __init__(self, user, *args, **kwargs):
         super(TestRunForm, self).__init__(*args, **kwargs)
-        self.fields["project"].queryset = user.user.all() | user.users.all()
+        self.fields["project"].queryset = Project.objects.filter(
+            pk__in=get_accessible_project_ids(user)
+        )
 
     deadline = forms.DateField(
         widget=DateInput(),
@@ -54,6 +88,20 @@ class TestRunForm(forms.ModelForm):
         fields = ["title", "description", "deadline", "project"]
 
 
+class TestRunCloneForm(forms.ModelForm):
+    deadline = forms.DateField(
+        widget=DateInput(),
+    )
+    only_unsuccessful = forms.BooleanField(
+        required=False,
+        label="Only cases that failed or were blocked",
+    )
+
+    class Meta:
+        model = TestRun
+        fields = ["title", "description", "deadline"]
+
+
 class TestResultForm(forms.ModelForm):
     class Meta:
         model = TestResult
@@ -64,6 +112,21 @@ class TestResultForm(forms.ModelForm):
         }
 
 
+class TestResultBulkUpdateForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=TestResult.STATUS_CHOICES,
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+    actual_result = forms.CharField(
+        required=False,
+        widget=forms.Textarea(
+            attrs={"class": "form-control", "rows": 1,
+                   "placeholder": "Actual result (optional)"}
+        ),
+        help_text="Leave empty to keep each result's actual result.",
+    )
+
+
 class ShareProjectForm(forms.Form):
     users = forms.ModelMultipleChoiceField(
         queryset=None, widget=forms.CheckboxSelectMultiple
@@ -0,0 +1,119 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache_versions import bump_versions
+from .models import TestCase
+
+
+IMPORT_FIELDS = ("title", "description", "steps", "expected_result",
+                 "priority")
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+class ImportFailed(Exception):
+    """Raised with every problem found in the first invalid batch."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def detect_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def read_rows(file, import_format):
+    """Yield ``(line, row)`` pairs from a text file, one row at a time."""
+    if import_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            raise ImportFailed([f"Line {line}: not a JSON object."])
+        yield line, row
+
+
+def clean_batch(project, rows):
+    """Validate a batch of rows and return unsaved TestCase instances."""
+    test_cases = []
+    errors = []
+    for line, row in rows:
+        fields = {
+            field: str(row.get(field) or "").strip()
+            for field in IMPORT_FIELDS
+        }
+        fields["priority"] = fields["priority"].lower() or TestCase.MEDIUM
+        test_case = TestCase(project=project, **fields)
+        try:
+            test_case.full_clean(exclude=["project"], validate_unique=False)
+        except ValidationError as error:
+            errors += [
+                f"Line {line}: {field}: {' '.join(messages)}"
+                for field, messages in error.message_dict.items()
+            ]
+        else:
+            test_cases.append(test_case)
+    if errors:
+        raise ImportFailed(errors)
+    return test_cases
+
+
+def import_test_cases(project, rows, batch_size=1000):
+    """Create or update ``project``'s test cases from ``(line, row)`` pairs.
+
+    Rows are validated and written in batches inside one transaction, so
+    a bad row rolls the whole import back. A row whose title matches an
+    existing case of the project updates that case instead of adding a
+    duplicate; within the file, the last row with a title wins. Returns
+    ``(created, updated)``.
+    """
+    rows = iter(rows)
+    created = updated = 0
+    update_fields = [field for field in IMPORT_FIELDS if field != "title"]
+    with transaction.atomic():
+        while batch := list(islice(rows, batch_size)):
+            by_title = {
+                test_case.title: test_case
+                for test_case in clean_batch(project, batch)
+            }
+            existing = dict(
+                TestCase.objects.filter(
+                    project=project, title__in=by_title
+                ).values_list("title", "pk").order_by("-pk")
+            )
+            new_cases = []
+            changed_cases = []
+            for title, test_case in by_title.items():
+                if title in existing:
+                    test_case.pk = existing[title]
+                    changed_cases.append(test_case)
+                else:
+                    new_cases.append(test_case)
+            TestCase.objects.bulk_create(new_cases)
+            TestCase.objects.bulk_update(changed_cases, update_fields)
+            created += len(new_cases)
+            updated += len(changed_cases)
+
+        # bulk_create() and bulk_update() skip the signals that invalidate
+        # cached pages
+        bump_versions("project", [project.pk])
+        bump_versions("catalog", [0])
+        if updated:
+            bump_versions(
+                "testrun", project.testrun_set.values_list("pk", flat=True)
+            )
+    return created, updated
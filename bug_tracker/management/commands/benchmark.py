@@ -0,0 +1,173 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bug_tracker.models import Project, TestResult, User
+from bug_tracker.urls import urlpatterns
+
+
+# URL names that change state on GET or do not accept GET
+# testrun_events streams for RUN_EVENTS_STREAM_SECONDS
+SKIPPED_URLS = {
+    "logout", "telegram_webhook", "testresult_bulk_update", "testrun_events",
+}
+
+
+class Command(BaseCommand):
+    help = ("Request every bug_tracker URL through the test client and "
+            "report latency percentiles and query counts as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Username to benchmark as (default: the user owning the "
+                 "most test runs).",
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--output", help="Write the JSON report to this file."
+        )
+        parser.add_argument(
+            "--baseline",
+            help="Compare against a report written by an earlier run.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed p95 slowdown against the baseline (0.2 = 20%%).",
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        client = Client(HTTP_HOST="127.0.0.1")
+        client.force_login(user)
+
+        report = {}
+        for name, path in self.get_paths(user):
+            report[name] = self.measure(client, path, options)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            regressions = self.compare(
+                report, baseline, options["tolerance"]
+            )
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} regressions against the baseline."
+                )
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+        user = (
+            User.objects.annotate(runs=Count("user__testrun"))
+            .order_by("-runs", "pk")
+            .first()
+        )
+        if user is None or not user.runs:
+            raise CommandError("No test runs found; run seed_data first.")
+        return user
+
+    def get_paths(self, user):
+        project = (
+            Project.objects.filter(created_by=user, testrun__isnull=False)
+            .order_by("pk")
+            .first()
+        )
+        if project is None:
+            raise CommandError(f"{user} owns no project with test runs.")
+        result = (
+            TestResult.objects.filter(test_run__project=project)
+            .order_by("pk")
+            .first()
+        )
+        if result is None:
+            raise CommandError(f"{project} has no test results.")
+        sources = {
+            "project": project.pk,
+            "share_project": project.pk,
+            "testrun": result.test_run_id,
+            "add_test_case": result.test_run_id,
+            "testcase": result.test_case_id,
+            "testresult": result.pk,
+        }
+
+        for pattern in urlpatterns:
+            name = pattern.name
+            if name in SKIPPED_URLS:
+                continue
+            kwargs = {}
+            if pattern.pattern.converters:
+                key = next(
+                    prefix for prefix in sources if name.startswith(prefix)
+                )
+                kwargs = {
+                    argument: sources[key]
+                    for argument in pattern.pattern.converters
+                }
+            yield name, reverse(name, kwargs=kwargs)
+
+    def measure(self, client, path, options):
+        for _ in range(options["warmup"]):
+            client.get(path)
+
+        timings = []
+        for _ in range(options["iterations"]):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        percentiles = (
+            statistics.quantiles(timings, n=100, method="inclusive")
+            if len(timings) > 1
+            else timings * 99
+        )
+        return {
+            "path": path,
+            "status": response.status_code,
+            "queries": len(queries.captured_queries),
+            "mean_ms": round(statistics.mean(timings), 2),
+            "p50_ms": round(percentiles[49], 2),
+            "p95_ms": round(percentiles[94], 2),
+            "p99_ms": round(percentiles[98], 2),
+        }
+
+    def compare(self, report, baseline, tolerance):
+        regressions = []
+        for name, current in report.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if current["queries"] > previous["queries"]:
+                regressions.append(
+                    f"{name}: {current['queries']} queries "
+                    f"(baseline {previous['queries']})"
+                )
+            if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: p95 {current['p95_ms']}ms "
+                    f"(baseline {previous['p95_ms']}ms)"
+                )
+        return regressions
@@ -0,0 +1,205 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from bug_tracker.models import TestResult
+
+from .benchmark import Command as BenchmarkCommand
+
+
+# Server command lines and whether they serve the async views
+SERVERS = {
+    "gunicorn": (
+        [
+            "-m", "gunicorn", "bug_tracking_system.wsgi",
+            "--bind", "127.0.0.1:{port}", "--workers", "{workers}",
+        ],
+        "0",
+    ),
+    "uvicorn": (
+        [
+            "-m", "uvicorn", "bug_tracking_system.asgi:application",
+            "--host", "127.0.0.1", "--port", "{port}",
+            "--workers", "{workers}", "--no-access-log",
+        ],
+        "1",
+    ),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ("Compare concurrent-request throughput of the read-heavy pages "
+            "under gunicorn (WSGI) and uvicorn (ASGI, async views) and "
+            "report it as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Username to benchmark as (default: the user owning the "
+                 "most test runs).",
+        )
+        parser.add_argument(
+            "--servers", nargs="+", choices=list(SERVERS),
+            default=list(SERVERS),
+        )
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--concurrency", type=int, default=32,
+            help="Requests in flight at once.",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=500,
+            help="Requests per page and server.",
+        )
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--startup-timeout", type=float, default=30,
+            help="Seconds to wait for a server to accept connections.",
+        )
+        parser.add_argument(
+            "--output", help="Write the JSON report to this file."
+        )
+
+    def handle(self, *args, **options):
+        user = BenchmarkCommand().get_user(options["user"])
+        paths = self.get_paths(user)
+        # The servers share this database, so a session stored here logs
+        # them in as well
+        client = Client()
+        client.force_login(user)
+        cookies = {
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value
+        }
+
+        report = {}
+        for server in options["servers"]:
+            with self.run_server(server, options) as base_url:
+                report[server] = {
+                    name: self.measure(base_url + path, cookies, options)
+                    for name, path in paths.items()
+                }
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def get_paths(self, user):
+        result = (
+            TestResult.objects.filter(test_run__project__created_by=user)
+            .order_by("pk")
+            .first()
+        )
+        if result is None:
+            raise CommandError(f"{user} owns no project with test results.")
+        return {
+            "project_detail": reverse(
+                "project_detail", args=[result.test_run.project_id]
+            ),
+            "testrun_detail": reverse(
+                "testrun_detail", args=[result.test_run_id]
+            ),
+            "testresult_list": reverse("testresult_list"),
+        }
+
+    def run_server(self, server, options):
+        port = free_port()
+        arguments, async_views = SERVERS[server]
+        command = [sys.executable] + [
+            argument.format(port=port, workers=options["workers"])
+            for argument in arguments
+        ]
+        env = dict(os.environ, ASYNC_VIEWS=async_views)
+        return ServerProcess(
+            command, env, f"http://127.0.0.1:{port}",
+            options["startup_timeout"],
+        )
+
+    def measure(self, url, cookies, options):
+        local = threading.local()
+
+        def fetch(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+                local.session.cookies.update(cookies)
+            started = time.perf_counter()
+            try:
+                response = local.session.get(url, allow_redirects=False)
+            except requests.RequestException:
+                return None, None
+            return response.status_code, time.perf_counter() - started
+
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            list(executor.map(fetch, range(options["warmup"])))
+            started = time.perf_counter()
+            outcomes = list(executor.map(fetch, range(options["requests"])))
+            elapsed = time.perf_counter() - started
+
+        timings = [
+            duration * 1000 for status, duration in outcomes if status == 200
+        ]
+        if len(timings) < 2:
+            raise CommandError(f"{url}: fewer than two successful requests.")
+        percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "requests_per_second": round(len(timings) / elapsed, 1),
+            "errors": len(outcomes) - len(timings),
+            "p50_ms": round(percentiles[49], 2),
+            "p95_ms": round(percentiles[94], 2),
+        }
+
+
+class ServerProcess:
+    """Run a server command until the ``with`` block ends."""
+
+    def __init__(self, command, env, base_url, timeout):
+        self.command = command
+        self.env = env
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            self.command,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f"{self.command[2]} exited on startup.")
+            try:
+                requests.get(self.base_url + "/login/", timeout=1)
+                return self.base_url
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError(f"{self.command[2]} did not start in time.")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
@@ -1,7 +1,12 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from telebot import TeleBot
-from bug_tracker.models import TelegramUser
+from bug_tracker.notifications import TelegramClient, TelegramError
+from bug_tracker.telegram_updates import (
+    INVALID_TOKEN_MESSAGE,
+    LINKED_MESSAGE,
+    link_chats,
+)
 
 bot = TeleBot(settings.TELEGRAM_BOT_API_KEY, threaded=False)
 
@@ -9,19 +14,48 @@ bot = TeleBot(settings.TELEGRAM_BOT_API_KEY, threaded=False)
 class Command(BaseCommand):
     help = "Implemented to Django application telegram bot setup command"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--set-webhook",
+            metavar="URL",
+            help="Register URL (the telegram_webhook view) with Telegram "
+                 "instead of polling.",
+        )
+        parser.add_argument(
+            "--delete-webhook",
+            action="store_true",
+            help="Remove the registered webhook so polling works again.",
+        )
+
     def handle(self, *args, **kwargs):
+        if kwargs["set_webhook"] or kwargs["delete_webhook"]:
+            return self.configure_webhook(kwargs["set_webhook"])
+
         @bot.message_handler(func=lambda message: True)
         def handle_message(message):
-            chat_id = message.chat.id
-            token = message.text
-
-            try:
-                telegram_user = TelegramUser.objects.get(token=token)
-                telegram_user.chat_id = chat_id
-                telegram_user.save()
-                bot.reply_to(message,
-                             "Chat ID has been associated with your token.")
-            except TelegramUser.DoesNotExist:
-                bot.reply_to(message, "Invalid token. Please try again.")
+            [(_, linked)] = link_chats([(message.chat.id, message.text)])
+            if linked:
+                bot.reply_to(message, LINKED_MESSAGE)
+            else:
+                bot.reply_to(message, INVALID_TOKEN_MESSAGE)
 
         bot.infinity_polling()
+
+    def configure_webhook(self, url):
+        client = TelegramClient()
+        try:
+            if url:
+                if not settings.TELEGRAM_WEBHOOK_SECRET:
+                    raise CommandError(
+                        "Set TELEGRAM_WEBHOOK_SECRET before registering "
+                        "a webhook."
+                    )
+                client.set_webhook(url, settings.TELEGRAM_WEBHOOK_SECRET)
+                self.stdout.write(self.style.SUCCESS(f"Webhook set to {url}"))
+            else:
+                client.delete_webhook()
+                self.stdout.write(self.style.SUCCESS("Webhook deleted"))
+        except TelegramError as error:
+            raise CommandError(str(error))
+        finally:
+            client.close()
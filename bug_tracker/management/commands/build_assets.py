@@ -0,0 +1,74 @@
+from django.contrib.staticfiles.finders import FileSystemFinder
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from bug_tracker.assets import (
+    AssetBuildError,
+    build_bundles,
+    is_collected,
+    read_collect_list,
+)
+
+
+def _change(size, original):
+    if not original:
+        return "-"
+    change = 100 * (1 - size / original)
+    return (f"{change:.0f}% smaller" if change >= 0
+            else f"{-change:.0f}% larger")
+
+
+class Command(BaseCommand):
+    help = ("Compile, bundle and minify the static assets, then collect "
+            "them with fingerprinted names and gzip/brotli variants")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-collect",
+            action="store_true",
+            help="Only build the bundles; skip collectstatic.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            reports = build_bundles()
+        except AssetBuildError as error:
+            raise CommandError(str(error))
+
+        for report in reports:
+            change = _change(report["bundle_bytes"], report["source_bytes"])
+            self.stdout.write(
+                f"{report['name']}: {report['sources']} source(s), "
+                f"{report['source_bytes']:,} -> {report['bundle_bytes']:,} "
+                f"bytes minified ({change}), "
+                f"{report['gzip_bytes']:,} gzip, "
+                f"{report['brotli_bytes']:,} brotli"
+            )
+
+        collect_list = read_collect_list()
+        stripped_files = stripped_bytes = 0
+        for path, storage in FileSystemFinder().list([]):
+            if not is_collected(path, collect_list):
+                stripped_files += 1
+                stripped_bytes += storage.size(path)
+        self.stdout.write(
+            f"Left {stripped_files:,} bundled or unused source files "
+            f"({stripped_bytes:,} bytes) out of the collected assets"
+        )
+
+        if not options["no_collect"]:
+            call_command(
+                "collectstatic", interactive=False, clear=True, verbosity=0
+            )
+
+        totals = {
+            key: sum(report[key] for report in reports)
+            for key in ("source_bytes", "bundle_bytes", "brotli_bytes")
+        }
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Bundled {totals['source_bytes']:,} bytes of sources into "
+                f"{totals['bundle_bytes']:,} bytes, "
+                f"{totals['brotli_bytes']:,} over the wire with brotli."
+            )
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bug_tracker.imports import (
+    IMPORT_FORMATS,
+    ImportFailed,
+    detect_format,
+    import_test_cases,
+    read_rows,
+)
+from bug_tracker.models import Project
+
+
+class Command(BaseCommand):
+    help = "Create or update a project's test cases from a CSV/JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="File format (default: taken from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options["project_id"])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project_id']} not found.")
+        import_format = options["format"] or detect_format(options["path"])
+        if import_format is None:
+            raise CommandError("Cannot tell the file format; pass --format.")
+
+        with open(options["path"], newline="", encoding="utf-8-sig") as file:
+            try:
+                created, updated = import_test_cases(
+                    project,
+                    read_rows(file, import_format),
+                    options["batch_size"],
+                )
+            except ImportFailed as error:
+                raise CommandError("\n".join(error.errors))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} and updated {updated} test cases in "
+                f"{project.title}."
+            )
+        )
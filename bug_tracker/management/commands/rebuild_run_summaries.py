@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bug_tracker.models import TestRun, TestRunSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the per-run TestRunSummary counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "test_run_ids",
+            nargs="*",
+            type=int,
+            help="Only process these test runs (default: all).",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare the counters with the results without changing "
+                 "them; exit with an error if any differ.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        test_run_ids = options["test_run_ids"] or list(
+            TestRun.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        batch_size = options["batch_size"]
+
+        mismatched = []
+        for start in range(0, len(test_run_ids), batch_size):
+            batch = test_run_ids[start:start + batch_size]
+            if options["verify"]:
+                mismatched += self.verify(batch)
+            else:
+                TestRunSummary.objects.rebuild(batch)
+
+        if not options["verify"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Rebuilt summaries for {len(test_run_ids)} test runs."
+                )
+            )
+        elif mismatched:
+            for test_run_id in mismatched:
+                self.stderr.write(f"Test run {test_run_id}: counters differ")
+            raise CommandError(
+                f"{len(mismatched)} of {len(test_run_ids)} summaries are "
+                f"out of date."
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"All {len(test_run_ids)} summaries are up to date."
+                )
+            )
+
+    def verify(self, test_run_ids):
+        counts = TestRunSummary.objects.count_results(test_run_ids)
+        summaries = {
+            summary.test_run_id: summary
+            for summary in TestRunSummary.objects.filter(
+                test_run_id__in=test_run_ids
+            )
+        }
+        mismatched = []
+        for test_run_id in test_run_ids:
+            expected = TestRunSummary.fields_from_counts(counts[test_run_id])
+            summary = summaries.get(test_run_id)
+            actual = summary and dict(summary.counts(), total=summary.total)
+            if actual != expected:
+                mismatched.append(test_run_id)
+        return mismatched
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from bug_tracker.search import repair_sqlite_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the SQLite full-text search triggers and reindex the "
+        "test cases and results"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        recreated = repair_sqlite_index(options["database"], rebuild=True)
+        for name in recreated:
+            self.stdout.write(f"Recreated trigger {name}")
+        self.stdout.write(self.style.SUCCESS("Rebuilt the search index."))
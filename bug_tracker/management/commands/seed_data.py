@@ -0,0 +1,204 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from bug_tracker.models import (
+    Project,
+    TestCase,
+    TestResult,
+    TestRun,
+    TestRunSummary,
+    User,
+)
+
+
+STATUS_WEIGHTS = {
+    TestResult.PASSED: 60,
+    TestResult.FAILED: 15,
+    TestResult.BLOCKED: 5,
+    TestResult.UNTESTED: 20,
+}
+PRIORITY_WEIGHTS = {
+    TestCase.HIGH: 20,
+    TestCase.MEDIUM: 50,
+    TestCase.LOW: 30,
+}
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic dataset for local load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--projects", type=int, default=10)
+        parser.add_argument(
+            "--cases", type=int, default=2000,
+            help="Test cases in total, spread over the projects.",
+        )
+        parser.add_argument(
+            "--runs", type=int, default=50,
+            help="Test runs in total, spread over the projects.",
+        )
+        parser.add_argument(
+            "--results", type=int, default=20000,
+            help="Upper bound on test results in total; a run holds at "
+                 "most one result per case of its project.",
+        )
+        parser.add_argument(
+            "--share", type=int, default=3,
+            help="Users each project is shared with.",
+        )
+        parser.add_argument("--prefix", default="seed")
+        parser.add_argument("--password", default="seedpass123")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["projects"] < 1:
+            raise CommandError("At least one user and project are needed.")
+        if User.objects.filter(
+            username__startswith=f"{options['prefix']}_user_"
+        ).exists():
+            raise CommandError(
+                f"Users with prefix {options['prefix']!r} already exist; "
+                f"pass another --prefix."
+            )
+
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        with transaction.atomic():
+            users = self.create_users(options)
+            projects = self.create_projects(options, users)
+            cases = self.create_cases(options, projects)
+            runs = self.create_runs(options, projects)
+            result_count = self.create_results(options, runs, cases)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(users)} users, {len(projects)} projects, "
+                f"{sum(map(len, cases.values()))} test cases, {len(runs)} "
+                f"test runs and {result_count} test results. Log in as "
+                f"{users[0].username} / {options['password']}."
+            )
+        )
+
+    def create_users(self, options):
+        password = make_password(options["password"])
+        return User.objects.bulk_create(
+            [
+                User(
+                    username=f"{options['prefix']}_user_{number}",
+                    email=f"{options['prefix']}_user_{number}@example.com",
+                    password=password,
+                )
+                for number in range(options["users"])
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_projects(self, options, users):
+        projects = Project.objects.bulk_create(
+            [
+                Project(
+                    title=f"Project {number}",
+                    description="Synthetic project",
+                    # The first user owns the first project so the printed
+                    # login always has data to look at
+                    created_by=users[0] if number == 0
+                    else self.random.choice(users),
+                )
+                for number in range(options["projects"])
+            ],
+            batch_size=self.batch_size,
+        )
+
+        Membership = Project.shared_with.through
+        memberships = []
+        for project in projects:
+            candidates = [
+                user for user in users if user.pk != project.created_by_id
+            ]
+            share = min(options["share"], len(candidates))
+            memberships += [
+                Membership(project_id=project.pk, user_id=user.pk)
+                for user in self.random.sample(candidates, share)
+            ]
+        Membership.objects.bulk_create(
+            memberships, batch_size=self.batch_size
+        )
+        return projects
+
+    def create_cases(self, options, projects):
+        priorities = list(PRIORITY_WEIGHTS)
+        weights = list(PRIORITY_WEIGHTS.values())
+        created = TestCase.objects.bulk_create(
+            [
+                TestCase(
+                    title=f"Test case {number}",
+                    description="Synthetic test case",
+                    steps="1. Open the page\n2. Check the result",
+                    expected_result="It works",
+                    priority=self.random.choices(priorities, weights)[0],
+                    project=projects[number % len(projects)],
+                )
+                for number in range(options["cases"])
+            ],
+            batch_size=self.batch_size,
+        )
+        cases = {project.pk: [] for project in projects}
+        for case in created:
+            cases[case.project_id].append(case.pk)
+        return cases
+
+    def create_runs(self, options, projects):
+        now = timezone.now()
+        return TestRun.objects.bulk_create(
+            [
+                TestRun(
+                    title=f"Test run {number}",
+                    description="Synthetic test run",
+                    deadline=now + timedelta(
+                        days=self.random.randint(-30, 30)
+                    ),
+                    project=projects[number % len(projects)],
+                )
+                for number in range(options["runs"])
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_results(self, options, runs, cases):
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+        per_run = options["results"] // max(len(runs), 1)
+        remainder = options["results"] - per_run * len(runs)
+
+        created = 0
+        batch = []
+        for number, run in enumerate(runs):
+            project_cases = cases[run.project_id]
+            wanted = per_run + (1 if number < remainder else 0)
+            for case_id in self.random.sample(
+                project_cases, min(wanted, len(project_cases))
+            ):
+                batch.append(
+                    TestResult(
+                        test_run_id=run.pk,
+                        test_case_id=case_id,
+                        status=self.random.choices(statuses, weights)[0],
+                    )
+                )
+            if len(batch) >= self.batch_size:
+                created += len(TestResult.objects.bulk_create(batch))
+                batch = []
+        created += len(TestResult.objects.bulk_create(batch))
+
+        # bulk_create skips the signal that gives runs a summary row; runs
+        # without results still need one
+        TestRunSummary.objects.rebuild(run.pk for run in runs)
+        return created
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bug_tracker.notifications import NotificationWorker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued Telegram notifications from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the outbox has nothing due.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Deliver a single batch and exit.",
+        )
+
+    def handle(self, *args, **options):
+        worker = NotificationWorker(batch_size=options["batch_size"])
+        try:
+            while True:
+                sent, failed, deferred = worker.run_once()
+                if sent or failed:
+                    self.stdout.write(
+                        f"Sent {sent}, failed {failed}, deferred {deferred}"
+                    )
+                if options["once"]:
+                    break
+                if not (sent or failed):
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.client.close()
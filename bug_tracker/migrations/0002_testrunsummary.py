@@ -0,0 +1,63 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def populate_summaries(apps, schema_editor):
+    TestRun = apps.get_model("bug_tracker", "TestRun")
+    TestResult = apps.get_model("bug_tracker", "TestResult")
+    TestRunSummary = apps.get_model("bug_tracker", "TestRunSummary")
+
+    summaries = {
+        pk: TestRunSummary(test_run_id=pk)
+        for pk in TestRun.objects.values_list("pk", flat=True)
+    }
+    rows = (
+        TestResult.objects.values_list("test_run_id", "status")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for test_run_id, status, count in rows:
+        summary = summaries[test_run_id]
+        setattr(summary, status, count)
+        summary.total += count
+    TestRunSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bug_tracker", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestRunSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("passed", models.IntegerField(default=0)),
+                ("failed", models.IntegerField(default=0)),
+                ("blocked", models.IntegerField(default=0)),
+                ("untested", models.IntegerField(default=0)),
+                ("total", models.IntegerField(default=0)),
+                (
+                    "test_run",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="summary",
+                        to="bug_tracker.testrun",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
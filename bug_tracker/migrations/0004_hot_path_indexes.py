@@ -0,0 +1,74 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:15
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_results(apps, schema_editor):
+    """Keep the oldest result of each (test_run, test_case) pair."""
+    TestResult = apps.get_model("bug_tracker", "TestResult")
+    TestRunSummary = apps.get_model("bug_tracker", "TestRunSummary")
+
+    duplicates = (
+        TestResult.objects.values("test_run_id", "test_case_id")
+        .annotate(keep=Min("id"), count=Count("id"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    test_run_ids = set()
+    for duplicate in duplicates:
+        TestResult.objects.filter(
+            test_run_id=duplicate["test_run_id"],
+            test_case_id=duplicate["test_case_id"],
+        ).exclude(id=duplicate["keep"]).delete()
+        test_run_ids.add(duplicate["test_run_id"])
+
+    for summary in TestRunSummary.objects.filter(
+        test_run_id__in=test_run_ids
+    ):
+        counts = dict(
+            TestResult.objects.filter(test_run_id=summary.test_run_id)
+            .values_list("status")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for status in ("passed", "failed", "blocked", "untested"):
+            setattr(summary, status, counts.get(status, 0))
+        summary.total = sum(counts.values())
+        summary.save()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bug_tracker", "0003_telegramnotification"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testcase",
+            index=models.Index(
+                fields=["project", "priority"], name="testcase_project_priority_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["test_run", "status"], name="testresult_run_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testresult",
+            index=models.Index(
+                fields=["timestamp", "id"], name="testresult_timestamp_id_idx"
+            ),
+        ),
+        migrations.RunPython(
+            remove_duplicate_results, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="testresult",
+            constraint=models.UniqueConstraint(
+                fields=("test_run", "test_case"), name="unique_testresult_run_case"
+            ),
+        ),
+    ]
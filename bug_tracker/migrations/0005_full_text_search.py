@@ -0,0 +1,146 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:05
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE bug_tracker_testcase_fts USING fts5(
+        title, description, steps, expected_result,
+        content='bug_tracker_testcase', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER bug_tracker_testcase_fts_insert
+    AFTER INSERT ON bug_tracker_testcase BEGIN
+        INSERT INTO bug_tracker_testcase_fts(
+            rowid, title, description, steps, expected_result
+        ) VALUES (
+            new.id, new.title, new.description, new.steps,
+            new.expected_result
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER bug_tracker_testcase_fts_delete
+    AFTER DELETE ON bug_tracker_testcase BEGIN
+        INSERT INTO bug_tracker_testcase_fts(
+            bug_tracker_testcase_fts, rowid, title, description, steps,
+            expected_result
+        ) VALUES (
+            'delete', old.id, old.title, old.description, old.steps,
+            old.expected_result
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER bug_tracker_testcase_fts_update
+    AFTER UPDATE OF title, description, steps, expected_result
+    ON bug_tracker_testcase BEGIN
+        INSERT INTO bug_tracker_testcase_fts(
+            bug_tracker_testcase_fts, rowid, title, description, steps,
+            expected_result
+        ) VALUES (
+            'delete', old.id, old.title, old.description, old.steps,
+            old.expected_result
+        );
+        INSERT INTO bug_tracker_testcase_fts(
+            rowid, title, description, steps, expected_result
+        ) VALUES (
+            new.id, new.title, new.description, new.steps,
+            new.expected_result
+        );
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE bug_tracker_testresult_fts USING fts5(
+        actual_result,
+        content='bug_tracker_testresult', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER bug_tracker_testresult_fts_insert
+    AFTER INSERT ON bug_tracker_testresult BEGIN
+        INSERT INTO bug_tracker_testresult_fts(rowid, actual_result)
+        VALUES (new.id, new.actual_result);
+    END
+    """,
+    """
+    CREATE TRIGGER bug_tracker_testresult_fts_delete
+    AFTER DELETE ON bug_tracker_testresult BEGIN
+        INSERT INTO bug_tracker_testresult_fts(
+            bug_tracker_testresult_fts, rowid, actual_result
+        ) VALUES ('delete', old.id, old.actual_result);
+    END
+    """,
+    """
+    CREATE TRIGGER bug_tracker_testresult_fts_update
+    AFTER UPDATE OF actual_result ON bug_tracker_testresult BEGIN
+        INSERT INTO bug_tracker_testresult_fts(
+            bug_tracker_testresult_fts, rowid, actual_result
+        ) VALUES ('delete', old.id, old.actual_result);
+        INSERT INTO bug_tracker_testresult_fts(rowid, actual_result)
+        VALUES (new.id, new.actual_result);
+    END
+    """,
+    # Index the rows that already exist
+    "INSERT INTO bug_tracker_testcase_fts(bug_tracker_testcase_fts) "
+    "VALUES ('rebuild')",
+    "INSERT INTO bug_tracker_testresult_fts(bug_tracker_testresult_fts) "
+    "VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE bug_tracker_testcase_fts",
+    "DROP TABLE bug_tracker_testresult_fts",
+    "DROP TRIGGER bug_tracker_testcase_fts_insert",
+    "DROP TRIGGER bug_tracker_testcase_fts_delete",
+    "DROP TRIGGER bug_tracker_testcase_fts_update",
+    "DROP TRIGGER bug_tracker_testresult_fts_insert",
+    "DROP TRIGGER bug_tracker_testresult_fts_delete",
+    "DROP TRIGGER bug_tracker_testresult_fts_update",
+]
+# Expression indexes need no triggers: PostgreSQL maintains them on write.
+# bug_tracker.search must query with exactly the same expressions.
+POSTGRES_CASE_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(steps, '') || ' ' || "
+    "coalesce(expected_result, ''))"
+)
+POSTGRES_RESULT_DOCUMENT = "to_tsvector('english', actual_result)"
+POSTGRES_FORWARD = [
+    f"CREATE INDEX bug_tracker_testcase_search_idx "
+    f"ON bug_tracker_testcase USING gin (({POSTGRES_CASE_DOCUMENT}))",
+    f"CREATE INDEX bug_tracker_testresult_search_idx "
+    f"ON bug_tracker_testresult USING gin (({POSTGRES_RESULT_DOCUMENT}))",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX bug_tracker_testcase_search_idx",
+    "DROP INDEX bug_tracker_testresult_search_idx",
+]
+
+
+def run_for_vendor(sqlite, postgresql):
+    def run(apps, schema_editor):
+        statements = {"sqlite": sqlite, "postgresql": postgresql}.get(
+            schema_editor.connection.vendor, []
+        )
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bug_tracker", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(SQLITE_FORWARD, POSTGRES_FORWARD),
+            run_for_vendor(SQLITE_BACKWARD, POSTGRES_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def record_current_results(apps, schema_editor):
+    """Start every existing result's history with its current outcome."""
+    TestResult = apps.get_model("bug_tracker", "TestResult")
+    TestResultHistory = apps.get_model("bug_tracker", "TestResultHistory")
+    batch = []
+    for result in TestResult.objects.order_by("pk").iterator(chunk_size=2000):
+        batch.append(
+            TestResultHistory(
+                test_result_id=result.pk,
+                test_run_id=result.test_run_id,
+                test_case_id=result.test_case_id,
+                status=result.status,
+                actual_result=result.actual_result,
+                timestamp=result.timestamp,
+            )
+        )
+        if len(batch) >= 2000:
+            TestResultHistory.objects.bulk_create(batch)
+            batch = []
+    TestResultHistory.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bug_tracker", "0005_full_text_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestResultHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("passed", "Passed"),
+                            ("failed", "Failed"),
+                            ("blocked", "Blocked"),
+                            ("untested", "Untested"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("actual_result", models.TextField(blank=True)),
+                (
+                    "timestamp",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "test_case",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="result_history",
+                        to="bug_tracker.testcase",
+                    ),
+                ),
+                (
+                    "test_result",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="history",
+                        to="bug_tracker.testresult",
+                    ),
+                ),
+                (
+                    "test_run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="result_history",
+                        to="bug_tracker.testrun",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["test_case", "timestamp"],
+                        name="history_case_timestamp_idx",
+                    ),
+                    models.Index(
+                        fields=["test_run", "timestamp"],
+                        name="history_run_timestamp_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(
+            record_current_results, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bug_tracker", "0006_result_history"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="telegramnotification",
+            name="summary",
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bug_tracker", "0007_telegramnotification_summary"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="testresulthistory",
+            name="test_result",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="history",
+                to="bug_tracker.testresult",
+            ),
+        ),
+    ]
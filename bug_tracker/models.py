@@ -1,5 +1,14 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.dispatch import Signal
+from django.utils import timezone
+
+
+# Sent by TestResultQuerySet.update() and bulk_create(), which bypass the
+# per-row model signals, with the ids of every test run they touched and of
+# the results they changed (None when those are unknown)
+results_bulk_changed = Signal()
 
 
 # Create your models here.
@@ -15,6 +24,42 @@ class TelegramUser(models.Model):
     token = models.CharField(max_length=255, unique=True)
 
 
+class TelegramNotification(models.Model):
+    """Outbox row for a Telegram message waiting to be delivered.
+
+    Rows are written in the same transaction as the change they report and
+    drained by the ``send_notifications`` management command.
+    """
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+    chat_id = models.BigIntegerField()
+    text = models.TextField()
+    # One-line stand-in for ``text`` in a digest; empty for messages that
+    # are never coalesced
+    summary = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"Notification to chat {self.chat_id} ({self.status})"
+
+
 class Project(models.Model):
     title = models.CharField(max_length=255, null=False)
     description = models.TextField(null=True, blank=True)
@@ -44,6 +89,14 @@ class TestCase(models.Model):
     )
     project = models.ForeignKey(to=Project, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "priority"],
+                name="testcase_project_priority_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -63,6 +116,98 @@ class TestRun(models.Model):
         return self.title
 
 
+class TestResultQuerySet(models.QuerySet):
+    """Keeps TestRunSummary counters in sync for bulk operations.
+
+    Single-row saves and deletes are handled by the signals in
+    ``bug_tracker.signals``; ``update()`` and ``bulk_create()`` bypass those,
+    so they recount the summaries of every run they touch instead.
+    """
+
+    SUMMARY_FIELDS = {"status", "test_run", "test_run_id"}
+    HISTORY_FIELDS = {"status", "actual_result"}
+
+    def update(self, **kwargs):
+        if not (self.SUMMARY_FIELDS | self.HISTORY_FIELDS) & kwargs.keys():
+            return super().update(**kwargs)
+        # Like TestResultUpdateView, a new status is a new result
+        kwargs.setdefault("timestamp", timezone.now())
+
+        with transaction.atomic(using=self.db):
+            rows = list(self.values_list("pk", "test_run_id"))
+            updated = super().update(**kwargs)
+            test_run_ids = {test_run_id for _, test_run_id in rows}
+            test_run = kwargs.get("test_run", kwargs.get("test_run_id"))
+            if test_run is not None:
+                test_run_ids.add(getattr(test_run, "pk", test_run))
+            TestRunSummary.objects.rebuild(test_run_ids)
+            TestResultHistory.objects.record_ids(
+                [pk for pk, _ in rows], using=self.db
+            )
+        results_bulk_changed.send(
+            sender=self.model,
+            test_run_ids=test_run_ids,
+            result_ids=[pk for pk, _ in rows],
+        )
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            test_run_ids = {obj.test_run_id for obj in objs}
+            TestRunSummary.objects.rebuild(test_run_ids)
+            # With ignore_conflicts the inserted rows are unknown; that is
+            # only used to add untested placeholders, which have no outcome
+            # worth recording yet
+            TestResultHistory.objects.record(
+                [obj for obj in objs if obj.pk is not None], using=self.db
+            )
+        result_ids = [obj.pk for obj in objs]
+        results_bulk_changed.send(
+            sender=self.model,
+            test_run_ids=test_run_ids,
+            # Rows skipped by ignore_conflicts, and on some databases the
+            # inserted ones, come back without a primary key
+            result_ids=None if None in result_ids else result_ids,
+        )
+        return objs
+
+    def add_test_cases(self, test_run, test_cases, batch_size=1000):
+        """Add every case of ``test_cases`` to ``test_run`` in bulk.
+
+        ``test_cases`` is a TestCase queryset. It is narrowed to the run's
+        project with a single query that also flags the cases already in
+        the run; those are skipped and the rest are inserted in batches.
+        Returns ``(added, matched)``, where ``matched`` counts every case of
+        the run's project that ``test_cases`` selected.
+        """
+        rows = (
+            test_cases.filter(project_id=test_run.project_id)
+            .annotate(
+                in_run=Exists(
+                    self.model.objects.filter(
+                        test_run=test_run, test_case=OuterRef("pk")
+                    )
+                )
+            )
+            .values_list("pk", "in_run")
+        )
+        matched = 0
+        new_results = []
+        for test_case_id, in_run in rows:
+            matched += 1
+            if not in_run:
+                new_results.append(
+                    self.model(test_run=test_run, test_case_id=test_case_id)
+                )
+        # A concurrent request may add the same case first; the unique
+        # constraint on (test_run, test_case) makes that a no-op
+        self.bulk_create(
+            new_results, batch_size=batch_size, ignore_conflicts=True
+        )
+        return len(new_results), matched
+
+
 class TestResult(models.Model):
     PASSED = "passed"
     FAILED = "failed"
@@ -86,5 +231,248 @@ class TestResult(models.Model):
     actual_result = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True, blank=True)
 
+    objects = TestResultQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["test_run", "test_case"],
+                name="unique_testresult_run_case",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["test_run", "status"],
+                name="testresult_run_status_idx",
+            ),
+            models.Index(
+                fields=["timestamp", "id"],
+                name="testresult_timestamp_id_idx",
+            ),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.remember_summary_state()
+
+    def remember_summary_state(self):
+        # Read through __dict__ so deferred fields are not loaded
+        self._original_status = self.__dict__.get("status")
+        self._original_test_run_id = self.__dict__.get("test_run_id")
+        self._original_actual_result = self.__dict__.get("actual_result")
+
+    def _lock_summary_state(self, using):
+        # Another request may have changed the row since it was loaded here;
+        # the summary deltas must start from what is stored now, and the
+        # lock keeps it that way until the delta is applied.
+        current = (
+            TestResult.objects.using(using)
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values_list("status", "test_run_id")
+            .first()
+        )
+        if current is not None:
+            self._original_status, self._original_test_run_id = current
+
+    def save(self, *args, **kwargs):
+        """Save, with the row locked until the summary signals have run."""
+        using = kwargs.get("using") or router.db_for_write(
+            TestResult, instance=self
+        )
+        with transaction.atomic(using=using):
+            if not self._state.adding and self.pk is not None:
+                self._lock_summary_state(using)
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(
+            TestResult, instance=self
+        )
+        with transaction.atomic(using=using):
+            self._lock_summary_state(using)
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"Result for {self.test_case.title} test case"
+
+
+class TestResultHistoryQuerySet(models.QuerySet):
+    def record(self, test_results, using=None):
+        """Append the current outcome of each of ``test_results``."""
+        return self.using(using or self.db).bulk_create(
+            [
+                self.model(
+                    test_result_id=test_result.pk,
+                    test_run_id=test_result.test_run_id,
+                    test_case_id=test_result.test_case_id,
+                    status=test_result.status,
+                    actual_result=test_result.actual_result,
+                    timestamp=test_result.timestamp,
+                )
+                for test_result in test_results
+            ]
+        )
+
+    def record_ids(self, test_result_ids, using=None, batch_size=500):
+        """Like ``record()``, reading the results by primary key."""
+        results = TestResult.objects.using(using or self.db).only(
+            "test_run_id", "test_case_id", "status", "actual_result",
+            "timestamp",
+        )
+        for start in range(0, len(test_result_ids), batch_size):
+            batch = test_result_ids[start:start + batch_size]
+            self.record(results.filter(pk__in=batch), using=using)
+
+    def for_case(self, test_case):
+        """Status timeline of ``test_case`` across runs, newest first."""
+        return self.filter(test_case=test_case).order_by("-timestamp")
+
+    def for_run(self, test_run, since=None):
+        """Changes recorded in ``test_run``, newest first."""
+        queryset = self.filter(test_run=test_run)
+        if since is not None:
+            queryset = queryset.filter(timestamp__gte=since)
+        return queryset.order_by("-timestamp")
+
+
+class TestResultHistory(models.Model):
+    """Append-only log of every outcome written to a TestResult.
+
+    A row is added when a result is created and whenever its status or
+    actual result changes, by the signals in ``bug_tracker.signals`` and
+    by TestResultQuerySet's bulk paths. Rows are never updated, except that
+    deleting a result only clears ``test_result``: its run and case still
+    identify the row.
+    """
+
+    test_result = models.ForeignKey(
+        TestResult,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="history",
+    )
+    test_run = models.ForeignKey(
+        TestRun, on_delete=models.CASCADE, related_name="result_history"
+    )
+    test_case = models.ForeignKey(
+        TestCase, on_delete=models.CASCADE, related_name="result_history"
+    )
+    status = models.CharField(
+        max_length=10, choices=TestResult.STATUS_CHOICES
+    )
+    actual_result = models.TextField(blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    objects = TestResultHistoryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["test_case", "timestamp"],
+                name="history_case_timestamp_idx",
+            ),
+            models.Index(
+                fields=["test_run", "timestamp"],
+                name="history_run_timestamp_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status} at {self.timestamp}"
+
+
+class TestRunSummaryManager(models.Manager):
+    def apply_delta(self, test_run_id, removed=None, added=None):
+        """Move one result out of status ``removed`` and into ``added``.
+
+        The counters are changed with a single ``UPDATE ... SET x = x + 1``,
+        so concurrent writers never lose increments. A missing summary row
+        is recounted from scratch when a result is added; removals alone
+        leave it missing, since the run may be in the middle of a cascade
+        delete.
+        """
+        changes = {}
+        total = 0
+        if removed:
+            changes[removed] = F(removed) - 1
+            total -= 1
+        if added:
+            changes[added] = F(added) + 1
+            total += 1
+        if not changes:
+            return
+        if total:
+            changes["total"] = F("total") + total
+        updated = self.filter(test_run_id=test_run_id).update(**changes)
+        if not updated and added:
+            self.rebuild([test_run_id])
+
+    def count_results(self, test_run_ids):
+        counts = {test_run_id: {} for test_run_id in test_run_ids}
+        rows = (
+            TestResult.objects.filter(test_run_id__in=counts)
+            .values_list("test_run_id", "status")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for test_run_id, status, count in rows:
+            counts[test_run_id][status] = count
+        return counts
+
+    def rebuild(self, test_run_ids):
+        """Recount the summaries of ``test_run_ids`` from TestResult rows."""
+        test_run_ids = set(test_run_ids)
+        if not test_run_ids:
+            return []
+
+        with transaction.atomic(using=self.db):
+            existing = list(
+                TestRun.objects.select_for_update()
+                .filter(pk__in=test_run_ids)
+                .values_list("pk", flat=True)
+            )
+            counts = self.count_results(existing)
+            summaries = []
+            for test_run_id in existing:
+                summary, _ = self.update_or_create(
+                    test_run_id=test_run_id,
+                    defaults=TestRunSummary.fields_from_counts(
+                        counts[test_run_id]
+                    ),
+                )
+                summaries.append(summary)
+        return summaries
+
+
+class TestRunSummary(models.Model):
+    """Denormalized per-status result counters of a test run."""
+
+    test_run = models.OneToOneField(
+        TestRun, on_delete=models.CASCADE, related_name="summary"
+    )
+    passed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    blocked = models.IntegerField(default=0)
+    untested = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+
+    objects = TestRunSummaryManager()
+
+    @staticmethod
+    def fields_from_counts(counts):
+        fields = {
+            status: counts.get(status, 0)
+            for status, _ in TestResult.STATUS_CHOICES
+        }
+        fields["total"] = sum(fields.values())
+        return fields
+
+    def counts(self):
+        return {
+            status: getattr(self, status)
+            for status, _ in TestResult.STATUS_CHOICES
+        }
+
+    def __str__(self):
+        return f"Summary for {self.test_run.title} test run"
@@ -0,0 +1,379 @@
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import TelegramNotification, TelegramUser, TestResult
+
+
+logger = logging.getLogger(__name__)
+
+# Longest text the Bot API accepts in one message
+MESSAGE_LIMIT = 4096
+
+
+class TelegramError(Exception):
+    def __init__(self, description, retry_after=None, permanent=False):
+        super().__init__(description)
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+def truncate_message(text):
+    """Cut ``text`` to what fits into one Telegram message.
+
+    Longer texts are rejected by the Bot API for good, so the alert would
+    never arrive at all.
+    """
+    if len(text) <= MESSAGE_LIMIT:
+        return text
+    return text[:MESSAGE_LIMIT - 1] + "…"
+
+
+def build_result_message(test_result):
+    test_case = test_result.test_case
+    project = test_case.project
+
+    test_case_details = f"Test case: {test_case.title}\n\n"
+    test_case_details += f"Description: {test_case.description}\n"
+    test_case_details += f"Steps:\n {test_case.steps}\n"
+    test_case_details += (f"Expected Result: "
+                          f"{test_case.expected_result}\n\n")
+    test_case_details += f"Project: {project.title}\n"
+    test_case_details += f"Description: {project.description}\n"
+
+    return (f"Test case: {test_case.title}\n"
+            f"\nTest status: {test_result.status}"
+            f"\nActual Result: {test_result.actual_result}\n "
+            f"\n{test_case_details}")
+
+
+def build_bulk_result_message(test_run, status, test_case_titles, count,
+                              actual_result=None):
+    listed = "".join(f"- {title}\n" for title in test_case_titles)
+    if count > len(test_case_titles):
+        listed += f"... and {count - len(test_case_titles)} more\n"
+    message = (f"Test run: {test_run.title}\n"
+               f"Project: {test_run.project.title}\n"
+               f"\n{count} test results set to {status}\n")
+    if actual_result:
+        message += f"Actual Result: {actual_result}\n"
+    return f"{message}\n{listed}"
+
+
+def build_digest_message(summaries):
+    listed = "".join(f"- {summary}\n" for summary in summaries)
+    return f"{len(summaries)} test result alerts:\n\n{listed}"
+
+
+def enqueue_notification(chat_id, text):
+    return TelegramNotification.objects.create(
+        chat_id=chat_id, text=truncate_message(text)
+    )
+
+
+def digest_due_at(now=None):
+    """End of the digest window ``now`` falls in.
+
+    Windows are aligned to multiples of ``TELEGRAM_DIGEST_WINDOW`` seconds,
+    so every alert queued for a chat within one window becomes due at the
+    same moment and goes out in one message.
+    """
+    now = now or timezone.now()
+    window = settings.TELEGRAM_DIGEST_WINDOW
+    if not window:
+        return now
+    return datetime.fromtimestamp(
+        math.ceil(now.timestamp() / window) * window, tz=dt_timezone.utc
+    )
+
+
+def project_chat_ids(project):
+    """Chats of the owner and the members of ``project``, in one query."""
+    return list(
+        TelegramUser.objects.filter(
+            Q(user_id=project.created_by_id) | Q(user__users=project),
+            chat_id__isnull=False,
+        )
+        .values_list("chat_id", flat=True)
+        .distinct()
+    )
+
+
+def enqueue_alert(project, text, summary):
+    """Queue ``text`` for every chat of ``project``.
+
+    The rows become due at the end of the current digest window;
+    ``summary`` is the line that stands for the alert in a digest.
+    """
+    next_attempt_at = digest_due_at()
+    text = truncate_message(text)
+    return TelegramNotification.objects.bulk_create(
+        TelegramNotification(
+            chat_id=chat_id,
+            text=text,
+            summary=summary,
+            next_attempt_at=next_attempt_at,
+        )
+        for chat_id in project_chat_ids(project)
+    )
+
+
+def notify_result_changed(test_result):
+    """Alert the project of a non-passing ``test_result``.
+
+    Must be called inside the transaction that saves the result, so the
+    notifications are stored if and only if the change is committed.
+    """
+    if test_result.status == TestResult.PASSED:
+        return []
+    test_result = TestResult.objects.select_related(
+        "test_case__project", "test_run"
+    ).get(pk=test_result.pk)
+    project = test_result.test_case.project
+    return enqueue_alert(
+        project,
+        build_result_message(test_result),
+        f"{test_result.test_case.title}: {test_result.status} "
+        f"({test_result.test_run.title}, {project.title})",
+    )
+
+
+def notify_results_changed(test_run, test_results, status,
+                           actual_result=None, listed=20):
+    """Alert the project of a bulk status change in ``test_run``.
+
+    ``test_results`` is the queryset of the updated results. Like
+    ``notify_result_changed()``, it must run inside the updating
+    transaction and ignores results set to passed.
+    """
+    if status == TestResult.PASSED:
+        return []
+    count = test_results.count()
+    if not count:
+        return []
+    titles = list(
+        test_results.order_by("pk").values_list(
+            "test_case__title", flat=True
+        )[:listed]
+    )
+    return enqueue_alert(
+        test_run.project,
+        build_bulk_result_message(
+            test_run, status, titles, count, actual_result
+        ),
+        f"{count} test results set to {status} "
+        f"({test_run.title}, {test_run.project.title})",
+    )
+
+
+class TelegramClient:
+    """Minimal Bot API client that reuses one HTTP session."""
+
+    def __init__(self, token=None, api_url=None, timeout=10):
+        self.token = token or settings.TELEGRAM_BOT_API_KEY
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def call(self, method, **params):
+        url = f"{self.api_url}/bot{self.token}/{method}"
+        try:
+            response = self.session.post(
+                url, json=params, timeout=self.timeout
+            )
+        except requests.RequestException as error:
+            raise TelegramError(str(error))
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.status_code == 200 and payload.get("ok"):
+            return payload.get("result")
+
+        description = payload.get(
+            "description", f"HTTP {response.status_code}"
+        )
+        retry_after = payload.get("parameters", {}).get("retry_after")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TelegramError(description, retry_after=retry_after)
+        raise TelegramError(description, permanent=True)
+
+    def send_message(self, chat_id, text):
+        return self.call("sendMessage", chat_id=chat_id, text=text)
+
+    def set_webhook(self, url, secret_token):
+        return self.call(
+            "setWebhook",
+            url=url,
+            secret_token=secret_token,
+            allowed_updates=["message", "edited_message"],
+        )
+
+    def delete_webhook(self):
+        return self.call("deleteWebhook")
+
+    def close(self):
+        self.session.close()
+
+
+class NotificationWorker:
+    """Drains the TelegramNotification outbox in batches.
+
+    Each batch is claimed by pushing ``next_attempt_at`` forward by
+    ``lease`` seconds, so several workers can run at once and a crashed
+    worker's rows become due again once the lease expires. Alerts due for
+    the same chat are coalesced into digests, messages to the same chat
+    are spaced at least ``chat_interval`` seconds apart, and failures are
+    retried with exponential backoff up to ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        batch_size=100,
+        max_attempts=None,
+        chat_interval=None,
+        lease=60,
+        backoff=5,
+        max_backoff=3600,
+    ):
+        self.client = client or TelegramClient()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts or settings.TELEGRAM_MAX_ATTEMPTS
+        self.chat_interval = (
+            settings.TELEGRAM_CHAT_INTERVAL
+            if chat_interval is None
+            else chat_interval
+        )
+        self.lease = lease
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.last_sent = {}
+
+    def claim_batch(self):
+        now = timezone.now()
+        with transaction.atomic():
+            queryset = TelegramNotification.objects.filter(
+                status=TelegramNotification.PENDING, next_attempt_at__lte=now
+            ).order_by("next_attempt_at", "id")
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            batch = list(queryset[:self.batch_size])
+            TelegramNotification.objects.filter(
+                pk__in=[notification.pk for notification in batch]
+            ).update(next_attempt_at=now + timedelta(seconds=self.lease))
+        return batch
+
+    def cooldown(self, chat_id):
+        last_sent = self.last_sent.get(chat_id)
+        if last_sent is None:
+            return 0
+        return max(0, last_sent + self.chat_interval - time.monotonic())
+
+    def deliver(self, chat_id, notifications):
+        """Send ``notifications`` to ``chat_id`` as one message."""
+        if len(notifications) == 1:
+            text = notifications[0].text
+        else:
+            text = build_digest_message(
+                [notification.summary for notification in notifications]
+            )
+        try:
+            self.client.send_message(chat_id, text)
+        except TelegramError as error:
+            for notification in notifications:
+                self.record_failure(notification, error)
+            return False
+        finally:
+            self.last_sent[chat_id] = time.monotonic()
+
+        TelegramNotification.objects.filter(
+            pk__in=[notification.pk for notification in notifications]
+        ).update(
+            status=TelegramNotification.SENT,
+            attempts=F("attempts") + 1,
+            sent_at=timezone.now(),
+            last_error="",
+        )
+        return True
+
+    def defer(self, notifications, delay):
+        TelegramNotification.objects.filter(
+            pk__in=[notification.pk for notification in notifications]
+        ).update(next_attempt_at=timezone.now() + timedelta(seconds=delay))
+
+    def next_message(self, notifications):
+        """Split a chat's due ``notifications`` into the next message's
+        share and the rest.
+
+        Alerts are coalesced into a digest as long as it fits into one
+        Telegram message; other notifications are sent on their own.
+        """
+        first, *others = notifications
+        message = [first]
+        if first.summary:
+            for notification in others:
+                if not notification.summary or len(build_digest_message(
+                    [alert.summary for alert in message + [notification]]
+                )) > MESSAGE_LIMIT:
+                    break
+                message.append(notification)
+        return message, notifications[len(message):]
+
+    def record_failure(self, notification, error):
+        attempts = notification.attempts + 1
+        changes = {"attempts": attempts, "last_error": str(error)}
+        if error.permanent or attempts >= self.max_attempts:
+            changes["status"] = TelegramNotification.FAILED
+            logger.warning(
+                "Giving up on notification %s after %s attempts: %s",
+                notification.pk, attempts, error,
+            )
+        else:
+            delay = error.retry_after or min(
+                self.backoff * 2 ** (attempts - 1), self.max_backoff
+            )
+            changes["next_attempt_at"] = (
+                timezone.now() + timedelta(seconds=delay)
+            )
+        TelegramNotification.objects.filter(pk=notification.pk).update(
+            **changes
+        )
+        return False
+
+    def run_once(self):
+        """Process one batch; return ``(sent, failed, deferred)`` counts.
+
+        Each chat gets at most one message per batch, a digest when several
+        of its alerts are due; the rest of its notifications, and those of
+        a chat still cooling down, are pushed back instead of blocking the
+        rest of the batch.
+        """
+        sent = failed = deferred = 0
+        by_chat = {}
+        for notification in self.claim_batch():
+            by_chat.setdefault(notification.chat_id, []).append(notification)
+        for chat_id, notifications in by_chat.items():
+            delay = self.cooldown(chat_id)
+            if delay:
+                self.defer(notifications, delay)
+                deferred += len(notifications)
+                continue
+            message, rest = self.next_message(notifications)
+            if rest:
+                self.defer(rest, self.chat_interval)
+                deferred += len(rest)
+            if self.deliver(chat_id, message):
+                sent += len(message)
+            else:
+                failed += len(message)
+        return sent, failed, deferred
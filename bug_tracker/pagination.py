@@ -0,0 +1,198 @@
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+
+
+def encode_cursor(values):
+    data = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except ValueError:
+        raise Http404("Invalid page cursor.")
+    if not isinstance(values, list):
+        raise Http404("Invalid page cursor.")
+    return values
+
+
+def estimate_count(queryset):
+    """Return the planner's row estimate for ``queryset``, if available.
+
+    Only PostgreSQL exposes a cheap estimate; other backends return None.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class KeysetPage:
+    def __init__(self, object_list, request, cursor_param, next_cursor,
+                 previous_cursor, total_count=None, count_is_exact=False):
+        self.object_list = object_list
+        self.request = request
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total_count = total_count
+        self.count_is_exact = count_is_exact
+        self.is_first = cursor_param is None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _query(self, **params):
+        query = self.request.GET.copy()
+        query.pop("after", None)
+        query.pop("before", None)
+        for key, value in params.items():
+            query[key] = value
+        return query.urlencode()
+
+    @property
+    def first_query(self):
+        return self._query()
+
+    @property
+    def next_query(self):
+        return self._query(after=self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query(before=self.previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that pages by seeking on an ordered key.
+
+    Pages are addressed by an opaque ``after``/``before`` cursor holding the
+    key of the last/first row shown, so each page is a ``WHERE key < x
+    ORDER BY key LIMIT n`` range scan. Deep pages cost the same as the first
+    one, and rows inserted meanwhile never shift the page boundaries. The
+    total is only counted when ``?count=exact`` is requested; otherwise an
+    estimate is shown where the database provides one.
+    """
+
+    paginate_by = 50
+    keyset = ("-id",)
+
+    def get_keyset(self):
+        model = self.model or self.get_queryset().model
+        return [
+            (model._meta.get_field(key.lstrip("-")), key.startswith("-"))
+            for key in self.keyset
+        ]
+
+    def seek_filter(self, keyset, values, forward):
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(keyset, values):
+            lookup = "lt" if descending == forward else "gt"
+            condition |= equal & Q(**{f"{field.attname}__{lookup}": value})
+            equal &= Q(**{field.attname: value})
+        return condition
+
+    def parse_cursor(self, keyset, cursor):
+        values = decode_cursor(cursor)
+        if len(values) != len(keyset):
+            raise Http404("Invalid page cursor.")
+        try:
+            return [
+                field.to_python(value)
+                for (field, _), value in zip(keyset, values)
+            ]
+        except ValidationError:
+            raise Http404("Invalid page cursor.")
+
+    def make_cursor(self, keyset, obj):
+        values = []
+        for field, _ in keyset:
+            value = getattr(obj, field.attname)
+            values.append(
+                value.isoformat() if hasattr(value, "isoformat") else value
+            )
+        return encode_cursor(values)
+
+    def get_page_queryset(self, queryset, page_size):
+        keyset = self.get_keyset()
+        forward = self.request.GET.get("before") is None
+        cursor = self.get_cursor()
+
+        ordering = [
+            ("-" if descending == forward else "") + field.attname
+            for field, descending in keyset
+        ]
+        page_queryset = queryset.order_by(*ordering)
+        if cursor:
+            values = self.parse_cursor(keyset, cursor)
+            page_queryset = page_queryset.filter(
+                self.seek_filter(keyset, values, forward)
+            )
+        # Fetch one extra row to learn whether another page follows
+        return page_queryset[:page_size + 1]
+
+    def get_cursor(self):
+        before = self.request.GET.get("before")
+        return self.request.GET.get("after") if before is None else before
+
+    def build_page(self, object_list, page_size, total_count, exact):
+        keyset = self.get_keyset()
+        after = self.request.GET.get("after")
+        forward = self.request.GET.get("before") is None
+
+        has_more = len(object_list) > page_size
+        object_list = object_list[:page_size]
+        if not forward:
+            object_list.reverse()
+
+        next_cursor = previous_cursor = None
+        if object_list:
+            if has_more or not forward:
+                next_cursor = self.make_cursor(keyset, object_list[-1])
+            if (has_more and not forward) or (forward and after):
+                previous_cursor = self.make_cursor(keyset, object_list[0])
+
+        page = KeysetPage(
+            object_list,
+            self.request,
+            self.get_cursor(),
+            next_cursor,
+            previous_cursor,
+            total_count,
+            exact,
+        )
+        return None, page, object_list, page.has_other_pages()
+
+    def paginate_queryset(self, queryset, page_size):
+        object_list = list(self.get_page_queryset(queryset, page_size))
+        if self.request.GET.get("count") == "exact":
+            total_count, exact = queryset.count(), True
+        else:
+            total_count, exact = estimate_count(queryset), False
+        return self.build_page(object_list, page_size, total_count, exact)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Async version of ``paginate_queryset()``."""
+        object_list = [
+            obj async for obj in self.get_page_queryset(queryset, page_size)
+        ]
+        if self.request.GET.get("count") == "exact":
+            total_count, exact = await queryset.acount(), True
+        else:
+            total_count = await sync_to_async(estimate_count)(queryset)
+            exact = False
+        return self.build_page(object_list, page_size, total_count, exact)
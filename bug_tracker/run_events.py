@@ -0,0 +1,458 @@
+"""Live test run progress over Server-Sent Events.
+
+Saving, deleting or bulk-updating results publishes events to the topic of
+their run once the transaction commits. The test run page subscribes
+through ``TestRunEventsView`` and updates its chart and result rows in
+place:
+
+``counts``
+    Absolute ``{status: count}`` of the run; sent first on every connection.
+``results``
+    A change: ``delta`` (``{status: +/-n}``) or fresh ``counts``, changed
+    ``rows`` and the ``removed`` result ids.
+``reload``
+    Too much changed to send, or the subscriber fell behind.
+
+Events go through the hub named by ``settings.RUN_EVENTS_HUB``.
+``InProcessHub`` only reaches subscribers in the publishing process;
+``RedisHub`` uses Redis publish/subscribe to reach every worker.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .models import TestResult, TestRunSummary
+from .run_statistics import STATUSES
+
+
+RELOAD = {"type": "reload"}
+
+# Milliseconds the browser waits before reconnecting a closed stream
+RETRY_MS = 2000
+
+
+class InProcessSubscription:
+    """Events of one topic, queued for a single consumer.
+
+    ``put()`` may be called from any thread. A consumer more than
+    ``max_pending`` events behind gets a single ``reload`` event instead.
+    """
+
+    def __init__(self, hub, topic, max_pending):
+        self.hub = hub
+        self.topic = topic
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._waiter = None
+
+    def put(self, event):
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._pending.clear()
+                event = RELOAD
+            self._pending.append(event)
+            self._ready.set()
+            waiter = self._waiter
+        if waiter is not None:
+            loop, future = waiter
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _pop(self):
+        with self._lock:
+            event = self._pending.popleft() if self._pending else None
+            if not self._pending:
+                self._ready.clear()
+            return event
+
+    def get(self, timeout):
+        """Return the next event, or None after ``timeout`` seconds."""
+        if not self._ready.wait(timeout):
+            return None
+        return self._pop()
+
+    async def aget(self, timeout):
+        """Async version of ``get()``."""
+        loop = asyncio.get_running_loop()
+        future = None
+        with self._lock:
+            if not self._pending:
+                future = loop.create_future()
+                self._waiter = (loop, future)
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+        return self._pop()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    async def aclose(self):
+        self.close()
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class InProcessHub:
+    """Publish/subscribe between the threads and event loops of a process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, topic):
+        subscription = InProcessSubscription(
+            self, topic, settings.RUN_EVENTS_MAX_PENDING
+        )
+        with self._lock:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    async def asubscribe(self, topic):
+        return self.subscribe(topic)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.topic, None)
+
+    def has_subscribers(self, topic):
+        return topic in self._subscriptions
+
+    def publish(self, topic, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(topic, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+class RedisSubscription:
+    def __init__(self, client, channel):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout):
+        message = self.pubsub.get_message(timeout=timeout)
+        return json.loads(message["data"]) if message else None
+
+    def close(self):
+        self.pubsub.close()
+
+
+class AsyncRedisSubscription:
+    """``RedisSubscription`` for the event loop, over ``redis.asyncio``.
+
+    Each has a client of its own, as a subscribed connection can't be
+    shared and a client is bound to the event loop it was created on.
+    """
+
+    def __init__(self, url, channel):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.channel = channel
+
+    async def subscribe(self):
+        await self.pubsub.subscribe(self.channel)
+
+    async def aget(self, timeout):
+        message = await self.pubsub.get_message(timeout=timeout)
+        return json.loads(message["data"]) if message else None
+
+    async def aclose(self):
+        await self.pubsub.reset()
+        await self.client.close()
+
+
+class RedisHub:
+    """Publish/subscribe through Redis, shared by every worker process."""
+
+    prefix = "run_events:"
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.REDIS_URL)
+
+    def subscribe(self, topic):
+        return RedisSubscription(self.client, self.prefix + topic)
+
+    async def asubscribe(self, topic):
+        subscription = AsyncRedisSubscription(
+            settings.REDIS_URL, self.prefix + topic
+        )
+        await subscription.subscribe()
+        return subscription
+
+    def has_subscribers(self, topic):
+        [(_, count)] = self.client.pubsub_numsub(self.prefix + topic)
+        return count > 0
+
+    def publish(self, topic, event):
+        self.client.publish(self.prefix + topic, json.dumps(event))
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_hub():
+    path = settings.RUN_EVENTS_HUB
+    with _hubs_lock:
+        if path not in _hubs:
+            _hubs[path] = import_string(path)()
+        return _hubs[path]
+
+
+def run_topic(test_run_id):
+    return f"run:{test_run_id}"
+
+
+def get_run_counts(test_run_ids):
+    """Return ``{test_run_id: {status: count}}`` from the run summaries."""
+    counts = {
+        summary.test_run_id: {
+            status: getattr(summary, status) for status in STATUSES
+        }
+        for summary in TestRunSummary.objects.filter(
+            test_run_id__in=test_run_ids
+        )
+    }
+    missing = set(test_run_ids) - counts.keys()
+    for test_run_id, run_counts in TestRunSummary.objects.count_results(
+        missing
+    ).items():
+        counts[test_run_id] = {
+            status: run_counts.get(status, 0) for status in STATUSES
+        }
+    return counts
+
+
+def result_row(test_result):
+    """What the run page shows of ``test_result`` in its table."""
+    test_case = test_result.test_case
+    return {
+        "id": test_result.pk,
+        "status": test_result.status,
+        "status_display": test_result.get_status_display(),
+        "test_case": test_case.title,
+        "priority": test_case.priority,
+        "priority_display": test_case.get_priority_display(),
+        "detail_url": reverse(
+            "testresult_detail", kwargs={"result_id": test_result.pk}
+        ),
+        "update_url": reverse(
+            "testresult_update", kwargs={"pk": test_result.pk}
+        ),
+    }
+
+
+def _publish(changes, test_result=None):
+    """Publish ``{test_run_id: event}`` to the runs that have subscribers.
+
+    An event with ``"rows": True`` gets the row of ``test_result``; one
+    with ``"counts": True`` gets the recounted counts of its run.
+    """
+    hub = get_hub()
+    changes = {
+        test_run_id: event
+        for test_run_id, event in changes.items()
+        if hub.has_subscribers(run_topic(test_run_id))
+    }
+    if not changes:
+        return
+    recount = [
+        test_run_id
+        for test_run_id, event in changes.items()
+        if event.get("counts")
+    ]
+    counts = get_run_counts(recount) if recount else {}
+    for test_run_id, event in changes.items():
+        event = dict(event, type="results")
+        if event.get("rows"):
+            event["rows"] = [result_row(test_result)]
+        if event.get("counts"):
+            event["counts"] = counts[test_run_id]
+        hub.publish(run_topic(test_run_id), event)
+
+
+def publish_result_saved(test_result, created):
+    """Publish the change a save made to the result's run(s) on commit.
+
+    Must be called before the result forgets its previous state.
+    """
+    if not settings.LIVE_RUN_EVENTS:
+        return
+    test_run_id = test_result.test_run_id
+    status = test_result.status
+    old_test_run_id = test_result._original_test_run_id
+    old_status = test_result._original_status
+    if created:
+        changes = {test_run_id: {"delta": {status: 1}, "rows": True}}
+    elif old_status is None:
+        # The previous status is unknown; send recounted counts instead
+        changes = {test_run_id: {"counts": True, "rows": True}}
+        if old_test_run_id not in (None, test_run_id):
+            changes[old_test_run_id] = {
+                "counts": True, "removed": [test_result.pk],
+            }
+    elif old_test_run_id != test_run_id:
+        changes = {
+            old_test_run_id: {
+                "delta": {old_status: -1}, "removed": [test_result.pk],
+            },
+            test_run_id: {"delta": {status: 1}, "rows": True},
+        }
+    elif old_status != status:
+        changes = {
+            test_run_id: {
+                "delta": {old_status: -1, status: 1}, "rows": True,
+            },
+        }
+    else:
+        # Nothing the run page shows has changed
+        return
+    transaction.on_commit(lambda: _publish(changes, test_result))
+
+
+def publish_result_deleted(test_result):
+    if not settings.LIVE_RUN_EVENTS or not test_result._original_status:
+        return
+    changes = {
+        test_result.test_run_id: {
+            "delta": {test_result._original_status: -1},
+            "removed": [test_result.pk],
+        },
+    }
+    transaction.on_commit(lambda: _publish(changes))
+
+
+def _publish_bulk(test_run_ids, result_ids):
+    hub = get_hub()
+    topics = {
+        test_run_id: run_topic(test_run_id)
+        for test_run_id in test_run_ids
+        if hub.has_subscribers(run_topic(test_run_id))
+    }
+    if not topics:
+        return
+    if result_ids is None or len(result_ids) > settings.RUN_EVENTS_MAX_ROWS:
+        for topic in topics.values():
+            hub.publish(topic, RELOAD)
+        return
+
+    counts = get_run_counts(topics)
+    rows = {test_run_id: [] for test_run_id in topics}
+    for test_result in TestResult.objects.filter(
+        pk__in=result_ids, test_run_id__in=topics
+    ).select_related("test_case").order_by("pk"):
+        rows[test_result.test_run_id].append(result_row(test_result))
+    for test_run_id, topic in topics.items():
+        shown = {row["id"] for row in rows[test_run_id]}
+        hub.publish(topic, {
+            "type": "results",
+            "counts": counts[test_run_id],
+            "rows": rows[test_run_id],
+            # Results that moved to another run
+            "removed": sorted(set(result_ids) - shown),
+        })
+
+
+def publish_results_bulk_changed(test_run_ids, result_ids):
+    """Publish a bulk change of ``result_ids`` to ``test_run_ids`` on commit.
+
+    ``result_ids`` is None when the changed results are unknown; their
+    runs are told to reload.
+    """
+    if not settings.LIVE_RUN_EVENTS:
+        return
+    test_run_ids = set(test_run_ids) - {None}
+    result_ids = None if result_ids is None else list(result_ids)
+    transaction.on_commit(lambda: _publish_bulk(test_run_ids, result_ids))
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _first_chunk(counts):
+    return f"retry: {RETRY_MS}\n\n" + format_event(
+        {"type": "counts", "counts": counts}
+    )
+
+
+def _event_stream(subscription, first):
+    try:
+        yield first
+        deadline = time.monotonic() + settings.RUN_EVENTS_STREAM_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = subscription.get(
+                min(settings.RUN_EVENTS_HEARTBEAT, remaining)
+            )
+            yield format_event(event) if event else ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+async def _aevent_stream(subscription, first):
+    try:
+        yield first
+        deadline = time.monotonic() + settings.RUN_EVENTS_STREAM_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.aget(
+                min(settings.RUN_EVENTS_HEARTBEAT, remaining)
+            )
+            yield format_event(event) if event else ": keepalive\n\n"
+    finally:
+        await subscription.aclose()
+
+
+def _stream_response(content):
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep proxies such as nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def run_events_response(test_run_id):
+    """Stream the events of a run for ``RUN_EVENTS_STREAM_SECONDS``.
+
+    The browser reconnects when the stream ends, so a stream left open
+    by a vanished client holds its worker for a bounded time.
+    """
+    # Subscribe before reading the counts, so no change falls in between
+    subscription = get_hub().subscribe(run_topic(test_run_id))
+    counts = get_run_counts([test_run_id])[test_run_id]
+    return _stream_response(
+        _event_stream(subscription, _first_chunk(counts))
+    )
+
+
+async def arun_events_response(test_run_id):
+    """Async version of ``run_events_response()``."""
+    subscription = await get_hub().asubscribe(run_topic(test_run_id))
+    counts = await sync_to_async(get_run_counts)([test_run_id])
+    return _stream_response(
+        _aevent_stream(subscription, _first_chunk(counts[test_run_id]))
+    )
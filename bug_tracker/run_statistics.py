@@ -0,0 +1,72 @@
+from asgiref.sync import sync_to_async
+
+from .models import TestResult, TestRunSummary
+
+
+STATUSES = [status for status, _ in TestResult.STATUS_CHOICES]
+
+
+def _percent(count, total):
+    return (count / total) * 100 if total > 0 else 0
+
+
+def build_run_statistics(testrun, counts):
+    """Turn a ``{status: count}`` mapping into the per-run stats dict."""
+    total_count = sum(counts.get(status, 0) for status in STATUSES)
+    data = {"testrun": testrun, "total_count": total_count}
+    for status in STATUSES:
+        count = counts.get(status, 0)
+        data[f"{status}_count"] = count
+        data[f"{status}_percent"] = _percent(count, total_count)
+    return data
+
+
+def get_run_statistics(testruns):
+    """Return per-status counts and percentages for each of ``testruns``.
+
+    The counts are read from the TestRunSummary rollup, one row per run, in
+    a single query. Runs without a summary row are recounted once and their
+    summary is stored for the next read.
+    """
+    testruns = list(testruns)
+    summaries = {
+        summary.test_run_id: summary
+        for summary in TestRunSummary.objects.filter(
+            test_run_id__in=[testrun.pk for testrun in testruns]
+        )
+    }
+
+    missing = {testrun.pk for testrun in testruns} - summaries.keys()
+    for summary in TestRunSummary.objects.rebuild(missing):
+        summaries[summary.test_run_id] = summary
+    return _statistics(testruns, summaries)
+
+
+async def aget_run_statistics(testruns):
+    """Async version of ``get_run_statistics()``; ``testruns`` is a list."""
+    summaries = {
+        summary.test_run_id: summary
+        async for summary in TestRunSummary.objects.filter(
+            test_run_id__in=[testrun.pk for testrun in testruns]
+        )
+    }
+
+    missing = {testrun.pk for testrun in testruns} - summaries.keys()
+    if missing:
+        # Rare, and it locks rows inside a transaction: keep it sync
+        rebuilt = await sync_to_async(TestRunSummary.objects.rebuild)(
+            missing
+        )
+        for summary in rebuilt:
+            summaries[summary.test_run_id] = summary
+    return _statistics(testruns, summaries)
+
+
+def _statistics(testruns, summaries):
+    return [
+        build_run_statistics(
+            testrun,
+            summaries[testrun.pk].counts() if testrun.pk in summaries else {},
+        )
+        for testrun in testruns
+    ]
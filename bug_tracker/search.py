@@ -0,0 +1,226 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import TestCase, TestResult
+
+
+# Must match the index expressions created by migration 0005
+POSTGRES_CASE_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(steps, '') || ' ' || "
+    "coalesce(expected_result, ''))"
+)
+POSTGRES_RESULT_DOCUMENT = "to_tsvector('english', actual_result)"
+
+# The FTS5 tables and the triggers keeping them in sync, as created by
+# migration 0005. SQLite rebuilds a table for most schema changes, which
+# drops its triggers; repair_sqlite_index() puts them back.
+SQLITE_FTS_TABLES = ["bug_tracker_testcase_fts", "bug_tracker_testresult_fts"]
+SQLITE_TRIGGERS = {
+    "bug_tracker_testcase_fts_insert": """
+        CREATE TRIGGER bug_tracker_testcase_fts_insert
+        AFTER INSERT ON bug_tracker_testcase BEGIN
+            INSERT INTO bug_tracker_testcase_fts(
+                rowid, title, description, steps, expected_result
+            ) VALUES (
+                new.id, new.title, new.description, new.steps,
+                new.expected_result
+            );
+        END
+    """,
+    "bug_tracker_testcase_fts_delete": """
+        CREATE TRIGGER bug_tracker_testcase_fts_delete
+        AFTER DELETE ON bug_tracker_testcase BEGIN
+            INSERT INTO bug_tracker_testcase_fts(
+                bug_tracker_testcase_fts, rowid, title, description, steps,
+                expected_result
+            ) VALUES (
+                'delete', old.id, old.title, old.description, old.steps,
+                old.expected_result
+            );
+        END
+    """,
+    "bug_tracker_testcase_fts_update": """
+        CREATE TRIGGER bug_tracker_testcase_fts_update
+        AFTER UPDATE OF title, description, steps, expected_result
+        ON bug_tracker_testcase BEGIN
+            INSERT INTO bug_tracker_testcase_fts(
+                bug_tracker_testcase_fts, rowid, title, description, steps,
+                expected_result
+            ) VALUES (
+                'delete', old.id, old.title, old.description, old.steps,
+                old.expected_result
+            );
+            INSERT INTO bug_tracker_testcase_fts(
+                rowid, title, description, steps, expected_result
+            ) VALUES (
+                new.id, new.title, new.description, new.steps,
+                new.expected_result
+            );
+        END
+    """,
+    "bug_tracker_testresult_fts_insert": """
+        CREATE TRIGGER bug_tracker_testresult_fts_insert
+        AFTER INSERT ON bug_tracker_testresult BEGIN
+            INSERT INTO bug_tracker_testresult_fts(rowid, actual_result)
+            VALUES (new.id, new.actual_result);
+        END
+    """,
+    "bug_tracker_testresult_fts_delete": """
+        CREATE TRIGGER bug_tracker_testresult_fts_delete
+        AFTER DELETE ON bug_tracker_testresult BEGIN
+            INSERT INTO bug_tracker_testresult_fts(
+                bug_tracker_testresult_fts, rowid, actual_result
+            ) VALUES ('delete', old.id, old.actual_result);
+        END
+    """,
+    "bug_tracker_testresult_fts_update": """
+        CREATE TRIGGER bug_tracker_testresult_fts_update
+        AFTER UPDATE OF actual_result ON bug_tracker_testresult BEGIN
+            INSERT INTO bug_tracker_testresult_fts(
+                bug_tracker_testresult_fts, rowid, actual_result
+            ) VALUES ('delete', old.id, old.actual_result);
+            INSERT INTO bug_tracker_testresult_fts(rowid, actual_result)
+            VALUES (new.id, new.actual_result);
+        END
+    """,
+}
+
+SQLITE_SEARCH = """
+    SELECT 'testcase', fts.rowid, bm25(bug_tracker_testcase_fts, 10, 2, 1, 1)
+    FROM bug_tracker_testcase_fts AS fts
+    JOIN bug_tracker_testcase AS tc ON tc.id = fts.rowid
+    WHERE bug_tracker_testcase_fts MATCH %s AND tc.project_id IN ({projects})
+    UNION ALL
+    SELECT 'testresult', fts.rowid, bm25(bug_tracker_testresult_fts)
+    FROM bug_tracker_testresult_fts AS fts
+    JOIN bug_tracker_testresult AS tr ON tr.id = fts.rowid
+    JOIN bug_tracker_testrun AS run ON run.id = tr.test_run_id
+    WHERE bug_tracker_testresult_fts MATCH %s
+        AND run.project_id IN ({projects})
+    ORDER BY 3, 1, 2
+    LIMIT %s OFFSET %s
+"""
+POSTGRES_SEARCH = f"""
+    SELECT 'testcase', tc.id, -ts_rank({POSTGRES_CASE_DOCUMENT}, query)
+    FROM bug_tracker_testcase AS tc,
+        websearch_to_tsquery('english', %s) AS query
+    WHERE {POSTGRES_CASE_DOCUMENT} @@ query AND tc.project_id IN ({{projects}})
+    UNION ALL
+    SELECT 'testresult', tr.id, -ts_rank({POSTGRES_RESULT_DOCUMENT}, query)
+    FROM bug_tracker_testresult AS tr
+    JOIN bug_tracker_testrun AS run ON run.id = tr.test_run_id,
+        websearch_to_tsquery('english', %s) AS query
+    WHERE {POSTGRES_RESULT_DOCUMENT} @@ query
+        AND run.project_id IN ({{projects}})
+    ORDER BY 3, 1, 2
+    LIMIT %s OFFSET %s
+"""
+
+
+def repair_sqlite_index(using="default", rebuild=False):
+    """Recreate missing FTS5 sync triggers and reindex if any were missing.
+
+    ``rebuild`` reindexes regardless. Does nothing on other backends or
+    before migration 0005 has run. Returns the names of the recreated
+    triggers.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if not existing.issuperset(SQLITE_FTS_TABLES):
+            return []
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing or rebuild:
+            for table in SQLITE_FTS_TABLES:
+                cursor.execute(
+                    f"INSERT INTO {table}({table}) VALUES ('rebuild')"
+                )
+    return missing
+
+
+def fts5_query(text):
+    """Turn free text into an FTS5 query matching every word.
+
+    Words are quoted so FTS5 operators typed by the user are taken
+    literally; the last word also matches as a prefix.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _ranked_hits(text, project_ids, limit, offset):
+    if connection.vendor == "sqlite":
+        sql, query = SQLITE_SEARCH, fts5_query(text)
+    elif connection.vendor == "postgresql":
+        sql, query = POSTGRES_SEARCH, text
+    else:
+        return None
+    if query is None:
+        return []
+    projects = ", ".join(["%s"] * len(project_ids))
+    params = [query, *project_ids] * 2 + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(projects=projects), params)
+        return cursor.fetchall()
+
+
+def _unranked_hits(text, project_ids, limit, offset):
+    # Backends without a full-text index: unranked substring matching
+    case_filter = Q()
+    for field in ("title", "description", "steps", "expected_result"):
+        case_filter |= Q(**{f"{field}__icontains": text})
+    cases = TestCase.objects.filter(
+        case_filter, project_id__in=project_ids
+    ).values_list("pk", flat=True)
+    results = TestResult.objects.filter(
+        actual_result__icontains=text, test_run__project_id__in=project_ids
+    ).values_list("pk", flat=True)
+    hits = [("testcase", pk, 0) for pk in cases.order_by("pk")]
+    hits += [("testresult", pk, 0) for pk in results.order_by("pk")]
+    return hits[offset:offset + limit]
+
+
+def search(text, project_ids, limit=20, offset=0):
+    """Return test cases and results of ``project_ids`` matching ``text``.
+
+    Hits come best match first, as ``(kind, object)`` pairs where
+    ``kind`` is "testcase" or "testresult". The matching and ranking run
+    on the full-text indexes from migration 0005, in one query.
+    """
+    project_ids = list(project_ids)
+    if not project_ids or not text.strip():
+        return []
+    hits = _ranked_hits(text, project_ids, limit, offset)
+    if hits is None:
+        hits = _unranked_hits(text, project_ids, limit, offset)
+
+    ids = {"testcase": [], "testresult": []}
+    for kind, pk, _ in hits:
+        ids[kind].append(pk)
+    objects = {
+        "testcase": TestCase.objects.select_related("project").in_bulk(
+            ids["testcase"]
+        ),
+        "testresult": TestResult.objects.select_related(
+            "test_case", "test_run__project"
+        ).in_bulk(ids["testresult"]),
+    }
+    return [
+        (kind, objects[kind][pk])
+        for kind, pk, _ in hits
+        if pk in objects[kind]
+    ]
@@ -0,0 +1,199 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from .access import invalidate_accessible_project_ids
+from .auth_backends import invalidate_cached_user
+from .cache_versions import bump_versions
+from .models import (
+    Project,
+    TestCase,
+    TestResult,
+    TestResultHistory,
+    TestRun,
+    TestRunSummary,
+    User,
+    results_bulk_changed,
+)
+from .run_events import (
+    publish_result_deleted,
+    publish_result_saved,
+    publish_results_bulk_changed,
+)
+from .search import repair_sqlite_index
+
+
+def bump_test_run_versions(test_run_ids):
+    """Invalidate the dashboards of the given runs and of their projects."""
+    test_run_ids = set(test_run_ids) - {None}
+    if not test_run_ids:
+        return
+    bump_versions("testrun", test_run_ids)
+    bump_versions(
+        "project",
+        TestRun.objects.filter(pk__in=test_run_ids)
+        .values_list("project_id", flat=True)
+        .distinct(),
+    )
+
+
+@receiver(post_save, sender=TestRun)
+def create_test_run_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        TestRunSummary.objects.get_or_create(test_run=instance)
+
+
+@receiver(post_save, sender=TestResult)
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        TestRunSummary.objects.apply_delta(
+            instance.test_run_id, added=instance.status
+        )
+    elif instance._original_status is None:
+        # The status was deferred when the row was loaded, so the previous
+        # value is unknown; recount instead of guessing.
+        TestRunSummary.objects.rebuild(
+            {instance._original_test_run_id, instance.test_run_id} - {None}
+        )
+    elif instance._original_test_run_id not in (
+        None,
+        instance.test_run_id,
+    ):
+        TestRunSummary.objects.apply_delta(
+            instance._original_test_run_id,
+            removed=instance._original_status,
+        )
+        TestRunSummary.objects.apply_delta(
+            instance.test_run_id, added=instance.status
+        )
+    elif instance._original_status != instance.status:
+        TestRunSummary.objects.apply_delta(
+            instance.test_run_id,
+            removed=instance._original_status,
+            added=instance.status,
+        )
+    bump_test_run_versions(
+        {instance._original_test_run_id, instance.test_run_id}
+    )
+    if (
+        created
+        or instance._original_status != instance.status
+        or instance._original_actual_result != instance.actual_result
+    ):
+        TestResultHistory.objects.record([instance])
+    publish_result_saved(instance, created)
+    instance.remember_summary_state()
+
+
+@receiver(post_delete, sender=TestResult)
+def update_summary_on_delete(sender, instance, **kwargs):
+    TestRunSummary.objects.apply_delta(
+        instance.test_run_id, removed=instance._original_status
+    )
+
+
+@receiver(post_delete, sender=TestResult)
+def publish_result_delete(sender, instance, **kwargs):
+    publish_result_deleted(instance)
+
+
+@receiver(results_bulk_changed)
+def publish_bulk_result_change(sender, test_run_ids, result_ids=None,
+                               **kwargs):
+    publish_results_bulk_changed(test_run_ids, result_ids)
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_owner_access(sender, instance, **kwargs):
+    invalidate_accessible_project_ids([instance.created_by_id])
+
+
+@receiver(pre_delete, sender=Project)
+def invalidate_project_members_access(sender, instance, **kwargs):
+    user_ids = set(instance.shared_with.values_list("pk", flat=True))
+    user_ids.add(instance.created_by_id)
+    invalidate_accessible_project_ids(user_ids)
+
+
+@receiver(m2m_changed, sender=Project.shared_with.through)
+def invalidate_shared_users_access(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action == "pre_clear":
+        if reverse:
+            user_ids = [instance.pk]
+        else:
+            user_ids = instance.shared_with.values_list("pk", flat=True)
+    elif action in ("post_add", "post_remove"):
+        user_ids = [instance.pk] if reverse else pk_set
+    else:
+        return
+    invalidate_accessible_project_ids(user_ids)
+
+
+@receiver(post_delete, sender=TestResult)
+def bump_versions_on_result_delete(sender, instance, **kwargs):
+    bump_test_run_versions([instance.test_run_id])
+
+
+@receiver(results_bulk_changed)
+def bump_versions_on_bulk_result_change(sender, test_run_ids, **kwargs):
+    bump_test_run_versions(test_run_ids)
+
+
+@receiver(post_save, sender=TestRun)
+@receiver(post_delete, sender=TestRun)
+def bump_versions_on_run_change(sender, instance, **kwargs):
+    bump_versions("testrun", [instance.pk])
+    bump_versions("project", [instance.project_id])
+    # A single version for the titles that list pages show across projects
+    bump_versions("catalog", [0])
+
+
+@receiver(post_save, sender=TestCase)
+def bump_versions_on_case_save(sender, instance, created, **kwargs):
+    bump_versions("project", [instance.project_id])
+    bump_versions("catalog", [0])
+    if not created:
+        bump_versions(
+            "testrun",
+            TestResult.objects.filter(test_case=instance)
+            .values_list("test_run_id", flat=True)
+            .distinct(),
+        )
+
+
+@receiver(post_delete, sender=TestCase)
+def bump_versions_on_case_delete(sender, instance, **kwargs):
+    # Its results are deleted first and bump their runs themselves
+    bump_versions("project", [instance.project_id])
+
+
+@receiver(post_save, sender=Project)
+def bump_versions_on_project_save(sender, instance, created, **kwargs):
+    bump_versions("project", [instance.pk])
+    bump_versions("catalog", [0])
+    if not created:
+        bump_versions(
+            "testrun", instance.testrun_set.values_list("pk", flat=True)
+        )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_on_change(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_migrate)
+def repair_search_triggers(sender, using, **kwargs):
+    # A migration that rebuilt a SQLite table has dropped its FTS triggers
+    if sender.name == "bug_tracker":
+        repair_sqlite_index(using)
@@ -0,0 +1,85 @@
+from django.db import transaction
+
+from .models import TelegramNotification, TelegramUser
+
+
+LINKED_MESSAGE = "Chat ID has been associated with your token."
+INVALID_TOKEN_MESSAGE = "Invalid token. Please try again."
+
+
+def extract_token_messages(updates):
+    """Return ``(chat_id, token)`` pairs for the text messages in ``updates``.
+
+    Updates repeated within the batch (same ``update_id``) are only
+    returned once. Malformed updates are skipped: failing on one would
+    make Telegram retry the whole batch and queue its replies again.
+    """
+    seen = set()
+    messages = []
+    for update in updates:
+        if not isinstance(update, dict):
+            continue
+        update_id = update.get("update_id")
+        if update_id is not None:
+            if update_id in seen:
+                continue
+            seen.add(update_id)
+        message = update.get("message") or update.get("edited_message")
+        if not isinstance(message, dict):
+            continue
+        chat = message.get("chat")
+        chat_id = chat.get("id") if isinstance(chat, dict) else None
+        text = message.get("text")
+        if not isinstance(chat_id, int) or not isinstance(text, str):
+            continue
+        if text.strip():
+            messages.append((chat_id, text.strip()))
+    return messages
+
+
+def link_chats(messages):
+    """Attach chats to the TelegramUser whose token they sent.
+
+    All tokens are looked up with one query and the changed ``chat_id``
+    values are written with one bulk update, so replaying the same messages
+    is harmless. Returns a list of ``(chat_id, linked)`` pairs in input
+    order.
+    """
+    tokens = {token for _, token in messages}
+    results = []
+    with transaction.atomic():
+        telegram_users = {
+            telegram_user.token: telegram_user
+            for telegram_user in TelegramUser.objects.select_for_update()
+            .filter(token__in=tokens)
+        }
+        changed = {}
+        for chat_id, token in messages:
+            telegram_user = telegram_users.get(token)
+            if telegram_user is None:
+                results.append((chat_id, False))
+                continue
+            if telegram_user.chat_id != chat_id:
+                telegram_user.chat_id = chat_id
+                changed[telegram_user.pk] = telegram_user
+            results.append((chat_id, True))
+        TelegramUser.objects.bulk_update(changed.values(), ["chat_id"])
+    return results
+
+
+def process_updates(updates):
+    """Link the chats in a batch of webhook updates and queue the replies.
+
+    Replies go through the notification outbox, so the webhook answers
+    Telegram without waiting on the Bot API.
+    """
+    with transaction.atomic():
+        results = link_chats(extract_token_messages(updates))
+        TelegramNotification.objects.bulk_create(
+            TelegramNotification(
+                chat_id=chat_id,
+                text=LINKED_MESSAGE if linked else INVALID_TOKEN_MESSAGE,
+            )
+            for chat_id, linked in results
+        )
+    return len(results)
@@ -0,0 +1,26 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from bug_tracker.assets import bundle_is_built, source_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """Link the built bundle ``name``, or its sources when not built."""
+    if bundle_is_built(name, staticfiles_storage):
+        urls = [static(name)]
+    else:
+        urls = [static(source_url(source))
+                for source in settings.ASSET_BUNDLES[name]]
+    if name.endswith(".css"):
+        return format_html_join(
+            "\n", '<link href="{}" rel="stylesheet">', ((url,) for url in urls)
+        )
+    return format_html_join(
+        "\n", '<script src="{}"></script>', ((url,) for url in urls)
+    )
@@ -1,3 +1,1900 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.db import IntegrityError
+from django.http import Http404, HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from bug_tracker import models
+from bug_tracker.access import get_accessible_project_ids
+from bug_tracker.assets import is_collected, read_collect_list
+from bug_tracker.async_views import (
+    AsyncProjectDetailView,
+    AsyncTestResultListView,
+    AsyncTestRunDetailView,
+    AsyncTestRunEventsView,
+)
+from bug_tracker.models import (
+    Project,
+    TelegramNotification,
+    TelegramUser,
+    TestResult,
+    TestResultHistory,
+    TestRun,
+    TestRunSummary,
+    User,
+)
+from bug_tracker.exports import aiterate, export_response
+from bug_tracker.notifications import (
+    MESSAGE_LIMIT,
+    NotificationWorker,
+    TelegramClient,
+    digest_due_at,
+    notify_result_changed,
+)
+from bug_tracker.run_events import get_hub, run_topic
+from bug_tracker.run_statistics import get_run_statistics
+from bug_tracker.search import SQLITE_TRIGGERS
+from bug_tracking_system.db_routers import replica_cache_timeout
+from bug_tracking_system.middlewares import ReplicaRoutingMiddleware
+from bug_tracking_system.testing import QueryBudgetMixin
+
+
+# The tests run in a single process, so the local-memory cache is shared
+@override_settings(SHARED_CACHE=True)
+class BugTrackerTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="tester", password="12testpass34"
+        )
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            title="Project", created_by=self.user
+        )
+
+    def create_test_case(self, **kwargs):
+        kwargs.setdefault("title", "Test case")
+        kwargs.setdefault("project", self.project)
+        return models.TestCase.objects.create(**kwargs)
+
+    def create_test_run(self, statuses=(), **kwargs):
+        kwargs.setdefault("title", "Test run")
+        kwargs.setdefault("project", self.project)
+        kwargs.setdefault("deadline", timezone.now() + timedelta(days=7))
+        test_run = TestRun.objects.create(**kwargs)
+        for status in statuses:
+            TestResult.objects.create(
+                test_run=test_run,
+                test_case=self.create_test_case(),
+                status=status,
+            )
+        return test_run
+
+
+class RunStatisticsTests(BugTrackerTestCase):
+    def test_counts_and_percentages(self):
+        test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.PASSED, TestResult.FAILED,
+             TestResult.UNTESTED]
+        )
+        empty_run = self.create_test_run()
+
+        with self.assertNumQueries(1):
+            stats, empty_stats = get_run_statistics([test_run, empty_run])
+
+        self.assertEqual(stats["testrun"], test_run)
+        self.assertEqual(stats["passed_count"], 2)
+        self.assertEqual(stats["failed_count"], 1)
+        self.assertEqual(stats["blocked_count"], 0)
+        self.assertEqual(stats["untested_count"], 1)
+        self.assertEqual(stats["total_count"], 4)
+        self.assertEqual(stats["passed_percent"], 50)
+        self.assertEqual(empty_stats["total_count"], 0)
+        self.assertEqual(empty_stats["passed_percent"], 0)
+
+    def assertConstantQueries(self, url, add_run):
+        # Measure with a single run, then check the count does not grow.
+        # Each measurement follows a write, so cached dashboards are cold.
+        add_run()
+        self.client.get(url)  # warm the caches
+        add_run()
+        with CaptureQueriesContext(connection) as single:
+            self.client.get(url)
+        for _ in range(5):
+            add_run()
+        with self.assertNumQueries(len(single.captured_queries)):
+            response = self.client.get(url)
+        return response
+
+    def test_project_detail_query_count_is_fixed(self):
+        url = reverse("project_detail", args=[self.project.pk])
+        self.assertConstantQueries(
+            url,
+            lambda: self.create_test_run(
+                [TestResult.PASSED, TestResult.BLOCKED]
+            ),
+        )
+
+    def test_testrun_list_query_count_is_fixed(self):
+        url = reverse("testrun_list")
+        response = self.assertConstantQueries(
+            url, lambda: self.create_test_run([TestResult.FAILED])
+        )
+        self.assertEqual(len(response.context["testrun_data"]), 7)
+        self.assertEqual(
+            response.context["testrun_data"][0]["failed_count"], 1
+        )
+
+    def test_testrun_detail_counts(self):
+        test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.BLOCKED, TestResult.BLOCKED]
+        )
+        response = self.client.get(
+            reverse("testrun_detail", args=[test_run.pk])
+        )
+        self.assertEqual(response.context["passed_count"], 1)
+        self.assertEqual(response.context["blocked_count"], 2)
+
+
+class TestRunSummaryTests(BugTrackerTestCase):
+    def assertSummary(self, test_run, **expected):
+        summary = TestRunSummary.objects.get(test_run=test_run)
+        actual = dict(summary.counts(), total=summary.total)
+        self.assertEqual(
+            actual, TestRunSummary.fields_from_counts(expected)
+        )
+
+    def test_counters_follow_saves_and_deletes(self):
+        test_run = self.create_test_run([TestResult.PASSED])
+        result = TestResult.objects.create(
+            test_run=test_run, test_case=self.create_test_case()
+        )
+        self.assertSummary(test_run, passed=1, untested=1)
+
+        result.status = TestResult.FAILED
+        result.save()
+        result.save()
+        self.assertSummary(test_run, passed=1, failed=1)
+
+        result.delete()
+        self.assertSummary(test_run, passed=1)
+
+    def test_stale_instances_do_not_skew_counters(self):
+        test_run = self.create_test_run([TestResult.UNTESTED])
+        first = TestResult.objects.get(test_run=test_run)
+        second = TestResult.objects.get(test_run=test_run)
+
+        first.status = TestResult.PASSED
+        first.save()
+        # Loaded before the first edit, but saved after it
+        second.status = TestResult.FAILED
+        second.save()
+        self.assertSummary(test_run, failed=1)
+
+        first.delete()
+        self.assertSummary(test_run)
+
+    def test_counters_follow_bulk_operations(self):
+        test_run = self.create_test_run()
+        TestResult.objects.bulk_create(
+            TestResult(test_run=test_run, test_case=self.create_test_case())
+            for _ in range(3)
+        )
+        self.assertSummary(test_run, untested=3)
+
+        TestResult.objects.filter(test_run=test_run).update(
+            status=TestResult.BLOCKED
+        )
+        self.assertSummary(test_run, blocked=3)
+
+        TestResult.objects.filter(test_run=test_run)[:1].get().delete()
+        TestResult.objects.filter(test_run=test_run).delete()
+        self.assertSummary(test_run)
+
+    def test_rebuild_command(self):
+        test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED]
+        )
+        TestRunSummary.objects.filter(test_run=test_run).update(passed=5)
+
+        output = {"stdout": StringIO(), "stderr": StringIO()}
+        with self.assertRaises(CommandError):
+            call_command("rebuild_run_summaries", "--verify", **output)
+
+        call_command("rebuild_run_summaries", **output)
+        call_command("rebuild_run_summaries", "--verify", **output)
+        self.assertSummary(test_run, passed=1, failed=1)
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    """Local stand-in for the Bot API that records every sendMessage."""
+
+    def __init__(self):
+        self.messages = []
+        self.responses = []
+        super().__init__(("127.0.0.1", 0), FakeTelegramHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.messages.append(json.loads(body))
+        status, payload = (
+            self.server.responses.pop(0)
+            if self.server.responses
+            else (200, {"ok": True, "result": {}})
+        )
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(TELEGRAM_DIGEST_WINDOW=0)
+class TelegramOutboxTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = FakeTelegramServer()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.worker = NotificationWorker(
+            client=TelegramClient(token="1:x", api_url=self.server.url),
+            chat_interval=0,
+        )
+        TelegramUser.objects.create(user=self.user, token="t", chat_id=42)
+        self.test_run = self.create_test_run([TestResult.UNTESTED])
+        self.result = self.test_run.test_results.get()
+
+    def update_result(self, status):
+        return self.client.post(
+            reverse("testresult_update", args=[self.result.pk]),
+            {"status": status, "actual_result": "Broken"},
+        )
+
+    def test_update_queues_notification_without_sending(self):
+        self.update_result(TestResult.PASSED)
+        self.assertFalse(TelegramNotification.objects.exists())
+
+        response = self.update_result(TestResult.FAILED)
+        self.assertEqual(response.status_code, 302)
+        notification = TelegramNotification.objects.get()
+        self.assertEqual(notification.chat_id, 42)
+        self.assertIn("Test status: failed", notification.text)
+        self.assertEqual(self.server.messages, [])
+
+        self.assertEqual(self.worker.run_once(), (1, 0, 0))
+        self.assertEqual(self.server.messages[0]["chat_id"], 42)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, TelegramNotification.SENT)
+
+    def test_long_alerts_are_cut_to_one_message(self):
+        self.result.test_case.steps = "Click. " * 1000
+        self.result.test_case.save()
+        self.update_result(TestResult.FAILED)
+        notification = TelegramNotification.objects.get()
+        self.assertEqual(len(notification.text), MESSAGE_LIMIT)
+        self.assertTrue(notification.text.endswith("…"))
+        self.assertEqual(self.worker.run_once(), (1, 0, 0))
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self.server.responses = [(502, {"ok": False})]
+        notification = TelegramNotification.objects.create(
+            chat_id=42, text="Hello"
+        )
+
+        self.assertEqual(self.worker.run_once(), (0, 1, 0))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, TelegramNotification.PENDING)
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(self.worker.run_once(), (0, 0, 0))
+
+        notification.next_attempt_at = timezone.now()
+        notification.save()
+        self.assertEqual(self.worker.run_once(), (1, 0, 0))
+        self.assertEqual(len(self.server.messages), 2)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.responses = [
+            (400, {"ok": False, "description": "chat not found"})
+        ]
+        notification = TelegramNotification.objects.create(
+            chat_id=42, text="Hello"
+        )
+
+        with self.assertLogs("bug_tracker.notifications", "WARNING"):
+            self.worker.run_once()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, TelegramNotification.FAILED)
+        self.assertEqual(notification.last_error, "chat not found")
+
+    def test_messages_to_one_chat_are_rate_limited(self):
+        self.worker.chat_interval = 60
+        TelegramNotification.objects.create(chat_id=42, text="First")
+        TelegramNotification.objects.create(chat_id=42, text="Second")
+        TelegramNotification.objects.create(chat_id=7, text="Other chat")
+
+        self.assertEqual(self.worker.run_once(), (2, 0, 1))
+        self.assertEqual(
+            [message["text"] for message in self.server.messages],
+            ["First", "Other chat"],
+        )
+
+    def test_alerts_fan_out_to_project_members(self):
+        member = User.objects.create_user(username="member", password="x")
+        self.project.shared_with.add(member)
+        TelegramUser.objects.create(user=member, token="m", chat_id=7)
+        outsider = User.objects.create_user(username="outsider", password="x")
+        TelegramUser.objects.create(user=outsider, token="o", chat_id=9)
+        self.result.status = TestResult.FAILED
+        self.result.save()
+
+        # The result with its case, run and project, the chats, the insert
+        with self.assertNumQueries(3):
+            notify_result_changed(self.result)
+        self.assertEqual(
+            sorted(TelegramNotification.objects.values_list(
+                "chat_id", flat=True
+            )),
+            [7, 42],
+        )
+        notification = TelegramNotification.objects.first()
+        self.assertEqual(
+            notification.summary, "Test case: failed (Test run, Project)"
+        )
+
+    def test_digest_windows_are_aligned(self):
+        now = datetime(2026, 1, 1, 12, 0, 30, tzinfo=dt_timezone.utc)
+        with override_settings(TELEGRAM_DIGEST_WINDOW=60):
+            self.assertEqual(
+                digest_due_at(now), now.replace(minute=1, second=0)
+            )
+            self.assertEqual(
+                digest_due_at(now.replace(second=0)), now.replace(second=0)
+            )
+        self.assertEqual(digest_due_at(now), now)
+
+    def test_due_alerts_are_coalesced_per_chat(self):
+        for number in range(300):
+            TelegramNotification.objects.create(
+                chat_id=42, text=f"Alert {number}", summary=f"Case {number}"
+            )
+        TelegramNotification.objects.create(
+            chat_id=7, text="Alone", summary="Alone"
+        )
+        self.worker.batch_size = 500
+
+        sent, failed, deferred = self.worker.run_once()
+        self.assertEqual(
+            [message["chat_id"] for message in self.server.messages], [42, 7]
+        )
+        digest = self.server.messages[0]["text"]
+        self.assertLessEqual(len(digest), MESSAGE_LIMIT)
+        self.assertTrue(digest.startswith(f"{sent - 1} test result alerts"))
+        self.assertIn("- Case 0\n", digest)
+        self.assertEqual(self.server.messages[1]["text"], "Alone")
+        self.assertEqual((failed, sent + deferred), (0, 301))
+
+        while self.worker.run_once() != (0, 0, 0):
+            pass
+        self.assertFalse(
+            TelegramNotification.objects.exclude(
+                status=TelegramNotification.SENT
+            ).exists()
+        )
+        self.assertLess(len(self.server.messages), 10)
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET="s3cret")
+class TelegramWebhookTests(BugTrackerTestCase):
+    def post_updates(self, updates, secret="s3cret"):
+        return self.client.post(
+            reverse("telegram_webhook"),
+            json.dumps(updates),
+            content_type="application/json",
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret,
+        )
+
+    def update(self, update_id, chat_id, text):
+        return {
+            "update_id": update_id,
+            "message": {"chat": {"id": chat_id}, "text": text},
+        }
+
+    def test_rejects_wrong_secret(self):
+        response = self.post_updates([], secret="wrong")
+        self.assertEqual(response.status_code, 403)
+
+    def test_links_batch_of_tokens(self):
+        other = User.objects.create_user(username="other", password="x")
+        TelegramUser.objects.create(user=self.user, token="token-1")
+        TelegramUser.objects.create(user=other, token="token-2")
+        updates = [
+            self.update(1, 100, "token-1"),
+            self.update(2, 200, " token-2 "),
+            self.update(3, 300, "unknown"),
+            self.update(1, 100, "token-1"),
+        ]
+
+        # One token lookup, one bulk update and one insert of the replies
+        with self.assertNumQueries(7):
+            response = self.post_updates(updates)
+
+        self.assertEqual(response.json(), {"ok": True, "processed": 3})
+        self.assertEqual(
+            dict(TelegramUser.objects.values_list("token", "chat_id")),
+            {"token-1": 100, "token-2": 200},
+        )
+        self.assertEqual(
+            sorted(
+                TelegramNotification.objects.values_list("chat_id", flat=True)
+            ),
+            [100, 200, 300],
+        )
+
+        # Replaying the batch leaves the links unchanged
+        self.post_updates(updates)
+        self.assertEqual(
+            TelegramUser.objects.filter(chat_id__isnull=False).count(), 2
+        )
+
+    def test_skips_malformed_updates(self):
+        TelegramUser.objects.create(user=self.user, token="token-1")
+        updates = [
+            "not an update",
+            {"update_id": 1, "message": "text"},
+            {"update_id": 2, "message": {"text": "token-1"}},
+            {"update_id": 3, "message": {"chat": {}, "text": "token-1"}},
+            {"update_id": 4, "message": {"chat": {"id": 100}, "text": 5}},
+            self.update(5, 100, "token-1"),
+        ]
+        response = self.post_updates(updates)
+        self.assertEqual(response.json(), {"ok": True, "processed": 1})
+        self.assertEqual(TelegramNotification.objects.count(), 1)
+
+
+class AddTestCaseTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run()
+        self.url = reverse("add_test_case", args=[self.test_run.pk])
+
+    def run_case_ids(self):
+        return set(
+            self.test_run.test_results.values_list("test_case_id", flat=True)
+        )
+
+    def test_adds_selected_cases_in_bulk(self):
+        cases = [self.create_test_case() for _ in range(50)]
+        TestResult.objects.create(test_run=self.test_run, test_case=cases[0])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                self.url, {"test_case_ids": [case.pk for case in cases]}
+            )
+        self.assertLess(len(queries.captured_queries), 20)
+        self.assertEqual(self.run_case_ids(), {case.pk for case in cases})
+        summary = TestRunSummary.objects.get(test_run=self.test_run)
+        self.assertEqual(summary.untested, 50)
+
+    def test_rejects_cases_of_other_projects(self):
+        case = self.create_test_case()
+        other_project = Project.objects.create(
+            title="Other", created_by=self.user
+        )
+        foreign_case = self.create_test_case(project=other_project)
+
+        response = self.client.post(
+            self.url, {"test_case_ids": [case.pk, foreign_case.pk]}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.run_case_ids(), set())
+
+    def test_adds_all_cases_matching_filter(self):
+        high = self.create_test_case(priority=models.TestCase.HIGH)
+        self.create_test_case(priority=models.TestCase.LOW)
+
+        self.client.post(
+            self.url, {"add_all": "1", "priority": models.TestCase.HIGH}
+        )
+        self.client.post(
+            self.url, {"add_all": "1", "priority": models.TestCase.HIGH}
+        )
+        self.assertEqual(self.run_case_ids(), {high.pk})
+
+
+class KeysetPaginationTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run()
+        TestResult.objects.bulk_create(
+            TestResult(
+                test_run=self.test_run,
+                test_case=self.create_test_case(),
+                status=TestResult.FAILED if i % 2 else TestResult.PASSED,
+            )
+            for i in range(120)
+        )
+        self.url = reverse("testresult_list")
+
+    def collect_pages(self, query):
+        pages = []
+        response = self.client.get(f"{self.url}?{query}")
+        while True:
+            page = response.context["page_obj"]
+            pages.append([result.pk for result in page.object_list])
+            if not page.has_next():
+                return pages, response
+            response = self.client.get(f"{self.url}?{page.next_query}")
+
+    def test_pages_cover_filtered_results_once(self):
+        pages, _ = self.collect_pages("status=failed")
+        ids = [pk for page in pages for pk in page]
+        expected = TestResult.objects.filter(
+            status=TestResult.FAILED
+        ).order_by("-timestamp", "-id")
+        self.assertEqual([len(page) for page in pages], [50, 10])
+        self.assertEqual(ids, list(expected.values_list("pk", flat=True)))
+
+    def test_previous_page_and_concurrent_inserts(self):
+        first = self.client.get(self.url).context["page_obj"]
+        second = self.client.get(f"{self.url}?{first.next_query}")
+        TestResult.objects.create(
+            test_run=self.test_run, test_case=self.create_test_case()
+        )
+
+        page = second.context["page_obj"]
+        back = self.client.get(f"{self.url}?{page.previous_query}")
+        self.assertEqual(
+            [r.pk for r in back.context["page_obj"].object_list],
+            [r.pk for r in first.object_list],
+        )
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        self.client.get(self.url)  # warm the caches
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(self.url)
+        next_query = response.context["page_obj"].next_query
+        with self.assertNumQueries(len(first_page.captured_queries)):
+            self.client.get(f"{self.url}?{next_query}")
+
+    def test_exact_count_is_optional(self):
+        response = self.client.get(self.url)
+        self.assertIsNone(response.context["page_obj"].total_count)
+        response = self.client.get(f"{self.url}?count=exact&status=passed")
+        self.assertEqual(response.context["page_obj"].total_count, 60)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(f"{self.url}?after=garbage")
+        self.assertEqual(response.status_code, 404)
+
+    def test_testcase_list_keeps_filters_across_pages(self):
+        url = reverse("testcase_list")
+        response = self.client.get(f"{url}?priority=medium")
+        page = response.context["page_obj"]
+        self.assertEqual(len(page.object_list), 50)
+        self.assertIn("priority=medium", page.next_query)
+        self.assertContains(response, "Test case")
+
+
+class RequestTimingTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED] * 15
+        )
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("testresult_list"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_server_timing_header_can_be_off(self):
+        response = self.client.get(reverse("testresult_list"))
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(SLOW_REQUEST_QUERIES=1)
+    def test_logs_requests_over_threshold(self):
+        with self.assertLogs(
+            "bug_tracking_system.middlewares", "WARNING"
+        ) as logs:
+            self.client.get(reverse("testrun_list"))
+        self.assertIn("Slow request GET /testrun/", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_view_query_budgets(self):
+        budgets = [
+            (reverse("testresult_list"), 6),
+            (reverse("testrun_list"), 4),
+            (reverse("testrun_detail", args=[self.test_run.pk]), 5),
+            (reverse("project_detail", args=[self.project.pk]), 6),
+            (reverse("testcase_list"), 5),
+        ]
+        for url, budget in budgets:
+            self.client.get(url)  # warm the caches
+            with self.subTest(url=url), self.assertQueryBudget(budget):
+                self.client.get(url)
+
+
+class DashboardCacheTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED]
+        )
+        self.urls = [
+            reverse("testrun_detail", args=[self.test_run.pk]),
+            reverse("project_detail", args=[self.project.pk]),
+        ]
+
+    def test_cached_dashboard_skips_queries(self):
+        for url in self.urls:
+            self.client.get(url)
+            with self.subTest(url=url), self.assertNumQueries(2):
+                # Only the session and the user are loaded
+                response = self.client.get(url)
+            self.assertContains(response, self.test_run.title)
+
+    def test_result_change_invalidates_dashboards(self):
+        for url in self.urls:
+            self.client.get(url)
+        self.test_run.test_results.filter(status=TestResult.FAILED).update(
+            status=TestResult.BLOCKED
+        )
+        response = self.client.get(self.urls[0])
+        self.assertEqual(response.context["blocked_count"], 1)
+        self.assertEqual(response.context["failed_count"], 0)
+        response = self.client.get(self.urls[1])
+        self.assertEqual(
+            response.context["testrun_data"][0]["blocked_count"], 1
+        )
+
+    def test_filters_are_cached_separately(self):
+        url = self.urls[0]
+        self.client.get(url)
+        response = self.client.get(url + "?status=failed")
+        self.assertEqual(len(response.context["test_results"]), 1)
+
+    def test_project_rename_invalidates_run_dashboard(self):
+        self.client.get(self.urls[0])
+        self.project.title = "Renamed project"
+        self.project.save()
+        self.assertContains(self.client.get(self.urls[0]), "Renamed project")
+
+    @override_settings(SHARED_CACHE=False)
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        cache.clear()
+        for url in self.urls:
+            self.client.get(url)
+            response = self.client.get(url)
+            with self.subTest(url=url):
+                self.assertNotIn("ETag", response)
+                self.assertNotIn("Last-Modified", response)
+        self.assertIsNone(cache.get(f"version:testrun:{self.test_run.pk}"))
+
+
+@override_settings(
+    CACHED_AUTH=True,
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTHENTICATION_BACKENDS=[
+        "bug_tracker.auth_backends.CachedModelBackend",
+        "django.contrib.auth.backends.ModelBackend",
+    ],
+)
+class CachedAuthTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run([TestResult.PASSED])
+        self.url = reverse("testrun_detail", args=[self.test_run.pk])
+
+    def test_warm_request_needs_no_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, self.test_run.title)
+
+    def test_sessions_are_written_through(self):
+        session_key = self.client.session.session_key
+        self.assertTrue(Session.objects.filter(pk=session_key).exists())
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_password_change_ends_cached_sessions(self):
+        self.client.get(self.url)
+        self.user.set_password("new-password-56")
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_deactivation_ends_cached_sessions(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_sessions_from_before_the_switch_stay_logged_in(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class ConditionalGetTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED]
+        )
+        self.detail_url = reverse("testrun_detail", args=[self.test_run.pk])
+        self.list_url = reverse("testresult_list")
+
+    def revalidate(self, url):
+        etag = self.client.get(url)["ETag"]
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (self.detail_url, self.list_url):
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn("private", response["Cache-Control"])
+
+    def test_revalidation_is_cheap(self):
+        self.revalidate(self.list_url)  # warm the caches
+        etag = self.client.get(self.list_url)["ETag"]
+        # Session, user and the validator aggregate
+        with self.assertNumQueries(3):
+            self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        etag = self.client.get(self.detail_url)["ETag"]
+        with self.assertNumQueries(2):
+            self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_result_change_modifies_pages(self):
+        etags = {
+            url: self.client.get(url)["ETag"]
+            for url in (self.detail_url, self.list_url)
+        }
+        self.test_run.test_results.filter(status=TestResult.FAILED).update(
+            status=TestResult.BLOCKED
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_pages_read_from_a_replica_have_no_validators(self):
+        with mock.patch(
+            "bug_tracker.conditional.reading_from_replica", return_value=True
+        ):
+            for url in (self.detail_url, self.list_url):
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotIn("ETag", response)
+                    self.assertNotIn("Last-Modified", response)
+                    self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_flash_messages_are_not_lost_to_a_304(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        response = self.client.post(
+            reverse("testresult_bulk_update", args=[self.test_run.pk]),
+            {"status": TestResult.PASSED},
+        )
+        response = self.client.get(
+            response.url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Select test results and a status.")
+        self.assertNotIn("ETag", response)
+
+    def test_run_page_is_modified_after_midnight(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch("django.utils.timezone.now", return_value=tomorrow):
+            response = self.client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_filters_change_the_etag(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        response = self.client.get(
+            self.list_url + "?status=failed", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_is_latest_result(self):
+        response = self.client.get(self.list_url)
+        latest = TestResult.objects.latest("timestamp").timestamp
+        self.assertEqual(
+            response["Last-Modified"], http_date(latest.timestamp())
+        )
+
+
+class ExportTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED, TestResult.FAILED]
+        )
+        self.url = reverse("testresult_export")
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_applies_filters(self):
+        content = self.export(
+            testrun=self.test_run.pk, status=TestResult.FAILED
+        )
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["status"], TestResult.FAILED)
+        self.assertEqual(rows[0]["test_run_title"], self.test_run.title)
+        self.assertEqual(rows[0]["project_title"], self.project.title)
+
+    def test_jsonl_export(self):
+        content = self.export(format="jsonl", project=self.project.pk)
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            {row["test_case_priority"] for row in rows},
+            {models.TestCase.MEDIUM},
+        )
+
+    def test_rows_come_from_a_single_query(self):
+        self.create_test_run([TestResult.PASSED] * 20)
+        self.client.get(self.url)  # warm the caches
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            b"".join(response.streaming_content)
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_streams_asynchronously_under_asgi(self):
+        self.create_test_run([TestResult.PASSED] * 20)
+        response = export_response(
+            TestResult.objects.all(), "jsonl", "results"
+        )
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(read)()
+        rows = b"".join(chunks).decode().splitlines()
+        self.assertEqual(len(rows), 23)
+
+        async def batches():
+            return [batch async for batch in aiterate("abc", batch_size=2)]
+
+        self.assertEqual(async_to_sync(batches)(), ["ab", "c"])
+
+    def test_inaccessible_results_are_not_exported(self):
+        other = User.objects.create_user("other", password="pass12345")
+        project = Project.objects.create(title="Hidden", created_by=other)
+        self.create_test_run([TestResult.PASSED], project=project)
+        content = self.export(format="jsonl")
+        self.assertNotIn("Hidden", content)
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {"format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportTests(BugTrackerTestCase):
+    CSV = (
+        "title,description,steps,expected_result,priority\n"
+        "Login,Sign in,Open login,Signed in,high\n"
+        "Logout,,Press logout,Signed out,\n"
+    )
+
+    def upload(self, content, name="cases.csv", **data):
+        data.setdefault("project", self.project.pk)
+        data["file"] = SimpleUploadedFile(name, content.encode())
+        return self.client.post(reverse("testcase_import"), data)
+
+    def test_view_creates_cases(self):
+        response = self.upload(self.CSV)
+        self.assertRedirects(response, reverse("testcase_list"))
+        cases = {
+            case.title: case for case in self.project.testcase_set.all()
+        }
+        self.assertEqual(cases["Login"].priority, models.TestCase.HIGH)
+        self.assertEqual(cases["Logout"].priority, models.TestCase.MEDIUM)
+
+    def test_reimport_updates_by_title(self):
+        self.upload(self.CSV)
+        rows = [
+            {"title": "Login", "expected_result": "Dashboard shown"},
+            {"title": "Signup", "priority": "low"},
+        ]
+        content = "\n".join(json.dumps(row) for row in rows)
+        self.upload(content, name="cases.jsonl")
+        self.assertEqual(self.project.testcase_set.count(), 3)
+        self.assertEqual(
+            self.project.testcase_set.get(title="Login").expected_result,
+            "Dashboard shown",
+        )
+
+    def test_invalid_row_rolls_back(self):
+        content = self.CSV + "Broken,,,,urgent\n"
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Line 4: priority")
+        self.assertFalse(self.project.testcase_set.exists())
+
+    def test_inaccessible_project_is_rejected(self):
+        other = User.objects.create_user("other", password="pass12345")
+        project = Project.objects.create(title="Hidden", created_by=other)
+        response = self.upload(self.CSV, project=project.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(project.testcase_set.exists())
+
+    def test_command_uses_batches(self):
+        rows = "".join(f"Case {number},,,,low\n" for number in range(25))
+        path = self.write_temp_file("title,description,steps,"
+                                    "expected_result,priority\n" + rows)
+        output = StringIO()
+        call_command(
+            "import_test_cases", self.project.pk, path, batch_size=10,
+            stdout=output,
+        )
+        self.assertIn("Created 25 and updated 0", output.getvalue())
+        call_command(
+            "import_test_cases", self.project.pk, path, stdout=output
+        )
+        self.assertIn("Created 0 and updated 25", output.getvalue())
+        self.assertEqual(self.project.testcase_set.count(), 25)
+
+    def write_temp_file(self, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "cases.csv")
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+
+class BulkUpdateTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run([TestResult.UNTESTED] * 5)
+        self.url = reverse("testresult_bulk_update", args=[self.test_run.pk])
+        self.result_ids = list(
+            self.test_run.test_results.values_list("pk", flat=True)
+        )
+        TelegramUser.objects.create(user=self.user, token="t", chat_id=42)
+
+    def test_updates_selected_results_with_one_update(self):
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.client.post(
+                self.url,
+                {
+                    "test_result_ids": self.result_ids[:3],
+                    "status": TestResult.FAILED,
+                    "actual_result": "Crashes",
+                },
+            )
+        self.assertRedirects(
+            response, reverse("testrun_detail", args=[self.test_run.pk])
+        )
+        updates = [
+            sql for sql in statements
+            if sql.startswith('UPDATE "bug_tracker_testresult"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            self.test_run.test_results.filter(
+                status=TestResult.FAILED, actual_result="Crashes"
+            ).count(),
+            3,
+        )
+        summary = TestRunSummary.objects.get(test_run=self.test_run)
+        self.assertEqual((summary.failed, summary.untested), (3, 2))
+
+    def test_sends_one_aggregated_notification(self):
+        self.client.post(
+            self.url,
+            {"test_result_ids": self.result_ids, "status": "blocked"},
+        )
+        notification = TelegramNotification.objects.get()
+        self.assertIn("5 test results set to blocked", notification.text)
+        self.assertIn(self.test_run.title, notification.text)
+
+    def test_ignores_results_of_other_runs(self):
+        other_run = self.create_test_run([TestResult.UNTESTED])
+        other_id = other_run.test_results.get().pk
+        self.client.post(
+            self.url, {"test_result_ids": [other_id], "status": "failed"}
+        )
+        self.assertEqual(
+            TestResult.objects.get(pk=other_id).status, TestResult.UNTESTED
+        )
+        self.assertFalse(TelegramNotification.objects.exists())
+
+    def test_requires_access_to_the_run(self):
+        other = User.objects.create_user(username="other", password="x")
+        self.client.force_login(other)
+        response = self.client.post(
+            self.url,
+            {"test_result_ids": self.result_ids, "status": "failed"},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(
+            self.test_run.test_results.exclude(
+                status=TestResult.UNTESTED
+            ).exists()
+        )
+        self.assertFalse(TelegramNotification.objects.exists())
+
+    def test_requires_a_selection(self):
+        response = self.client.post(
+            self.url, {"status": "failed"}, follow=True
+        )
+        self.assertContains(response, "Select test results and a status.")
+
+
+class SearchTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_case = self.create_test_case(
+            title="Login with password",
+            steps="Open the login page and submit the form",
+        )
+        self.create_test_case(title="Logout", description="Ends the session")
+        self.test_run = self.create_test_run()
+        self.result = TestResult.objects.create(
+            test_run=self.test_run,
+            test_case=self.login_case,
+            actual_result="Password field rejects unicode",
+        )
+
+    def hits(self, query, **params):
+        response = self.client.get(reverse("search"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [
+            (kind, obj.pk) for kind, obj in response.context["hits"]
+        ]
+
+    def test_matches_cases_and_results_ranked(self):
+        hits = self.hits("password")
+        self.assertEqual(
+            hits,
+            [("testcase", self.login_case.pk), ("testresult", self.result.pk)],
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.login_case.title = "Sign in"
+        self.login_case.save()
+        TestResult.objects.filter(pk=self.result.pk).update(
+            actual_result="Works"
+        )
+        self.assertEqual(self.hits("password"), [])
+        self.assertEqual(
+            self.hits("sign"), [("testcase", self.login_case.pk)]
+        )
+        self.login_case.delete()
+        self.assertEqual(self.hits("sign"), [])
+
+    def sqlite_objects(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master")
+            return {name for name, in cursor.fetchall()}
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 triggers are SQLite's")
+    def test_triggers_exist_after_migrating(self):
+        self.assertLessEqual(set(SQLITE_TRIGGERS), self.sqlite_objects())
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 triggers are SQLite's")
+    def test_rebuild_command_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER bug_tracker_testcase_fts_insert")
+        # Indexed only by the rebuild
+        case = self.create_test_case(title="Checkout")
+
+        output = StringIO()
+        call_command("rebuild_search_index", stdout=output)
+        self.assertIn("bug_tracker_testcase_fts_insert", output.getvalue())
+        self.assertLessEqual(set(SQLITE_TRIGGERS), self.sqlite_objects())
+        self.assertEqual(self.hits("checkout"), [("testcase", case.pk)])
+
+    def test_stems_and_prefixes(self):
+        self.assertEqual(len(self.hits("submitting")), 1)
+        self.assertEqual(len(self.hits("sess")), 1)
+
+    def test_operators_are_taken_literally(self):
+        self.assertEqual(self.hits('login" OR "logout'), [])
+
+    def test_inaccessible_projects_are_excluded(self):
+        other = User.objects.create_user("other", password="pass12345")
+        project = Project.objects.create(title="Hidden", created_by=other)
+        self.create_test_case(title="Password reset", project=project)
+        self.assertEqual(len(self.hits("password")), 2)
+
+    def test_paginates(self):
+        for number in range(25):
+            self.create_test_case(title=f"Checkout {number}")
+        response = self.client.get(reverse("search"), {"q": "checkout"})
+        self.assertEqual(len(response.context["hits"]), 20)
+        self.assertTrue(response.context["has_next"])
+        self.assertEqual(len(self.hits("checkout", page=2)), 5)
+
+
+class ResultHistoryTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run([TestResult.UNTESTED])
+        self.result = self.test_run.test_results.get()
+
+    def statuses(self, queryset):
+        return list(queryset.values_list("status", flat=True))
+
+    def test_save_appends_on_change_only(self):
+        self.result.status = TestResult.FAILED
+        self.result.save()
+        self.result.save()
+        self.result.actual_result = "Crash"
+        self.result.save()
+        history = TestResultHistory.objects.for_case(self.result.test_case)
+        self.assertEqual(
+            self.statuses(history),
+            [TestResult.FAILED, TestResult.FAILED, TestResult.UNTESTED],
+        )
+
+    def test_bulk_update_appends(self):
+        self.test_run.test_results.update(status=TestResult.PASSED)
+        history = TestResultHistory.objects.for_run(self.test_run)
+        self.assertEqual(
+            self.statuses(history), [TestResult.PASSED, TestResult.UNTESTED]
+        )
+        earlier = timezone.now() + timedelta(minutes=1)
+        self.assertFalse(
+            TestResultHistory.objects.for_run(self.test_run, since=earlier)
+        )
+
+    def test_history_outlives_the_result(self):
+        self.result.status = TestResult.PASSED
+        self.result.save()
+        self.result.delete()
+        history = TestResultHistory.objects.for_run(self.test_run)
+        self.assertEqual(
+            self.statuses(history), [TestResult.PASSED, TestResult.UNTESTED]
+        )
+        self.assertFalse(history.filter(test_result__isnull=False))
+
+    def test_detail_pages_show_history(self):
+        self.client.post(
+            reverse("testresult_update", args=[self.result.pk]),
+            {"status": TestResult.BLOCKED, "actual_result": "Env down"},
+        )
+        response = self.client.get(
+            reverse("testresult_detail", args=[self.result.pk])
+        )
+        self.assertEqual(len(response.context["history"]), 2)
+        response = self.client.get(
+            reverse("testrun_detail", args=[self.test_run.pk])
+        )
+        self.assertEqual(len(response.context["changes_today"]), 2)
+
+
+class FlakinessTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.flaky = self.create_test_case(title="Flaky")
+        self.stable = self.create_test_case(title="Stable")
+        self.broken = self.create_test_case(title="Broken")
+        history = {
+            self.flaky: "pfpfp",
+            self.stable: "ppppp",
+            self.broken: "ppfbff",
+        }
+        statuses = {
+            "p": TestResult.PASSED,
+            "f": TestResult.FAILED,
+            "b": TestResult.BLOCKED,
+        }
+        runs = [self.create_test_run() for _ in range(6)]
+        for test_case, outcomes in history.items():
+            for test_run, outcome in zip(runs, outcomes):
+                TestResult.objects.create(
+                    test_run=test_run,
+                    test_case=test_case,
+                    status=statuses[outcome],
+                )
+        self.url = reverse("project_analytics", args=[self.project.pk])
+
+    def stats(self, **params):
+        response = self.client.get(self.url, params)
+        return {
+            row["test_case"].title: row
+            for row in response.context["case_stats"]
+        }
+
+    def test_scores(self):
+        stats = self.stats()
+        self.assertEqual(stats["Flaky"]["flips"], 4)
+        self.assertEqual(stats["Flaky"]["flakiness"], 1)
+        self.assertEqual(stats["Flaky"]["pass_rate"], 60)
+        self.assertEqual(stats["Stable"]["flips"], 0)
+        self.assertEqual(stats["Stable"]["longest_failure_streak"], 0)
+        # Blocked results are skipped, so the failures form one streak
+        self.assertEqual(stats["Broken"]["longest_failure_streak"], 3)
+        self.assertEqual(stats["Broken"]["current_failure_streak"], 3)
+        self.assertEqual(stats["Broken"]["flips"], 1)
+
+    def test_flakiest_first(self):
+        response = self.client.get(self.url)
+        titles = [
+            row["test_case"].title for row in response.context["case_stats"]
+        ]
+        self.assertEqual(titles[0], "Flaky")
+
+    def test_only_last_runs_count(self):
+        stats = self.stats(runs=2)
+        self.assertEqual(stats["Broken"]["executed"], 2)
+        self.assertEqual(stats["Broken"]["pass_rate"], 0)
+        self.assertEqual(stats["Flaky"]["executed"], 1)
+
+    def test_scores_are_cached_across_result_changes(self):
+        self.stats()
+        TestResult.objects.filter(
+            test_case=self.broken, status=TestResult.FAILED
+        ).update(status=TestResult.PASSED)
+        self.assertEqual(self.stats()["Broken"]["flips"], 1)
+        with override_settings(FLAKINESS_CACHE_TIMEOUT=0):
+            cache.clear()
+            self.assertEqual(self.stats()["Broken"]["flips"], 0)
+
+    def test_new_run_refreshes_cached_scores(self):
+        self.stats()
+        TestResult.objects.create(
+            test_run=self.create_test_run(),
+            test_case=self.broken,
+            status=TestResult.PASSED,
+        )
+        self.assertEqual(self.stats()["Broken"]["flips"], 2)
+
+    def test_inaccessible_project(self):
+        other = User.objects.create_user("other", password="pass12345")
+        project = Project.objects.create(title="Hidden", created_by=other)
+        response = self.client.get(
+            reverse("project_analytics", args=[project.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CloneRunTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED, TestResult.BLOCKED]
+        )
+        self.create_test_case(title="Not in the run")
+        self.url = reverse("testrun_clone", args=[self.source.pk])
+
+    def clone(self, **data):
+        data.setdefault("title", "Cycle 2")
+        data.setdefault("deadline", "2030-01-01")
+        response = self.client.post(self.url, data)
+        clone = TestRun.objects.get(title=data["title"])
+        self.assertRedirects(
+            response, reverse("testrun_detail", args=[clone.pk])
+        )
+        return clone
+
+    def test_copies_cases_as_untested(self):
+        clone = self.clone()
+        self.assertEqual(clone.project, self.project)
+        self.assertEqual(
+            set(clone.test_cases.values_list("pk", flat=True)),
+            set(self.source.test_cases.values_list("pk", flat=True)),
+        )
+        self.assertFalse(
+            clone.test_results.exclude(status=TestResult.UNTESTED).exists()
+        )
+        summary = TestRunSummary.objects.get(test_run=clone)
+        self.assertEqual((summary.untested, summary.total), (3, 3))
+
+    def test_requires_access_to_the_source_run(self):
+        other = User.objects.create_user(username="other", password="x")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        response = self.client.post(
+            self.url, {"title": "Cycle 2", "deadline": "2030-01-01"}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(TestRun.objects.filter(title="Cycle 2").exists())
+
+    def test_only_unsuccessful(self):
+        clone = self.clone(only_unsuccessful="on")
+        self.assertEqual(clone.test_results.count(), 2)
+
+    def test_only_unsuccessful_ignores_other_runs(self):
+        passed = self.source.test_results.get(status=TestResult.PASSED)
+        other_run = self.create_test_run()
+        TestResult.objects.create(
+            test_run=other_run, test_case=passed.test_case,
+            status=TestResult.FAILED,
+        )
+        clone = self.clone(only_unsuccessful="on")
+        self.assertFalse(
+            clone.test_results.filter(test_case=passed.test_case).exists()
+        )
+        self.assertEqual(clone.test_results.count(), 2)
+
+    def test_query_count_does_not_grow_with_cases(self):
+        self.client.get(self.url)  # warm the caches
+        with CaptureQueriesContext(connection) as small:
+            self.clone(title="Small")
+        self.source = self.create_test_run([TestResult.FAILED] * 30)
+        self.url = reverse("testrun_clone", args=[self.source.pk])
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.clone(title="Large")
+
+    def test_form_is_prefilled(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.context["form"].initial["title"], "Test run (copy)"
+        )
+
+
+class QueryPlanTests(BugTrackerTestCase):
+    """Fail when a hot view query falls back to a full table scan."""
+
+    HOT_TABLES = (
+        "bug_tracker_testresult",
+        "bug_tracker_testcase",
+        "bug_tracker_testresulthistory",
+    )
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked on SQLite")
+        self.test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED, TestResult.UNTESTED] * 10
+        )
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            details = [row[-1] for row in cursor.fetchall()]
+        # SQLite before 3.36 writes "SCAN TABLE x" instead of "SCAN x"
+        tables = "|".join(self.HOT_TABLES)
+        return [
+            detail
+            for detail in details
+            if re.fullmatch(rf"SCAN (TABLE )?({tables})", detail)
+        ]
+
+    def assertNoFullScans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        for query in context.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT"):
+                continue
+            with self.subTest(url=url, sql=sql):
+                self.assertEqual(self.full_scans(sql), [])
+
+    def test_key_views_use_indexes(self):
+        run_pk = self.test_run.pk
+        urls = [
+            reverse("testrun_detail", args=[run_pk]),
+            reverse("testrun_detail", args=[run_pk]) + "?status=failed",
+            reverse("project_detail", args=[self.project.pk]),
+            reverse("testresult_list") + f"?testrun={run_pk}&status=failed",
+            reverse("testresult_list"),
+            reverse("testcase_list") + "?priority=high",
+            reverse("add_test_case", args=[run_pk]),
+            reverse(
+                "testresult_detail",
+                args=[self.test_run.test_results.first().pk],
+            ),
+        ]
+        for url in urls:
+            self.assertNoFullScans(url)
+
+    def test_history_is_read_by_index_range(self):
+        result = self.test_run.test_results.first()
+        querysets = {
+            "history_case_timestamp_idx": TestResultHistory.objects.for_case(
+                result.test_case
+            ),
+            "history_run_timestamp_idx": TestResultHistory.objects.for_run(
+                self.test_run, since=timezone.now()
+            ),
+        }
+        for index, queryset in querysets.items():
+            with self.subTest(index=index):
+                plan = queryset.explain()
+                self.assertIn(index, plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_result_is_unique_per_run_and_case(self):
+        result = self.test_run.test_results.first()
+        with self.assertRaises(IntegrityError):
+            TestResult.objects.create(
+                test_run=self.test_run, test_case=result.test_case
+            )
+
+
+class AsyncViewTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run(
+            [TestResult.PASSED, TestResult.FAILED]
+        )
+        self.factory = AsyncRequestFactory()
+
+    async def get(self, view, url, user=None, **kwargs):
+        request = self.factory.get(url, headers=kwargs.pop("headers", {}))
+        request.user = user or self.user
+        return await view.as_view()(request, **kwargs)
+
+    async def test_dashboards(self):
+        pages = [
+            (AsyncTestRunDetailView, {"pk": self.test_run.pk}),
+            (AsyncProjectDetailView, {"pk": self.project.pk}),
+        ]
+        for view, kwargs in pages:
+            with self.subTest(view=view.__name__):
+                response = await self.get(view, "/", **kwargs)
+                self.assertContains(response, self.test_run.title)
+                # The second request is served from the fragment cache
+                response = await self.get(view, "/", **kwargs)
+                self.assertContains(response, self.test_run.title)
+
+    async def test_result_list_filters_and_pages(self):
+        response = await self.get(AsyncTestResultListView, "/?status=failed")
+        self.assertContains(response, "failed")
+        self.assertNotContains(response, "<td>passed</td>")
+        self.assertIn("ETag", response)
+
+    async def test_unchanged_pages_are_not_modified(self):
+        for view, kwargs in [
+            (AsyncTestRunDetailView, {"pk": self.test_run.pk}),
+            (AsyncTestResultListView, {}),
+        ]:
+            with self.subTest(view=view.__name__):
+                etag = (await self.get(view, "/", **kwargs))["ETag"]
+                response = await self.get(
+                    view, "/", headers={"If-None-Match": etag},
+                    **kwargs,
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertIn("private", response["Cache-Control"])
+
+    async def test_run_page_is_modified_after_midnight(self):
+        kwargs = {"pk": self.test_run.pk}
+        etag = (await self.get(AsyncTestRunDetailView, "/", **kwargs))["ETag"]
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch("django.utils.timezone.now", return_value=tomorrow):
+            response = await self.get(
+                AsyncTestRunDetailView, "/",
+                headers={"If-None-Match": etag}, **kwargs,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_anonymous_user_is_redirected(self):
+        response = await self.get(
+            AsyncTestResultListView, "/test-result/", user=AnonymousUser()
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/login", response["Location"])
+
+    async def test_missing_project(self):
+        with self.assertRaises(Http404):
+            await self.get(AsyncProjectDetailView, "/", pk=0)
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    async def test_sync_views_behind_async_middleware(self):
+        response = await self.async_client.get(reverse("testrun_list"))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("Server-Timing", response)
+
+
+@override_settings(LIVE_RUN_EVENTS=True,
+                   RUN_EVENTS_HUB="bug_tracker.run_events.InProcessHub")
+class RunEventsTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.test_run = self.create_test_run([TestResult.UNTESTED] * 2)
+        self.result = self.test_run.test_results.order_by("pk").first()
+        self.subscription = get_hub().subscribe(run_topic(self.test_run.pk))
+        self.addCleanup(self.subscription.close)
+
+    def events(self):
+        events = []
+        while (event := self.subscription.get(0)) is not None:
+            events.append(event)
+        return events
+
+    def test_save_publishes_delta_and_row_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(
+                reverse("testresult_update", args=[self.result.pk]),
+                {"status": TestResult.FAILED, "actual_result": "Crashes"},
+            )
+        self.assertEqual(self.events(), [])
+        for callback in callbacks:
+            callback()
+
+        [event] = self.events()
+        self.assertEqual(event["type"], "results")
+        self.assertEqual(event["delta"], {"untested": -1, "failed": 1})
+        [row] = event["rows"]
+        self.assertEqual(
+            (row["id"], row["status"], row["status_display"]),
+            (self.result.pk, "failed", "Failed"),
+        )
+
+    def test_unchanged_status_publishes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.result.actual_result = "Still untested"
+            self.result.save()
+        self.assertEqual(self.events(), [])
+
+    def test_bulk_update_publishes_counts_and_rows(self):
+        result_ids = list(
+            self.test_run.test_results.values_list("pk", flat=True)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("testresult_bulk_update", args=[self.test_run.pk]),
+                {"test_result_ids": result_ids, "status": "blocked"},
+            )
+        events = [
+            event for event in self.events() if event["type"] == "results"
+        ]
+        self.assertEqual(events[-1]["counts"]["blocked"], 2)
+        self.assertEqual(
+            [row["id"] for row in events[-1]["rows"]], sorted(result_ids)
+        )
+
+        with override_settings(RUN_EVENTS_MAX_ROWS=1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.test_run.test_results.update(status="passed")
+        self.assertEqual(self.events(), [{"type": "reload"}])
+
+    def test_delete_publishes_removal(self):
+        pk = self.result.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.result.delete()
+        self.assertEqual(
+            self.events(),
+            [{"type": "results", "delta": {"untested": -1},
+              "removed": [pk]}],
+        )
+
+    def test_run_page_follows_the_stream(self):
+        response = self.client.get(
+            reverse("testrun_detail", args=[self.test_run.pk])
+        )
+        self.assertContains(
+            response,
+            reverse("testrun_events", args=[self.test_run.pk]),
+        )
+        self.assertContains(response, "/static/js/run_progress.js")
+        self.assertContains(
+            response, f'data-result-id="{self.result.pk}"'
+        )
+
+    @override_settings(RUN_EVENTS_STREAM_SECONDS=0)
+    def test_stream_starts_with_counts(self):
+        response = self.client.get(
+            reverse("testrun_events", args=[self.test_run.pk])
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("event: counts\n", content)
+        self.assertIn('"untested": 2', content)
+
+    @override_settings(RUN_EVENTS_STREAM_SECONDS=0)
+    async def test_async_stream_starts_with_counts(self):
+        request = AsyncRequestFactory().get("/")
+        request.user = self.user
+        response = await AsyncTestRunEventsView.as_view()(
+            request, pk=self.test_run.pk
+        )
+        content = "".join(
+            [chunk.decode() async for chunk in response.streaming_content]
+        )
+        self.assertIn("event: counts\n", content)
+
+    def test_stream_requires_access(self):
+        other = User.objects.create_user(username="other", password="x")
+        self.client.force_login(other)
+        response = self.client.get(
+            reverse("testrun_events", args=[self.test_run.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_slow_subscriber_is_told_to_reload(self):
+        with override_settings(RUN_EVENTS_MAX_PENDING=2):
+            subscription = get_hub().subscribe("slow")
+        for number in range(3):
+            get_hub().publish("slow", {"type": "results", "n": number})
+        self.assertEqual(subscription.get(0), {"type": "reload"})
+        self.assertIsNone(subscription.get(0))
+        subscription.close()
+        self.assertFalse(get_hub().has_subscribers("slow"))
+
+    def test_async_subscriber_wakes_on_publish(self):
+        subscription = get_hub().subscribe("async")
+        self.addCleanup(subscription.close)
+        timer = threading.Timer(
+            0.05, get_hub().publish, ["async", {"type": "reload"}]
+        )
+        timer.start()
+        self.assertEqual(
+            async_to_sync(subscription.aget)(5), {"type": "reload"}
+        )
+        self.assertIsNone(async_to_sync(subscription.aget)(0.01))
+
+    async def test_async_subscription_closes(self):
+        subscription = await get_hub().asubscribe("async")
+        self.assertTrue(get_hub().has_subscribers("async"))
+        await subscription.aclose()
+        self.assertFalse(get_hub().has_subscribers("async"))
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica_1"], REPLICA_STICKY_SECONDS=10
+)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def serve(self, request, view):
+        self.read_from = []
+
+        def get_response(request):
+            view()
+            self.read_from.append(router.db_for_read(TestResult))
+            self.read_from.append(router.db_for_read(Session))
+            return HttpResponse()
+
+        return ReplicaRoutingMiddleware(get_response)(request)
+
+    def test_get_reads_from_replica(self):
+        response = self.serve(self.factory.get("/"), lambda: None)
+        self.assertEqual(self.read_from, ["replica_1", "default"])
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name,
+                         response.cookies)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(router.db_for_read(TestResult), "default")
+        self.assertEqual(router.db_for_write(TestResult), "default")
+
+    def test_write_pins_the_rest_of_the_request_and_the_user(self):
+        response = self.serve(
+            self.factory.get("/"), lambda: router.db_for_write(TestResult)
+        )
+        self.assertEqual(self.read_from[0], "default")
+        cookie = response.cookies[ReplicaRoutingMiddleware.cookie_name]
+        self.assertEqual(cookie["max-age"], 10)
+
+        self.serve(
+            self.factory.get(
+                "/", HTTP_COOKIE=f"{ReplicaRoutingMiddleware.cookie_name}=1"
+            ),
+            lambda: None,
+        )
+        self.assertEqual(self.read_from[0], "default")
+
+    def test_post_reads_from_primary(self):
+        response = self.serve(
+            self.factory.post("/"), lambda: router.db_for_write(TestRun)
+        )
+        self.assertEqual(self.read_from[0], "default")
+        self.assertIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+    def test_session_writes_do_not_pin(self):
+        response = self.serve(
+            self.factory.get("/"),
+            lambda: router.db_for_write(Session),
+        )
+        self.assertEqual(self.read_from[0], "replica_1")
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name,
+                         response.cookies)
+
+    def test_replica_reads_shorten_cache_timeouts(self):
+        self.serve(
+            self.factory.get("/"),
+            lambda: self.assertEqual(replica_cache_timeout(600), 10),
+        )
+        self.assertEqual(replica_cache_timeout(600), 600)
+
+
+class AssetBundleTests(SimpleTestCase):
+    def setUp(self):
+        self.static_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static_dir.cleanup)
+        files = {
+            "css/site.css": (
+                "/* comment */\n.logo { background: url('../img/logo.png'); }"
+                "\n@font-face { src: url(\"../fonts/x.woff2?v=1#x\"); }\n"
+            ),
+            "js/one.js": "/*! License */\nvar one = 1\n",
+            "js/two.js": "var two = 2;\n",
+            "img/logo.png": "",
+            "fonts/x.woff2": "",
+            "unused/lib.js": "",
+        }
+        for name, content in files.items():
+            path = os.path.join(self.static_dir.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(content)
+        settings_override = override_settings(
+            STATICFILES_DIRS=[self.static_dir.name],
+            ASSET_BUNDLES={
+                "bundles/site.css": ["css/site.css"],
+                "bundles/site.js": ["js/one.js", "js/two.js"],
+            },
+            ASSET_EXTRA_FILES=["img/*"],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def read_bundle(self, name):
+        with open(os.path.join(self.static_dir.name, name)) as file:
+            return file.read()
+
+    def test_unbuilt_bundle_links_sources(self):
+        rendered = Template(
+            "{% load assets %}{% bundle 'bundles/site.js' %}"
+        ).render(Context())
+        self.assertHTMLEqual(
+            rendered,
+            '<script src="/static/js/one.js"></script>'
+            '<script src="/static/js/two.js"></script>',
+        )
+
+    def test_build_rebases_urls_and_narrows_collection(self):
+        call_command("build_assets", no_collect=True, stdout=StringIO())
+
+        css = self.read_bundle("bundles/site.css")
+        self.assertNotIn("comment", css)
+        self.assertIn('url("../img/logo.png")', css)
+        self.assertIn('url("../fonts/x.woff2#x")', css)
+        self.assertEqual(
+            self.read_bundle("bundles/site.js"),
+            "/*! License */var one=1;\nvar two=2;",
+        )
+
+        collect_list = read_collect_list()
+        self.assertTrue(is_collected("fonts/x.woff2", collect_list))
+        self.assertTrue(is_collected("img/logo.png", collect_list))
+        self.assertFalse(is_collected("css/site.css", collect_list))
+        self.assertFalse(is_collected("unused/lib.js", collect_list))
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seed_then_benchmark(self):
+        output = StringIO()
+        call_command(
+            "seed_data", users=3, projects=2, cases=20, runs=4, results=30,
+            seed=1, stdout=output,
+        )
+        self.assertEqual(TestResult.objects.count(), 30)
+        call_command("rebuild_run_summaries", "--verify", stdout=output)
+
+        output = StringIO()
+        call_command("benchmark", iterations=2, warmup=0, stdout=output)
+        report = json.loads(output.getvalue())
+        self.assertIn("testrun_detail", report)
+        for name, entry in report.items():
+            with self.subTest(name=name):
+                self.assertIn(entry["status"], (200, 302))
+                self.assertLessEqual(entry["p50_ms"], entry["p99_ms"])
+
+
+class AccessibleProjectsTests(BugTrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username="other", password="x")
+
+    def test_ids_are_cached(self):
+        get_accessible_project_ids(self.user)
+        with self.assertNumQueries(0):
+            ids = get_accessible_project_ids(self.user)
+        self.assertEqual(ids, {self.project.pk})
+
+    @override_settings(SHARED_CACHE=False)
+    def test_ids_are_not_cached_without_a_shared_cache(self):
+        get_accessible_project_ids(self.user)
+        self.assertIsNone(cache.get(f"accessible_project_ids:{self.user.pk}"))
+        with self.assertNumQueries(1):
+            ids = get_accessible_project_ids(self.user)
+        self.assertEqual(ids, {self.project.pk})
+
+    def test_sharing_invalidates_cache(self):
+        self.assertEqual(get_accessible_project_ids(self.other), set())
+
+        self.client.post(
+            reverse("share_project", args=[self.project.pk]),
+            {"users": [self.other.pk]},
+        )
+        self.assertEqual(
+            get_accessible_project_ids(self.other), {self.project.pk}
+        )
+
+        self.project.shared_with.clear()
+        self.assertEqual(get_accessible_project_ids(self.other), set())
+
+    def test_create_and_delete_invalidate_cache(self):
+        get_accessible_project_ids(self.user)
+        self.client.post(reverse("project_create"), {"title": "New"})
+        new_project = Project.objects.get(title="New")
+        self.assertEqual(
+            get_accessible_project_ids(self.user),
+            {self.project.pk, new_project.pk},
+        )
+
+        self.client.post(reverse("project_delete", args=[new_project.pk]))
+        self.assertEqual(
+            get_accessible_project_ids(self.user), {self.project.pk}
+        )
+
+    def test_lists_only_show_accessible_rows(self):
+        foreign = Project.objects.create(
+            title="Foreign", created_by=self.other
+        )
+        self.create_test_run([TestResult.PASSED])
+        self.create_test_run([TestResult.FAILED], project=foreign)
+
+        response = self.client.get(reverse("testresult_list"))
+        self.assertEqual(len(response.context["testresults"]), 1)
+        response = self.client.get(reverse("testrun_list"))
+        self.assertEqual(len(response.context["testruns"]), 1)
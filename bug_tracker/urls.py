@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from bug_tracker.views import (
@@ -8,9 +9,11 @@ from bug_tracker.views import (
     TestCaseCreateView,
     TestCaseUpdateView,
     TestCaseDeleteView,
+    TestCaseImportView,
     ProjectListView,
     ProjectCreateView,
     ProjectDetailView,
+    ProjectAnalyticsView,
     ProjectUpdateView,
     ProjectDeleteView,
     AddTestCaseView,
@@ -18,22 +21,42 @@ from bug_tracker.views import (
     TestRunUpdateView,
     TestRunDeleteView,
     TestRunDetailView,
+    TestRunCloneView,
+    TestRunEventsView,
     TestResultUpdateView,
+    TestResultBulkUpdateView,
     TestResultDetailView,
     ConnectTelegramView,
     share_project,
     TestResultListView,
+    TestResultExportView,
     IndexView,
     SharedProjectListView,
+    SearchView,
+    telegram_webhook,
 )
 
+if settings.ASYNC_VIEWS:
+    from bug_tracker.async_views import (  # noqa: F811
+        AsyncProjectDetailView as ProjectDetailView,
+        AsyncTestResultListView as TestResultListView,
+        AsyncTestRunDetailView as TestRunDetailView,
+        AsyncTestRunEventsView as TestRunEventsView,
+    )
+
 urlpatterns = [
     path(
         "connect-telegram/",
         ConnectTelegramView.as_view(),
         name="connect_telegram"
     ),
+    path(
+        "telegram/webhook/",
+        telegram_webhook,
+        name="telegram_webhook"
+    ),
     path("", IndexView.as_view(), name="index"),
+    path("search/", SearchView.as_view(), name="search"),
     path("login/", auth_views.LoginView.as_view(), name="login"),
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
     path("register/", RegisterView.as_view(), name="register"),
@@ -54,6 +77,11 @@ urlpatterns = [
         ProjectDetailView.as_view(),
         name="project_detail"
     ),
+    path(
+        "project/<int:pk>/analytics/",
+        ProjectAnalyticsView.as_view(),
+        name="project_analytics"
+    ),
     path(
         "project/<int:pk>/update/",
         ProjectUpdateView.as_view(),
@@ -81,6 +109,11 @@ urlpatterns = [
         TestRunDetailView.as_view(),
         name="testrun_detail"
     ),
+    path(
+        "testrun/<int:pk>/events/",
+        TestRunEventsView.as_view(),
+        name="testrun_events"
+    ),
     path(
         "testrun/<int:pk>/update/",
         TestRunUpdateView.as_view(),
@@ -91,6 +124,16 @@ urlpatterns = [
         TestRunDeleteView.as_view(),
         name="testrun_delete"
     ),
+    path(
+        "testrun/<int:pk>/bulk_update/",
+        TestResultBulkUpdateView.as_view(),
+        name="testresult_bulk_update",
+    ),
+    path(
+        "testrun/<int:pk>/clone/",
+        TestRunCloneView.as_view(),
+        name="testrun_clone",
+    ),
     path(
         "testrun/<int:pk>/add_test_case/",
         AddTestCaseView.as_view(),
@@ -107,6 +150,11 @@ urlpatterns = [
         TestCaseCreateView.as_view(),
         name="testcase_create"
     ),
+    path(
+        "testcase/import/",
+        TestCaseImportView.as_view(),
+        name="testcase_import"
+    ),
     path(
         "testcase/<int:pk>/",
         TestCaseDetailView.as_view(),
@@ -128,6 +176,11 @@ urlpatterns = [
         TestResultListView.as_view(),
         name="testresult_list"
     ),
+    path(
+        "test-result/export/",
+        TestResultExportView.as_view(),
+        name="testresult_export"
+    ),
     path(
         "testresult/<int:pk>/update/",
         TestResultUpdateView.as_view(),
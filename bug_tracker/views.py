@@ -1,8 +1,22 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+)
 from django.utils import timezone
-from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Count, F, IntegerField, Value, Case, When
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.views import View
@@ -12,11 +26,30 @@ from django.views.generic import (
     DetailView,
     UpdateView,
     DeleteView,
+    FormView,
+)
+from .access import get_accessible_project_ids
+from .analytics import case_flakiness
+from .cache_versions import get_version, render_cached_fragment
+from .conditional import (
+    ConditionalGetMixin,
+    make_etag,
+    results_validators,
 )
-from telebot import TeleBot
+from .exports import EXPORT_FORMATS, export_response
+from .imports import ImportFailed, import_test_cases, read_rows
 from .forms import RegisterForm, TestCaseForm, TestRunForm
+from .forms import TestCaseImportForm, TestResultBulkUpdateForm
+from .forms import TestRunCloneForm
 from .forms import ShareProjectForm
 from .models import TestRun, TestCase, Project, TestResult, TelegramUser
+from .models import TestResultHistory
+from .notifications import notify_result_changed, notify_results_changed
+from .pagination import KeysetPaginationMixin
+from .run_events import run_events_response
+from .run_statistics import get_run_statistics
+from .search import search
+from .telegram_updates import process_updates
 from .utils import generate_unique_token
 
 
@@ -56,6 +89,33 @@ class ConnectTelegramView(View):
         return redirect("connect_telegram")
 
 
+@csrf_exempt
+@require_POST
+def telegram_webhook(request):
+    secret = settings.TELEGRAM_WEBHOOK_SECRET
+    if not secret:
+        raise Http404("Telegram webhook is not configured.")
+    if not constant_time_compare(
+        request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret
+    ):
+        return HttpResponseForbidden()
+
+    try:
+        updates = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid JSON.")
+    # Telegram posts one update per request; relays may batch them
+    if isinstance(updates, dict):
+        updates = [updates]
+    if not isinstance(updates, list):
+        return HttpResponseBadRequest("Expected an update or a list.")
+
+    processed = process_updates(
+        [update for update in updates if isinstance(update, dict)]
+    )
+    return JsonResponse({"ok": True, "processed": processed})
+
+
 class IndexView(View):
     def get(self, request):
         if request.user.is_authenticated:
@@ -95,62 +155,50 @@ class SharedProjectListView(LoginRequiredMixin, ListView):
 
 
 class ProjectDetailView(View):
+    template_name = "bug_tracker/project_detail.html"
+
     def get(self, request, pk):
-        project = get_object_or_404(Project, pk=pk)
-        testcases = (
-            project.testcase_set.all()
-        )  # Retrieve all related test cases for the project
-        testruns = (
-            project.testrun_set.all()
-        )  # Retrieve all related test runs for the project
-
-        testrun_data = []
-        for testrun in testruns:
-            passed_count = testrun.test_results.filter(
-                status="passed").count()
-            failed_count = testrun.test_results.filter(
-                status="failed").count()
-            blocked_count = testrun.test_results.filter(
-                status="blocked").count()
-            untested_count = testrun.test_results.filter(
-                status="untested").count()
-            total_count = testrun.test_results.count()
-
-            passed_percent = (
-                (passed_count / total_count) * 100 if total_count > 0 else 0
-            )
-            failed_percent = (
-                (failed_count / total_count) * 100 if total_count > 0 else 0
-            )
-            blocked_percent = (
-                (blocked_count / total_count) * 100 if total_count > 0 else 0
-            )
-            untested_percent = (
-                (untested_count / total_count) * 100 if total_count > 0 else 0
-            )
+        def get_context():
+            project = get_object_or_404(Project, pk=pk)
+            testcases = (
+                project.testcase_set.all()
+            )  # Retrieve all related test cases for the project
+            testruns = (
+                project.testrun_set.select_related("project")
+            )  # Retrieve all related test runs for the project
+            return {
+                "project": project,
+                "testcases": testcases,
+                "testrun_data": get_run_statistics(testruns),
+            }
 
-            testrun_data.append(
-                {
-                    "testrun": testrun,
-                    "passed_count": passed_count,
-                    "failed_count": failed_count,
-                    "blocked_count": blocked_count,
-                    "untested_count": untested_count,
-                    "total_count": total_count,
-                    "passed_percent": passed_percent,
-                    "failed_percent": failed_percent,
-                    "blocked_percent": blocked_percent,
-                    "untested_percent": untested_percent,
-                }
-            )
+        dashboard = render_cached_fragment(
+            "project", pk, "bug_tracker/project_dashboard.html",
+            get_context, request,
+        )
+        return render(request, self.template_name, {"dashboard": dashboard})
+
+
+class ProjectAnalyticsView(LoginRequiredMixin, View):
+    template_name = "bug_tracker/project_analytics.html"
+    max_runs = 500
 
+    def get(self, request, pk):
+        if pk not in get_accessible_project_ids(request.user):
+            raise Http404("No Project matches the given query.")
+        project = get_object_or_404(Project, pk=pk)
+        try:
+            runs = min(max(int(request.GET.get("runs", 20)), 2),
+                       self.max_runs)
+        except ValueError:
+            runs = 20
         return render(
             request,
-            "bug_tracker/project_detail.html",
+            self.template_name,
             {
                 "project": project,
-                "testcases": testcases,
-                "testrun_data": testrun_data
+                "runs": runs,
+                "case_stats": case_flakiness(project, runs),
             },
         )
 
@@ -202,100 +250,124 @@ def share_project(request, project_id):
     return render(request, "bug_tracker/share_project.html", context)
 
 
-class TestRunListView(LoginRequiredMixin, ListView):
+class TestRunListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = TestRun
     template_name = "bug_tracker/testrun_list.html"
     context_object_name = "testruns"
+    keyset = ("id",)
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = super().get_queryset()
+        # Show test runs of projects created by or shared with the user
+        queryset = super().get_queryset().filter(
+            project_id__in=get_accessible_project_ids(self.request.user)
+        )
 
-        # Show test runs of projects created by the logged-in user
-        queryset = queryset.filter(project__created_by=user)
+        project_id = self.request.GET.get("project")
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
 
-        # Show test runs of projects shared with the logged-in user
-        queryset |= self.model.objects.filter(project__shared_with=user)
+        return queryset.select_related("project")
 
-        # Annotate the queryset as before
-        queryset = queryset.annotate(
-            passed_count=Count(
-                "test_results", filter=Q(
-                    test_results__status=TestResult.PASSED)
-            ),
-            failed_count=Count(
-                "test_results", filter=Q(
-                    test_results__status=TestResult.FAILED)
-            ),
-            blocked_count=Count(
-                "test_results", filter=Q(
-                    test_results__status=TestResult.BLOCKED)
-            ),
-            skipped_count=Count(
-                "test_results", filter=Q(
-                    test_results__status=TestResult.UNTESTED)
-            ),
-            total_count=Count("test_results"),
-            passed_percent=Case(
-                When(total_count=0, then=Value(0)),
-                default=100 * F("passed_count") / F("total_count"),
-                output_field=IntegerField(),
-            ),
-            failed_percent=Case(
-                When(total_count=0, then=Value(0)),
-                default=100 * F("failed_count") / F("total_count"),
-                output_field=IntegerField(),
-            ),
-            blocked_percent=Case(
-                When(total_count=0, then=Value(0)),
-                default=100 * F("blocked_count") / F("total_count"),
-                output_field=IntegerField(),
-            ),
-            skipped_percent=Case(
-                When(total_count=0, then=Value(0)),
-                default=100 * F("skipped_count") / F("total_count"),
-                output_field=IntegerField(),
-            ),
-        )
-
-        return queryset
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["testrun_data"] = get_run_statistics(context["testruns"])
+        return context
 
 
-class TestRunDetailView(LoginRequiredMixin, View):
+class TestRunDetailView(LoginRequiredMixin, ConditionalGetMixin, View):
     template_name = "bug_tracker/testrun_detail.html"
 
+    def get_etag(self, request, pk):
+        # The dashboard version changes with anything the page shows, so
+        # revalidating costs no queries
+        return make_etag(
+            request.user.pk,
+            get_version("testrun", pk),
+            request.GET.get("status"),
+            request.GET.get("priority"),
+            # "Changes today" changes at midnight too
+            timezone.localdate(),
+        )
+
     def get(self, request, pk):
-        test_run = TestRun.objects.filter(pk=pk).first()
-        if not test_run:
+        status = request.GET.get("status")
+        priority = request.GET.get("priority")
+
+        def get_context():
+            test_run = (
+                TestRun.objects.select_related("project")
+                .filter(pk=pk)
+                .first()
+            )
+            if not test_run:
+                raise TestRun.DoesNotExist
+            test_results = test_run.test_results.select_related("test_case")
+            stats = get_run_statistics([test_run])[0]
+
+            if status:
+                test_results = test_results.filter(status=status)
+
+            if priority:
+                test_results = test_results.filter(
+                    test_case__priority=priority
+                )
+
+            today = timezone.localtime().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            return {
+                "test_run": test_run,
+                "test_results": test_results,
+                "changes_today": (
+                    TestResultHistory.objects.for_run(test_run, since=today)
+                    .select_related("test_case")[:20]
+                ),
+                "passed_count": stats["passed_count"],
+                "failed_count": stats["failed_count"],
+                "blocked_count": stats["blocked_count"],
+                "untested_count": stats["untested_count"],
+            }
+
+        try:
+            dashboard = render_cached_fragment(
+                "testrun", pk, "bug_tracker/testrun_dashboard.html",
+                get_context, request,
+                # "Changes today" must not outlive the day it was cached on
+                variant=(status, priority, timezone.localdate()),
+            )
+        except TestRun.DoesNotExist:
             # Test run not found, generate template with a message
             context = {
                 "message": "Test run not found.",
             }
             return render(request, self.template_name, context)
-        test_results = test_run.test_results.all()
-
-        passed_count = test_results.filter(status="passed").count()
-        failed_count = test_results.filter(status="failed").count()
-        blocked_count = test_results.filter(status="blocked").count()
-        untested_count = test_results.filter(status="untested").count()
+        return render(
+            request,
+            self.template_name,
+            {
+                "dashboard": dashboard,
+                "bulk_update_form": TestResultBulkUpdateForm(),
+                "test_run_pk": pk,
+                "live_updates": settings.LIVE_RUN_EVENTS,
+            },
+        )
 
-        status = request.GET.get("status")
-        if status:
-            test_results = test_results.filter(status=status)
-        priority = request.GET.get("priority")
 
-        if priority:
-            test_results = test_results.filter(test_case__priority=priority)
+class TestRunEventsView(LoginRequiredMixin, View):
+    """Live progress of a run as Server-Sent Events; see run_events."""
 
-        context = {
-            "test_run": test_run,
-            "test_results": test_results,
-            "passed_count": passed_count,
-            "failed_count": failed_count,
-            "blocked_count": blocked_count,
-            "untested_count": untested_count,
-        }
-        return render(request, self.template_name, context)
+    def get(self, request, pk):
+        project_id = (
+            TestRun.objects.filter(pk=pk)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+        if (
+            not settings.LIVE_RUN_EVENTS
+            or project_id not in get_accessible_project_ids(request.user)
+        ):
+            raise Http404("No TestRun matches the given query.")
+        return run_events_response(pk)
 
 
 class TestRunCreateView(LoginRequiredMixin, CreateView):
@@ -322,6 +394,55 @@ class TestRunUpdateView(LoginRequiredMixin, UpdateView):
         return kwargs
 
 
+class TestRunCloneView(LoginRequiredMixin, CreateView):
+    """Create a run with the cases of another one, reset to untested."""
+
+    model = TestRun
+    form_class = TestRunCloneForm
+    template_name = "bug_tracker/testrun_clone.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        # Runs before LoginRequiredMixin.dispatch()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        self.source = get_object_or_404(
+            TestRun.objects.select_related("project").filter(
+                project_id__in=get_accessible_project_ids(request.user)
+            ),
+            pk=kwargs["pk"],
+        )
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_initial(self):
+        return {
+            "title": f"{self.source.title} (copy)",
+            "description": self.source.description,
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["source"] = self.source
+        return context
+
+    def form_valid(self, form):
+        form.instance.project = self.source.project
+        # One filter() call, so both conditions apply to the same result;
+        # (test_run, test_case) is unique, so no case is matched twice
+        conditions = {"test_results__test_run": self.source}
+        if form.cleaned_data["only_unsuccessful"]:
+            conditions["test_results__status__in"] = [
+                TestResult.FAILED, TestResult.BLOCKED
+            ]
+        test_cases = TestCase.objects.filter(**conditions)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            TestResult.objects.add_test_cases(self.object, test_cases)
+        return response
+
+    def get_success_url(self):
+        return reverse("testrun_detail", args=[self.object.pk])
+
+
 class AddTestCaseView(LoginRequiredMixin, View):
     def get(self, request, pk):
         test_run = get_object_or_404(TestRun, pk=pk)
@@ -336,10 +457,31 @@ class AddTestCaseView(LoginRequiredMixin, View):
 
     def post(self, request, pk):
         test_run = get_object_or_404(TestRun, pk=pk)
-        test_case_ids = request.POST.getlist("test_case_ids")
-        for test_case_id in test_case_ids:
-            test_case = get_object_or_404(TestCase, pk=test_case_id)
-            TestResult.objects.create(test_run=test_run, test_case=test_case)
+
+        if request.POST.get("add_all"):
+            # Add every case of the project matching the filter
+            test_cases = TestCase.objects.all()
+            priority = request.POST.get("priority")
+            if priority:
+                test_cases = test_cases.filter(priority=priority)
+            TestResult.objects.add_test_cases(test_run, test_cases)
+            return redirect("testrun_detail", pk=pk)
+
+        try:
+            test_case_ids = {
+                int(test_case_id)
+                for test_case_id in request.POST.getlist("test_case_ids")
+            }
+        except ValueError:
+            raise Http404("Invalid test case id.")
+
+        with transaction.atomic():
+            _, matched = TestResult.objects.add_test_cases(
+                test_run, TestCase.objects.filter(pk__in=test_case_ids)
+            )
+            if matched != len(test_case_ids):
+                # Some ids are not cases of this project; add nothing
+                raise Http404("No TestCase matches the given query.")
         return redirect("testrun_detail", pk=pk)
 
 
@@ -349,15 +491,26 @@ class TestRunDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy("testrun_list")
 
 
-class TestCaseListView(LoginRequiredMixin, ListView):
+class TestCaseListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    model = TestCase
     template_name = "bug_tracker/testcase_list.html"
     context_object_name = "testcases"
+    keyset = ("id",)
 
     def get_queryset(self):
-        user = self.request.user
-        return TestCase.objects.filter(
-            Q(project__created_by=user) | Q(project__shared_with=user)
-        ).distinct()
+        queryset = TestCase.objects.filter(
+            project_id__in=get_accessible_project_ids(self.request.user)
+        )
+
+        project_id = self.request.GET.get("project")
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
+
+        priority = self.request.GET.get("priority")
+        if priority:
+            queryset = queryset.filter(priority=priority)
+
+        return queryset.select_related("project")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -399,6 +552,37 @@ class TestCaseUpdateView(LoginRequiredMixin, UpdateView):
         return kwargs
 
 
+class TestCaseImportView(LoginRequiredMixin, FormView):
+    form_class = TestCaseImportForm
+    template_name = "bug_tracker/testcase_import.html"
+    success_url = reverse_lazy("testcase_list")
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        file = io.TextIOWrapper(
+            form.cleaned_data["file"], encoding="utf-8-sig", newline=""
+        )
+        try:
+            created, updated = import_test_cases(
+                form.cleaned_data["project"],
+                read_rows(file, form.cleaned_data["format"]),
+            )
+        except (ImportFailed, UnicodeDecodeError, csv.Error) as error:
+            errors = getattr(error, "errors", [str(error)])
+            for message in errors[:20]:
+                form.add_error("file", message)
+            return self.form_invalid(form)
+        messages.success(
+            self.request,
+            f"Created {created} and updated {updated} test cases.",
+        )
+        return super().form_valid(form)
+
+
 class TestCaseDeleteView(LoginRequiredMixin, DeleteView):
     model = TestCase
     template_name = "bug_tracker/testcase_confirm_delete.html"
@@ -416,41 +600,50 @@ class TestResultUpdateView(UpdateView):
 
     def form_valid(self, form):
         instance = form.save(commit=False)
-        if instance.status != TestResult.PASSED:
-            # Retrieve the chat ID from TelegramUser
-            try:
-                telegram_user = TelegramUser.objects.get(
-                    user=self.request.user
-                )
-                chat_id = telegram_user.chat_id
-
-                test_case = instance.test_case
-                project = test_case.project
-
-                test_case_details = f"Test case: {test_case.title}\n\n"
-                test_case_details += f"Description: {test_case.description}\n"
-                test_case_details += f"Steps:\n {test_case.steps}\n"
-                test_case_details += (f"Expected Result: "
-                                      f"{test_case.expected_result}\n\n")
-                test_case_details += f"Project: {project.title}\n"
-                test_case_details += f"Description: {project.description}\n"
-
-                message = (f"Test case: {test_case.title}\n"
-                           f"\nTest status: {instance.status}"
-                           f"\nActual Result: {instance.actual_result}\n "
-                           f"\n{test_case_details}")
-                try:
-                    bot = TeleBot(settings.TELEGRAM_BOT_API_KEY)
-                    bot.send_message(chat_id, message)
-                except Exception:
-                    pass
-            except TelegramUser.DoesNotExist:
-                # Handle the case when no TelegramUser
-                # record exists for the user
-                pass
         instance.timestamp = timezone.now()
-        instance.save()
-        return super().form_valid(form)
+        with transaction.atomic():
+            instance.save()
+            notify_result_changed(instance)
+            return super().form_valid(form)
+
+
+class TestResultBulkUpdateView(LoginRequiredMixin, View):
+    """Set one status on many results of a run with a single UPDATE."""
+
+    def post(self, request, pk):
+        test_run = get_object_or_404(
+            TestRun.objects.select_related("project").filter(
+                project_id__in=get_accessible_project_ids(request.user)
+            ),
+            pk=pk,
+        )
+        form = TestResultBulkUpdateForm(request.POST)
+        try:
+            test_result_ids = {
+                int(test_result_id)
+                for test_result_id in request.POST.getlist("test_result_ids")
+            }
+        except ValueError:
+            raise Http404("Invalid test result id.")
+        if not form.is_valid() or not test_result_ids:
+            messages.error(request, "Select test results and a status.")
+            return redirect("testrun_detail", pk=pk)
+
+        status = form.cleaned_data["status"]
+        changes = {"status": status}
+        actual_result = form.cleaned_data["actual_result"]
+        if actual_result:
+            changes["actual_result"] = actual_result
+        test_results = test_run.test_results.filter(pk__in=test_result_ids)
+        with transaction.atomic():
+            updated = test_results.update(**changes)
+            notify_results_changed(
+                test_run, test_results, status, actual_result
+            )
+        messages.success(
+            request, f"Set {updated} test results to {status}."
+        )
+        return redirect("testrun_detail", pk=pk)
 
 
 class TestResultDetailView(DetailView):
@@ -461,23 +654,32 @@ class TestResultDetailView(DetailView):
         obj = get_object_or_404(TestResult, id=self.kwargs["result_id"])
         return obj
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["history"] = (
+            TestResultHistory.objects.for_case(self.object.test_case_id)
+            .select_related("test_run")[:20]
+        )
+        return context
 
-class TestResultListView(ListView):
-    model = TestResult
-    template_name = "bug_tracker/testresult_list.html"
-    context_object_name = "testresults"
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
+class TestResultFilterMixin:
+    """Results the user can access, narrowed by the request's filters.
 
-        user = self.request.user
+    Shared by the result list and its export so both honour the same
+    ``status``, ``project`` and ``testrun`` parameters.
+    """
 
+    def get_queryset(self):
+        return self.filter_results(
+            TestResult.objects.all(),
+            get_accessible_project_ids(self.request.user),
+        )
+
+    def filter_results(self, queryset, project_ids):
         # Filter results by projects created by
         # the user or shared with the user
-        queryset = queryset.filter(
-            Q(test_run__project__created_by=user)
-            | Q(test_run__project__shared_with=user)
-        )
+        queryset = queryset.filter(test_run__project_id__in=project_ids)
 
         status = self.request.GET.get(
             "status"
@@ -502,22 +704,94 @@ class TestResultListView(ListView):
 
         return queryset
 
+
+class TestResultListView(ConditionalGetMixin, TestResultFilterMixin,
+                         KeysetPaginationMixin, ListView):
+    model = TestResult
+    template_name = "bug_tracker/testresult_list.html"
+    context_object_name = "testresults"
+    keyset = ("-timestamp", "-id")
+
+    def get_validators(self):
+        if not hasattr(self, "_validators"):
+            self._validators = results_validators(self.get_queryset())
+        return self._validators
+
+    def get_etag(self, request):
+        count, last_modified = self.get_validators()
+        return make_etag(
+            request.user.pk,
+            request.GET.urlencode(),
+            sorted(get_accessible_project_ids(request.user)),
+            # Run, case and project titles shown on the page
+            get_version("catalog", 0),
+            count,
+            last_modified,
+        )
+
+    def get_last_modified(self, request):
+        return self.get_validators()[1]
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            "test_case", "test_run__project"
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        user = self.request.user
-
         # Get the available projects for the user
-        projects = Project.objects.filter(
-            Q(created_by=user) | Q(shared_with=user)
-        )
+        project_ids = get_accessible_project_ids(self.request.user)
+        projects = Project.objects.filter(pk__in=project_ids)
 
-        testruns = TestRun.objects.filter(project__in=projects)
+        testruns = TestRun.objects.filter(project_id__in=project_ids)
 
         context["projects"] = projects
         context["testruns"] = testruns
         return context
 
 
+class TestResultExportView(LoginRequiredMixin, TestResultFilterMixin, View):
+    """Stream the filtered results as CSV or JSON Lines."""
+
+    def get(self, request):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest("Unknown export format.")
+        return export_response(
+            self.get_queryset(), export_format, "test-results"
+        )
+
+
+class SearchView(LoginRequiredMixin, View):
+    template_name = "bug_tracker/search.html"
+    paginate_by = 20
+
+    def get(self, request):
+        query = request.GET.get("q", "").strip()
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            raise Http404("Invalid page.")
+
+        # Fetch one extra hit to learn whether another page follows
+        hits = search(
+            query,
+            get_accessible_project_ids(request.user),
+            limit=self.paginate_by + 1,
+            offset=(page - 1) * self.paginate_by,
+        )
+        return render(
+            request,
+            self.template_name,
+            {
+                "query": query,
+                "hits": hits[:self.paginate_by],
+                "page": page,
+                "has_next": len(hits) > self.paginate_by,
+            },
+        )
+
+
 def handler404(request, exception):
     return render(request, "404.html", status=404)
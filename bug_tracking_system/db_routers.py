@@ -0,0 +1,101 @@
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import connections
+
+
+# Apps that always read from the primary and whose writes do not pin the
+# user to it: the session must be readable right after login, and saving
+# it is not a change the user needs to see
+PRIMARY_ONLY_APPS = {"sessions"}
+
+_routing = contextvars.ContextVar("replica_routing", default=None)
+
+
+class ReplicaRouting:
+    """Where the current request reads from.
+
+    A request reads from ``replica`` (None for the primary) until its first
+    write, which switches it to the primary and sets ``wrote``, so the
+    middleware can keep the user on the primary for a while.
+    """
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def start_routing(read_replica):
+    """Track the current request's writes and, if ``read_replica`` is set
+    and there are replicas, send its reads to one of them.
+
+    Returns the routing state and a token for ``stop_routing()``.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    routing = ReplicaRouting(
+        random.choice(replicas) if read_replica and replicas else None
+    )
+    return routing, _routing.set(routing)
+
+
+def stop_routing(token):
+    _routing.reset(token)
+
+
+def reading_from_replica():
+    routing = _routing.get()
+    return (
+        routing is not None
+        and routing.replica is not None
+        and not routing.wrote
+    )
+
+
+def replica_cache_timeout(timeout):
+    """Bound ``timeout`` for data that may have been read from a replica.
+
+    A replica may lag behind a write whose cache invalidation has already
+    happened, so anything it returns is cached no longer than the lag we
+    allow for.
+    """
+    if reading_from_replica():
+        return min(timeout, settings.REPLICA_STICKY_SECONDS)
+    return timeout
+
+
+class PrimaryReplicaRouter:
+    """Send writes to the primary and the reads of GET requests to a replica.
+
+    Reads go to the primary outside requests (management commands, the
+    notification worker), inside transactions, and for the rest of a
+    request once it has written anything. ``ReplicaRoutingMiddleware``
+    decides which requests read from a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (
+            routing is None
+            or routing.replica is None
+            or routing.wrote
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections["default"].in_atomic_block
+        ):
+            return "default"
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        # Django also asks for the write database to validate unique
+        # constraints, so a rejected form pins the user too; that only
+        # errs towards the primary
+        routing = _routing.get()
+        if routing is not None and (
+            model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            routing.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
@@ -1,20 +1,273 @@
+import contextvars
+import heapq
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
 from django.http import Http404
+from django.template.base import Template
+from whitenoise.middleware import WhiteNoiseMiddleware
 
 from bug_tracker.views import handler404
+from bug_tracking_system.db_routers import start_routing, stop_routing
+
+
+logger = logging.getLogger(__name__)
+
+_current_metrics = contextvars.ContextVar("request_metrics", default=None)
 
 
 class BaseMiddleware:
+    """Middleware that runs natively under both WSGI and ASGI.
+
+    Subclasses override ``__call__`` and/or ``__acall__``; Django picks
+    the async one when the rest of the stack is async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         return self.get_response(request)
 
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
     def process_exception(self, request, exception):
         pass
 
 
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that does not force the middleware stack into sync mode.
+
+    Looking a file up is an in-memory dict access, so it is safe to do on
+    the event loop; everything else is handed on untouched.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
 class PermissionDeniedMiddleware(BaseMiddleware):
     def process_exception(selr, request, exception):
         if isinstance(exception, Http404):
             return handler404(request, exception)
+
+
+class ReplicaRoutingMiddleware(BaseMiddleware):
+    """Let GET requests read from a replica, unless the user wrote recently.
+
+    A request that writes sets a cookie that keeps the user's reads on the
+    primary for REPLICA_STICKY_SECONDS, so they see their own changes even
+    while the replicas lag behind.
+    """
+
+    cookie_name = "read_primary"
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing, token = start_routing(self.reads_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_routing(token)
+        return self.finish(routing, response)
+
+    async def __acall__(self, request):
+        routing, token = start_routing(self.reads_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_routing(token)
+        return self.finish(routing, response)
+
+    def reads_replica(self, request):
+        return (
+            request.method in ("GET", "HEAD")
+            and self.cookie_name not in request.COOKIES
+        )
+
+    def finish(self, routing, response):
+        if routing.wrote:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class RequestMetrics:
+    """Query, database and template timings collected for one request."""
+
+    def __init__(self, slowest_limit=5):
+        self.started = time.perf_counter()
+        self.total = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.slowest_limit = slowest_limit
+        self.slowest_queries = []
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.query_count += 1
+            self.db_time += duration
+            entry = (duration, self.query_count, sql)
+            if len(self.slowest_queries) < self.slowest_limit:
+                heapq.heappush(self.slowest_queries, entry)
+            else:
+                heapq.heappushpop(self.slowest_queries, entry)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ", ".join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} '
+            f'queries"',
+            f"tpl;dur={self.template_time * 1000:.1f}",
+            f"total;dur={self.total * 1000:.1f}",
+        ])
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    # Async views run their queries in worker threads, each with its own
+    # connections, so every connection carries the recorder permanently;
+    # it only records while a request's metrics are active in the context
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+def _timed_template_render(render):
+    def wrapper(template, context):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return render(template, context)
+        # Included templates render inside their parent; only time the
+        # outermost render so nothing is counted twice
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+    wrapper.timed = True
+    return wrapper
+
+
+class RequestTimingMiddleware(BaseMiddleware):
+    """Measure queries, DB time, template time and total time per request.
+
+    The numbers are sent in a ``Server-Timing`` header, and requests slower
+    than ``SLOW_REQUEST_MS`` or running more than ``SLOW_REQUEST_QUERIES``
+    queries are logged together with their slowest SQL statements.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if not getattr(Template.render, "timed", False):
+            Template.render = _timed_template_render(Template.render)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all():
+            install_query_recorder(connection)
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        if getattr(settings, "SERVER_TIMING_HEADER", False):
+            response["Server-Timing"] = metrics.server_timing()
+        self.log_if_slow(request, metrics)
+        return response
+
+    def log_if_slow(self, request, metrics):
+        slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        max_queries = getattr(settings, "SLOW_REQUEST_QUERIES", 50)
+        total_ms = metrics.total * 1000
+        if total_ms < slow_ms and metrics.query_count <= max_queries:
+            return
+        slowest = "\n".join(
+            f"  {duration * 1000:.1f}ms: {sql}"
+            for duration, _, sql in sorted(
+                metrics.slowest_queries, reverse=True
+            )
+        )
+        logger.warning(
+            "Slow request %s %s: %.1fms total, %d queries in %.1fms, "
+            "templates %.1fms\n%s",
+            request.method,
+            request.path,
+            total_ms,
+            metrics.query_count,
+            metrics.db_time * 1000,
+            metrics.template_time * 1000,
+            slowest,
+        )
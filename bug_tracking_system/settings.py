@@ -53,8 +53,10 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    "bug_tracking_system.middlewares.RequestTimingMiddleware",
+    "bug_tracking_system.middlewares.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "bug_tracking_system.middlewares.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -64,6 +66,16 @@ MIDDLEWARE = [
     "bug_tracking_system.middlewares.PermissionDeniedMiddleware",
 ]
 
+# Request instrumentation: send a Server-Timing header and log requests that
+# take longer than SLOW_REQUEST_MS or run more than SLOW_REQUEST_QUERIES. The
+# header shows query counts and timings to every client, so it is only sent
+# with DEBUG unless SERVER_TIMING_HEADER=True.
+SERVER_TIMING_HEADER = (
+    os.environ.get("SERVER_TIMING_HEADER", str(DEBUG)) == "True"
+)
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 500))
+SLOW_REQUEST_QUERIES = int(os.environ.get("SLOW_REQUEST_QUERIES", 50))
+
 ROOT_URLCONF = "bug_tracking_system.urls"
 
 TEMPLATES = [
@@ -96,8 +108,115 @@ DATABASES = {
     }
 }
 
+# Serve the read-heavy views from bug_tracker.async_views; asgi.py turns
+# this on, so only the ASGI deployment runs them
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS") == "1"
+
 db_from_env = dj_database_url.config(default=os.getenv("DATABASE_URL", ""),conn_max_age=500)
 DATABASES["default"].update(db_from_env)
+if ASYNC_VIEWS:
+    # Persistent connections are not closed reliably under ASGI
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+
+# Read replicas, as comma-separated database URLs. GET requests read from
+# them while writes and everything else use the primary; a user who writes
+# reads from the primary for the next REPLICA_STICKY_SECONDS
+# (bug_tracking_system.db_routers). To try it locally, point DATABASE_URL
+# and DATABASE_REPLICA_URLS at two SQLite files and copy the first over
+# the second to "replicate".
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(",")), 1
+):
+    alias = f"replica_{number}"
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=DATABASES["default"].get("CONN_MAX_AGE", 0)
+    )
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["bug_tracking_system.db_routers.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The local-memory cache is per process; set REDIS_URL when running several
+# workers so cache invalidation reaches all of them.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# Whether every worker sees the same cache. The caches that are kept fresh
+# by invalidation -- accessible project ids (bug_tracker.access), dashboard
+# versions and the ETags built from them (bug_tracker.cache_versions,
+# bug_tracker.conditional) and cached auth -- are only used then, since with
+# per-process caches an invalidation would not reach the other workers. Set
+# SHARED_CACHE=1 to use them with the local-memory cache in a single process.
+SHARED_CACHE = os.getenv("SHARED_CACHE", "1" if REDIS_URL else "0") == "1"
+
+# Cached sessions and users: sessions are kept in the cache and written
+# through to the database, and the user of a session is loaded from the
+# cache (bug_tracker.auth_backends), so a warm request authenticates without
+# queries. On by default only with a shared cache, since with per-process
+# caches a logout or password change would not reach the other workers.
+CACHED_AUTH = os.getenv("CACHED_AUTH", "1" if SHARED_CACHE else "0") == "1"
+if CACHED_AUTH:
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+    # Sessions store the path of the backend that logged them in, and are
+    # dropped once it is no longer listed: ModelBackend stays so sessions
+    # from before the switch still resolve
+    AUTHENTICATION_BACKENDS = [
+        "bug_tracker.auth_backends.CachedModelBackend",
+        "django.contrib.auth.backends.ModelBackend",
+    ]
+
+# Seconds a user loaded by CachedModelBackend stays cached
+USER_CACHE_TIMEOUT = 300
+
+# Seconds a user's accessible project ids stay cached (bug_tracker.access)
+ACCESSIBLE_PROJECTS_CACHE_TIMEOUT = 300
+
+# Seconds a rendered project/test run dashboard stays cached; edits bump
+# the version in its key, so this only bounds memory use
+# (bug_tracker.cache_versions)
+DASHBOARD_CACHE_TIMEOUT = 600
+
+# Seconds the flakiness scores of a project stay cached; they are not
+# invalidated by result edits (bug_tracker.analytics)
+FLAKINESS_CACHE_TIMEOUT = 300
+
+# Live test run progress (bug_tracker.run_events): the run page follows a
+# Server-Sent Events stream of result changes. Every open stream holds a
+# worker thread under WSGI, so it is on by default only under ASGI. The
+# in-process hub only reaches pages served by the publishing process; with
+# REDIS_URL, events go through Redis publish/subscribe instead.
+LIVE_RUN_EVENTS = os.getenv(
+    "LIVE_RUN_EVENTS", "1" if ASYNC_VIEWS else "0"
+) == "1"
+RUN_EVENTS_HUB = os.getenv(
+    "RUN_EVENTS_HUB",
+    "bug_tracker.run_events.RedisHub" if REDIS_URL
+    else "bug_tracker.run_events.InProcessHub",
+)
+# Seconds between keepalive comments, and before a stream is closed for the
+# browser to reconnect
+RUN_EVENTS_HEARTBEAT = 15
+RUN_EVENTS_STREAM_SECONDS = 300
+# Rows a bulk change may send before pages are told to reload instead
+RUN_EVENTS_MAX_ROWS = 200
+# Events a slow page may fall behind before it is told to reload
+RUN_EVENTS_MAX_PENDING = 1000
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -141,10 +260,62 @@ STATICFILES_DIRS = (BASE_DIR / "static",)
 
 STATIC_ROOT = "staticfiles"
 
+# `manage.py build_assets` writes these bundles into static/bundles/ and
+# collects only them, the files their CSS references and ASSET_EXTRA_FILES,
+# with fingerprinted names and gzip/brotli variants (bug_tracker.assets).
+# Until then, {% bundle %} links the sources; an SCSS source is linked
+# through the compiled CSS file next to it.
+ASSET_BUNDLES = {
+    "bundles/vendor.css": [
+        "vendor/bootstrap/css/bootstrap.min.css",
+        "vendor/bootstrap-icons/bootstrap-icons.scss",
+    ],
+    "bundles/main.css": ["css/style.css"],
+    "bundles/app.js": [
+        "vendor/bootstrap/js/bootstrap.bundle.min.js",
+        "js/main.js",
+    ],
+    "bundles/run_progress.js": ["js/run_progress.js"],
+}
+
+ASSET_EXTRA_FILES = ["img/*"]
+
+STATICFILES_FINDERS = [
+    "bug_tracker.assets.BundleFinder",
+    "django.contrib.staticfiles.finders.AppDirectoriesFinder",
+]
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "bug_tracker.assets.AssetStorage",
+    },
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-TELEGRAM_BOT_API_KEY = os.environ["TELEGRAM_BOT_API_KEY"]
\ No newline at end of file
+TELEGRAM_BOT_API_KEY = os.environ["TELEGRAM_BOT_API_KEY"]
+
+TELEGRAM_API_URL = os.environ.get(
+    "TELEGRAM_API_URL", "https://api.telegram.org"
+)
+
+# Shared secret Telegram sends with webhook updates; the webhook endpoint is
+# disabled while it is empty.
+TELEGRAM_WEBHOOK_SECRET = os.environ.get("TELEGRAM_WEBHOOK_SECRET", "")
+
+# Outbox delivery: attempts before a notification is marked as failed, and
+# the minimum number of seconds between two messages to the same chat.
+TELEGRAM_MAX_ATTEMPTS = int(os.environ.get("TELEGRAM_MAX_ATTEMPTS", 8))
+TELEGRAM_CHAT_INTERVAL = float(os.environ.get("TELEGRAM_CHAT_INTERVAL", 1))
+
+# Result alerts go to every project member with a connected chat and are
+# held until the end of a window of this many seconds, so a chat gets one
+# digest for all alerts of the window; 0 sends each alert right away.
+TELEGRAM_DIGEST_WINDOW = float(os.environ.get("TELEGRAM_DIGEST_WINDOW", 60))
@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin for asserting an upper bound on executed queries."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using="default"):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f"{executed} queries executed, budget is {budget}\n"
+                f"Captured queries were:\n{queries}"
+            )
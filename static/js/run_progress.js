@@ -0,0 +1,118 @@
+/**
+ * Live test run progress: follows the run's event stream
+ * (bug_tracker.run_events) and updates the chart and the result rows of
+ * the test run page in place.
+ */
+(function() {
+  "use strict";
+
+  const container = document.getElementById('run_progress');
+  const tbody = document.getElementById('test_results');
+  if (!container || !tbody || !window.EventSource) {
+    return;
+  }
+
+  const statuses = ['passed', 'failed', 'blocked', 'untested'];
+  const filters = new URLSearchParams(window.location.search);
+  let counts = null;
+
+  const drawChart = () => {
+    const chart = window.runProgressChart;
+    if (!chart || !counts) {
+      return;
+    }
+    const total = statuses.reduce((sum, status) => sum + counts[status], 0);
+    chart.data.datasets[0].data = statuses.map(
+      (status) => total ? (counts[status] / total) * 100 : 0
+    );
+    chart.update();
+  };
+
+  const matchesFilters = (row) => (
+    (!filters.get('status') || filters.get('status') === row.status) &&
+    (!filters.get('priority') || filters.get('priority') === row.priority)
+  );
+
+  const findRow = (id) => tbody.querySelector(`tr[data-result-id="${id}"]`);
+
+  const cell = (text) => {
+    const td = document.createElement('td');
+    td.textContent = text;
+    return td;
+  };
+
+  const link = (href, text) => {
+    const a = document.createElement('a');
+    a.href = href;
+    a.className = 'btn btn-outline-primary btn-sm';
+    a.textContent = text;
+    return a;
+  };
+
+  const buildRow = (row) => {
+    const tr = document.createElement('tr');
+    tr.dataset.resultId = row.id;
+
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.name = 'test_result_ids';
+    checkbox.value = row.id;
+    checkbox.className = 'result-checkbox';
+    checkbox.setAttribute('form', 'bulk_update_form');
+    const select = document.createElement('td');
+    select.append(checkbox);
+
+    const status = cell(row.status_display);
+    status.dataset.field = 'status';
+
+    const actions = document.createElement('td');
+    actions.append(link(row.detail_url, 'View'), ' ', link(row.update_url, 'Edit'));
+
+    tr.append(select, cell(row.test_case), cell(row.priority_display), status, actions);
+    return tr;
+  };
+
+  const applyRow = (row) => {
+    const existing = findRow(row.id);
+    if (!matchesFilters(row)) {
+      if (existing) {
+        existing.remove();
+      }
+    } else if (existing) {
+      existing.querySelector('[data-field="status"]').textContent = row.status_display;
+    } else {
+      tbody.append(buildRow(row));
+    }
+  };
+
+  const applyResults = (event) => {
+    if (event.counts) {
+      counts = event.counts;
+    } else if (event.delta && counts) {
+      Object.entries(event.delta).forEach(([status, change]) => {
+        counts[status] += change;
+      });
+    }
+    drawChart();
+    (event.removed || []).forEach((id) => {
+      const existing = findRow(id);
+      if (existing) {
+        existing.remove();
+      }
+    });
+    (event.rows || []).forEach(applyRow);
+  };
+
+  const source = new EventSource(container.dataset.eventsUrl);
+  source.addEventListener('counts', (message) => {
+    counts = JSON.parse(message.data).counts;
+    drawChart();
+  });
+  source.addEventListener('results', (message) => {
+    applyResults(JSON.parse(message.data));
+  });
+  source.addEventListener('reload', () => {
+    source.close();
+    window.location.reload();
+  });
+})();